@@ -0,0 +1,95 @@
+"""
+Auditing a whole batch of schedules: audit.ScheduleAudit (every dose of the batch in a few arrays,
+all rules checked at once) against checking each patient in turn with build_problem and
+verify_slots. Schedules are solved for a few hundred synthetic regimens (see synthetic.py) and
+repeated up to the batch size; a share of them is corrupted (a dose moved to another slot, or
+dropped). Reports both times (and the share of the audit spent in run(), the rest is add()
+copying the schedules into arrays) and whether they flag the same patients, and the same soft penalty.
+
+    python benchmarks/bench_audit.py [patients]
+"""
+import contextlib, io, os, random, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from utils import (load_data, build_interaction_dict, get_catalog, solve_schedule, get_time_slots, build_problem,
+                   previous_dose_slots, minutes_to_time, PREFERENCE_WEIGHT, UNDESIRABLE_WEIGHT)
+from verify import verify_slots
+from interaction_graph import InteractionGraph
+from audit import ScheduleAudit
+from synthetic import synthetic_regimens, thin_interactions
+
+REGIMENS = 200  # distinct regimens solved, repeated up to the batch size
+CORRUPTED = 0.1  # share of the schedules changed after solving
+INTERACTION_DENSITY = 0.2
+GRID = [minutes_to_time(m) for m in range(6 * 60, 22 * 60 + 1, 60)]
+
+def corrupt(schedule, rng):
+    """ A copy of `schedule` with one dose moved to another grid slot, or dropped. """
+    doses = [(t, name) for t, names in schedule.items() for name in names]
+    t, name = rng.choice(doses)
+    changed = {slot: [n for n in names if (slot, n) != (t, name)] for slot, names in schedule.items()}
+    if rng.random() < 0.7:
+        changed.setdefault(rng.choice(GRID), []).append(name)
+    return {slot: names for slot, names in changed.items() if names}
+
+def reference(patients, interactions, catalog):
+    """ (patients with hard violations, soft penalty) from verify_slots, one patient at a time. """
+    flagged, penalty = set(), 0
+    for patient, prescriptions, diet, schedule in patients:
+        times, meal_times = get_time_slots(diet)
+        problem = build_problem(prescriptions, interactions, catalog, times, meal_times)
+        violations, cost = verify_slots(previous_dose_slots(schedule, prescriptions), problem)
+        if violations:
+            flagged.add(patient)
+        penalty += cost
+    return flagged, penalty
+
+def audit(patients, interactions, catalog):
+    """ (patients with hard violations, soft penalty, findings, seconds spent in run()) from ScheduleAudit. """
+    auditor = ScheduleAudit(interactions, catalog)
+    for patient, prescriptions, diet, schedule in patients:
+        auditor.add(patient, prescriptions, diet, schedule)
+    start = time.perf_counter()
+    findings = auditor.run()
+    seconds = time.perf_counter() - start
+    weights = {"preference": PREFERENCE_WEIGHT, "undesirable": UNDESIRABLE_WEIGHT}
+    return ({f.patient for f in findings if not f.soft}, sum(weights[f.rule] for f in findings if f.soft),
+            len(findings), seconds)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(thin_interactions(build_interaction_dict(df_interactions), INTERACTION_DENSITY))
+    catalog = get_catalog(df_drugs)
+
+    solved = []
+    for prescriptions, diet in synthetic_regimens(catalog, REGIMENS, drugs=8, diet_share=0.3):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = solve_schedule(prescriptions, interactions, catalog, diet, explain=False)
+        if result.schedule is not None:
+            solved.append((prescriptions, diet, result.schedule))
+    rng = random.Random(0)
+    patients = []
+    for k in range(count):
+        prescriptions, diet, schedule = solved[k % len(solved)]
+        if rng.random() < CORRUPTED:
+            schedule = corrupt(schedule, rng)
+        patients.append((f"patient-{k}", prescriptions, diet, schedule))
+    doses = sum(len(names) for *_, schedule in patients for names in schedule.values())
+    print(f"{count} patients ({len(solved)} distinct regimens), {doses} doses")
+
+    start = time.perf_counter()
+    expected, expected_penalty = reference(patients, interactions, catalog)
+    reference_time = time.perf_counter() - start
+    start = time.perf_counter()
+    flagged, penalty, findings, check_time = audit(patients, interactions, catalog)
+    audit_time = time.perf_counter() - start
+
+    print(f"{'check':>22} {'seconds':>8} {'flagged':>8} {'soft penalty':>13}")
+    print(f"{'verify_slots loop':>22} {reference_time:>8.3f} {len(expected):>8} {expected_penalty:>13}")
+    print(f"{'ScheduleAudit':>22} {audit_time:>8.3f} {len(flagged):>8} {penalty:>13}")
+    print(f"{'of which run()':>22} {check_time:>8.3f}")
+    print(f"speedup {reference_time / audit_time:.1f}x, {findings} findings, "
+          f"same patients flagged: {flagged == expected}, same penalty: {penalty == expected_penalty}")
@@ -0,0 +1,50 @@
+"""
+Monolithic model versus connected-component decomposition in solve_schedule for synthetic
+regimens: number of components, size of the largest one, solve time and penalty (which must
+match, both searches are run to optimality). Each size is run again on a regimen cut down to its
+isolated drugs and its first two groups ("2g" rows), the case where there is little to split.
+
+    python benchmarks/bench_decomposition.py [sizes...]
+"""
+import contextlib, io, os, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from utils import load_data, build_interaction_dict, get_catalog, solve_schedule, split_components, SolverConfig
+from interaction_graph import InteractionGraph
+from bench_formulations import synthetic_prescriptions, thin_interactions, INTERACTION_DENSITY, DIET
+
+def few_groups(prescriptions, interactions, groups=2):
+    """ The prescriptions interacting with no other one, plus those of the first `groups` groups. """
+    isolated, components = split_components(prescriptions, interactions)
+    kept = sorted(isolated + [i for indices in components[:groups] for i in indices])
+    return [prescriptions[i] for i in kept]
+
+def run(prescriptions, interactions, catalog, formulation, decompose):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = solve_schedule(prescriptions, interactions, catalog, DIET, formulation=formulation,
+                                solver_config=SolverConfig(gap=0), decompose=decompose)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 30, 100, 200]
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(thin_interactions(build_interaction_dict(df_interactions), INTERACTION_DENSITY))
+    catalog = get_catalog(df_drugs)
+
+    print(f"{'size':>7} {'formulation':>12} {'isolated':>9} {'groups':>7} {'largest':>8} "
+          f"{'whole s':>9} {'split s':>9} {'speedup':>8}  penalty")
+    cases = [(str(size), synthetic_prescriptions(catalog, size)) for size in sizes]
+    cases += [(f"{size}/2g", few_groups(prescriptions, interactions)) for size, prescriptions in cases]
+    for size, prescriptions in cases:
+        isolated, components = split_components(prescriptions, interactions)
+        largest = max((len(c) for c in components), default=0)
+        for formulation in ("boolean", "integer"):
+            whole, whole_result = run(prescriptions, interactions, catalog, formulation, decompose=False)
+            split, split_result = run(prescriptions, interactions, catalog, formulation, decompose=True)
+            same = "ok" if whole_result.penalty == split_result.penalty else "MISMATCH"
+            print(f"{size:>7} {formulation:>12} {len(isolated):>9} {len(components):>7} {largest:>8} "
+                  f"{whole:>9.4f} {split:>9.4f} {whole / split:>7.1f}x  "
+                  f"{whole_result.penalty}/{split_result.penalty} {same} ({whole_result.status}/{split_result.status})")
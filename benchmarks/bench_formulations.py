@@ -0,0 +1,90 @@
+"""
+Compare the boolean and integer CP-SAT formulations of create_schedule: model size,
+build time and solve time for synthetic regimens of 10, 30 and 100 prescriptions.
+Every solution is checked against the dose windows, spacing and risky-interaction rules,
+and the soft-constraint penalty is recomputed independently of the solver objective.
+
+    python benchmarks/bench_formulations.py [sizes...]
+"""
+import contextlib, io, os, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from ortools.sat.python import cp_model
+from utils import (load_data, build_interaction_dict, get_catalog, get_time_slots, get_time_preferences,
+                   get_dose_window, get_preferred_window, get_interacting_doses, add_boolean_formulation,
+                   add_integer_formulation, time_to_minutes, MIN_DOSE_GAP_MINUTES, PREFERENCE_WEIGHT,
+                   UNDESIRABLE_WEIGHT)
+from interaction_graph import InteractionGraph
+from synthetic import synthetic_regimens, thin_interactions
+
+DIET = {"breakfast": "08:00", "lunch": "13:00", "dinner": "19:00"}
+INTERACTION_DENSITY = 0.05  # share of the dataset pairs kept, the full set of risky pairs makes large regimens infeasible
+
+def synthetic_prescriptions(catalog, count, seed=0):
+    # preferences are soft, so they can be given to any drug without making the regimen infeasible
+    return synthetic_regimens(catalog, 1, seed, drugs=count, preferred_share=0.5)[0][0]
+
+def check_slots(dose_slots, prescriptions, interactions, catalog, times, meal_times):
+    """
+    Independent check of a solution: returns (violated hard rules, recomputed soft penalty).
+    """
+    time_preferences = get_time_preferences(times)
+    errors, penalty = [], 0
+    for i, pres in enumerate(prescriptions):
+        window = set(get_dose_window(pres, times, meal_times, catalog))
+        for d_idx in range(pres['frequency']):
+            if dose_slots[(i, d_idx)] not in window:
+                errors.append(f"{pres['name']} dose {d_idx} outside its window")
+            preferred = get_preferred_window(pres, time_preferences, d_idx)
+            if preferred is not None and dose_slots[(i, d_idx)] not in preferred:
+                penalty += PREFERENCE_WEIGHT
+            gap = time_to_minutes(dose_slots[(i, d_idx)]) - time_to_minutes(dose_slots[(i, d_idx - 1)]) if d_idx else None
+            if gap is not None and gap < MIN_DOSE_GAP_MINUTES:
+                errors.append(f"{pres['name']} doses {d_idx - 1}/{d_idx} too close")
+    for kind, (i1, d1), (i2, d2) in get_interacting_doses(prescriptions, interactions):
+        if dose_slots[(i1, d1)] != dose_slots[(i2, d2)]:
+            continue
+        if kind == "risk":
+            errors.append(f"{prescriptions[i1]['name']} and {prescriptions[i2]['name']} share {dose_slots[(i1, d1)]}")
+        else:
+            penalty += UNDESIRABLE_WEIGHT
+    return errors, penalty
+
+def run(formulation, prescriptions, interactions, catalog, resolution=60):
+    add_formulation = add_boolean_formulation if formulation == "boolean" else add_integer_formulation
+    times, meal_times = get_time_slots(DIET, resolution)
+    start = time.perf_counter()
+    model = cp_model.CpModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        read_slots = add_formulation(model, prescriptions, interactions, catalog, DIET, times, meal_times)
+    build = time.perf_counter() - start
+    proto = model.Proto()
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = 60
+    start = time.perf_counter()
+    status = solver.Solve(model)
+    solve = time.perf_counter() - start
+    errors = penalty = None
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        errors, penalty = check_slots(read_slots(solver), prescriptions, interactions, catalog, times, meal_times)
+        if model.HasObjective() and penalty != round(solver.ObjectiveValue()):
+            errors.append(f"objective {solver.ObjectiveValue()} does not match recomputed penalty {penalty}")
+    return {"variables": len(proto.variables), "constraints": len(proto.constraints), "build": build,
+            "solve": solve, "status": solver.StatusName(status), "errors": errors, "penalty": penalty}
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 30, 100]
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(thin_interactions(build_interaction_dict(df_interactions), INTERACTION_DENSITY))
+    catalog = get_catalog(df_drugs)
+
+    print(f"{'size':>5} {'formulation':>12} {'vars':>7} {'constrs':>8} {'build s':>9} {'solve s':>9} {'penalty':>8}  status")
+    for size in sizes:
+        prescriptions = synthetic_prescriptions(catalog, size)
+        for formulation in ("boolean", "integer"):
+            r = run(formulation, prescriptions, interactions, catalog)
+            check = "" if r["errors"] is None else ("valid" if not r["errors"] else f"INVALID: {r['errors'][:3]}")
+            print(f"{size:>5} {formulation:>12} {r['variables']:>7} {r['constraints']:>8} "
+                  f"{r['build']:>9.4f} {r['solve']:>9.4f} {str(r['penalty']):>8}  {r['status']} {check}")
@@ -0,0 +1,72 @@
+"""
+How often the constructive heuristic schedules a regimen without CP-SAT, on the sample inputs
+and on a synthetic corpus of small regimens drawn from the full interaction dataset, and what
+it saves in time. A group of interacting drugs counts as a success when the greedy placement
+passes the verifier with no penalty; a regimen when none of its groups needed the solver.
+
+    python benchmarks/bench_greedy.py [synthetic regimens]
+"""
+import contextlib, glob, io, os, random, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from parser import parse_prescriptions
+from utils import (load_data, build_interaction_dict, get_catalog, get_time_slots, solve_schedule,
+                   split_components, build_problem, greedy_slots)
+from verify import verify_slots
+from interaction_graph import InteractionGraph
+from synthetic import synthetic_regimen
+
+def sample_regimens():
+    for path in sorted(glob.glob(os.path.join(ROOT, "inputs", "*.txt"))):
+        with open(path) as f:
+            prescriptions, diet = parse_prescriptions(f.read())
+        for pres in prescriptions:
+            pres['name'] = pres['name'].title()
+        yield prescriptions, diet
+
+def small_regimens(catalog, count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield synthetic_regimen(catalog, rng, drugs=rng.randint(3, 8), preferred_share=0.5)
+
+def measure(regimens, interactions, catalog):
+    groups = greedy_groups = 0
+    methods = {"direct": 0, "greedy": 0, "cp-sat": 0}
+    fast = slow = 0.0
+    for prescriptions, diet in regimens:
+        times, meal_times = get_time_slots(diet)
+        for indices in split_components(prescriptions, interactions)[1]:
+            group = [prescriptions[i] for i in indices]
+            problem = build_problem(group, interactions, catalog, times, meal_times)
+            slots = greedy_slots(problem)
+            groups += 1
+            if slots is not None and verify_slots(slots, problem) == ([], 0):
+                greedy_groups += 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = solve_schedule(prescriptions, interactions, catalog, diet)
+            fast += time.perf_counter() - start
+            start = time.perf_counter()
+            solve_schedule(prescriptions, interactions, catalog, diet, greedy=False)
+            slow += time.perf_counter() - start
+        methods[result.method] += 1
+    return groups, greedy_groups, methods, fast, slow
+
+def report(label, measured):
+    groups, greedy_groups, methods, fast, slow = measured
+    regimens = sum(methods.values())
+    without_solver = methods["direct"] + methods["greedy"]
+    print(f"{label}: {regimens} regimens, {without_solver / regimens:.0%} scheduled without CP-SAT "
+          f"(direct {methods['direct']}, greedy {methods['greedy']}, cp-sat {methods['cp-sat']}); "
+          f"greedy solved {greedy_groups}/{groups} interacting groups")
+    print(f"{'':>{len(label) + 2}}total time {fast:.3f}s with the fast path, {slow:.3f}s without ({slow / fast:.1f}x)")
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(build_interaction_dict(df_interactions))
+    catalog = get_catalog(df_drugs)
+    report("sample inputs", measure(sample_regimens(), interactions, catalog))
+    report("synthetic", measure(small_regimens(catalog, count), interactions, catalog))
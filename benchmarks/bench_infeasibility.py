@@ -0,0 +1,61 @@
+"""
+Infeasible regimens: how many the pre-check (verify.precheck) rejects before any model is built,
+how long the assumption-based explanation (utils.explain_conflicts) takes for the others, and
+what it replaces: dropping one drug at a time and solving again until a schedule exists.
+Regimens are synthetic (see synthetic.py) with many food-bound drugs and the full interaction set,
+so that a good share of them cannot be scheduled.
+
+    python benchmarks/bench_infeasibility.py [regimens]
+"""
+import contextlib, io, os, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from utils import load_data, build_interaction_dict, get_catalog, solve_schedule
+from interaction_graph import InteractionGraph
+from synthetic import synthetic_regimens
+
+def solve(prescriptions, interactions, catalog, diet, **options):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = solve_schedule(prescriptions, interactions, catalog, diet, **options)
+    return time.perf_counter() - start, result
+
+def trial_and_error(prescriptions, interactions, catalog, diet):
+    """ Solves needed when dropping the prescriptions one by one (in order) until the rest can be scheduled. """
+    for dropped in range(1, len(prescriptions) + 1):
+        _, result = solve(prescriptions[dropped:], interactions, catalog, diet, explain=False)
+        if result.schedule is not None:
+            return dropped
+    return len(prescriptions)
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(build_interaction_dict(df_interactions))
+    catalog = get_catalog(df_drugs)
+    regimens = synthetic_regimens(catalog, count, drugs=8, frequency_mix=(1, 1, 2), food_share=0.6)
+
+    prechecked, explained = [], []
+    for prescriptions, diet in regimens:
+        seconds, result = solve(prescriptions, interactions, catalog, diet)
+        if result.status != "INFEASIBLE":
+            continue
+        if result.method == "direct":
+            prechecked.append(seconds)
+        else:
+            unexplained, _ = solve(prescriptions, interactions, catalog, diet, explain=False)
+            explained.append((seconds, unexplained, len(result.conflicts or ()),
+                              trial_and_error(prescriptions, interactions, catalog, diet)))
+
+    infeasible = len(prechecked) + len(explained)
+    print(f"{count} regimens, {infeasible} infeasible")
+    if prechecked:
+        print(f"  rejected by the pre-check: {len(prechecked)}, {sum(prechecked) / len(prechecked) * 1e3:.2f} ms each")
+    if explained:
+        with_explanation = sum(e[0] for e in explained) / len(explained)
+        without = sum(e[1] for e in explained) / len(explained)
+        print(f"  found by CP-SAT: {len(explained)}, {without * 1e3:.2f} ms each, {with_explanation * 1e3:.2f} ms with "
+              f"the explanation ({sum(e[2] for e in explained) / len(explained):.1f} rules); dropping drugs one by one "
+              f"takes {sum(e[3] for e in explained) / len(explained):.1f} more solves")
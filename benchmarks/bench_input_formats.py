@@ -0,0 +1,62 @@
+"""
+Parsing cost of the input formats for the same synthetic feed of ROWS prescriptions (default
+100000, about 5 per patient): the text feed (parser.iter_patients), CSV and JSON Lines
+(structured.py, with the bulk drug-name check), next to the time it takes just to read the file
+line by line. The closer a format is to the read time, the more the parse is I/O-bound.
+
+    python benchmarks/bench_input_formats.py [rows]
+"""
+import csv, json, os, random, statistics, sys, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from parser import iter_patients
+from structured import iter_csv_patients, iter_json_patients
+from utils import load_data, get_catalog
+from synthetic import synthetic_regimen, regimen_text
+
+def write_feeds(directory, catalog, rows, seed=0):
+    rng = random.Random(seed)
+    paths = {fmt: os.path.join(directory, f"feed.{fmt}") for fmt in ("txt", "csv", "jsonl")}
+    with open(paths["txt"], "w") as text, open(paths["csv"], "w", newline="") as table, open(paths["jsonl"], "w") as lines:
+        writer = csv.writer(table)
+        writer.writerow(["patient", "drug", "frequency", "preferred_times", "breakfast", "lunch", "dinner"])
+        written, patient = 0, 0
+        while written < rows:
+            prescriptions, diet = synthetic_regimen(catalog, rng, drugs=5, diet_share=0.5)
+            patient += 1
+            text.write(f"Patient: p{patient}\n{regimen_text(prescriptions, diet)}\n")
+            for pres in prescriptions:
+                writer.writerow([f"p{patient}", pres['name'], pres['frequency'], ";".join(pres['preferred_times']),
+                                 diet.get("breakfast", ""), diet.get("lunch", ""), diet.get("dinner", "")])
+            lines.write(json.dumps({"patient": f"p{patient}", "prescriptions": prescriptions, "diet": diet}) + "\n")
+            written += len(prescriptions)
+    return paths, patient
+
+def timed(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), count
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    _, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"), os.path.join(ROOT, "data", "common_drugs.csv"))
+    catalog = get_catalog(df_drugs)
+    known = catalog.names()
+    with tempfile.TemporaryDirectory() as directory:
+        paths, patients = write_feeds(directory, catalog, rows)
+        print(f"{rows} prescriptions, {patients} patients")
+        cases = [
+            ("read text lines", lambda: sum(1 for _ in open(paths["txt"]))),
+            ("read csv lines", lambda: sum(1 for _ in open(paths["csv"], newline=""))),
+            ("text feed", lambda: sum(1 for _ in iter_patients(open(paths["txt"])))),
+            ("csv", lambda: sum(1 for _ in iter_csv_patients(open(paths["csv"], newline=""), known))),
+            ("json lines", lambda: sum(1 for _ in iter_json_patients(open(paths["jsonl"]), known, lines=True))),
+        ]
+        print(f"{'input':>16} {'seconds':>9} {'rows/s':>10}")
+        for label, fn in cases:
+            seconds, _ = timed(fn)
+            print(f"{label:>16} {seconds:>9.4f} {rows / seconds:>10.0f}")
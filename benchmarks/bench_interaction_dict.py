@@ -0,0 +1,66 @@
+"""
+Benchmark build_interaction_dict against the original row-by-row implementation
+on a synthetic interactions file (~200k rows by default).
+
+    python benchmarks/bench_interaction_dict.py [rows]
+"""
+import os, random, sys, time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from utils import build_interaction_dict
+
+TEMPLATES = [
+    "The risk or severity of adverse effects can be increased when {a} is combined with {b}.",
+    "The therapeutic efficacy of {a} can be decreased when used in combination with {b}.",
+    "{a} may increase the hypoglycemic activities of {b}.",
+    "{a} may decrease the excretion rate of {b} which could result in a higher serum level.",
+]
+
+def iterrows_build_interaction_dict(df_db_interactions):
+    """ Reference implementation: the original iterrows() loop. """
+    df_db_interactions['Drug 1'] = df_db_interactions['Drug 1'].str.title()
+    df_db_interactions['Drug 2'] = df_db_interactions['Drug 2'].str.title()
+
+    risk_phrase = "the risk or severity of adverse effects can be increased when"
+    undesirable_phrase = "therapeutic efficacy of"
+
+    interactions = {}
+    for _, row in df_db_interactions.iterrows():
+        dA, dB = row['Drug 1'], row['Drug 2']
+        pair = tuple(sorted([dA, dB]))
+        desc = row['Interaction Description']
+        desc_lower = desc.lower()
+        interactions[pair] = {
+            "risk": 1 if risk_phrase in desc_lower else 0,
+            "undesirable": 1 if undesirable_phrase in desc_lower else 0,
+            "description": desc
+        }
+    return interactions
+
+def synthetic_interactions(rows, n_drugs=2000, seed=0):
+    rng = random.Random(seed)
+    names = [f"drug{i:05d}" for i in range(n_drugs)]
+    data = {"Drug 1": [], "Drug 2": [], "Interaction Description": []}
+    for _ in range(rows):
+        a, b = rng.sample(names, 2)
+        data["Drug 1"].append(a)
+        data["Drug 2"].append(b)
+        data["Interaction Description"].append(rng.choice(TEMPLATES).format(a=a.title(), b=b.title()))
+    return pd.DataFrame(data)
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df.copy())
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    df = synthetic_interactions(rows)
+    reference, t_ref = timed(iterrows_build_interaction_dict, df)
+    vectorized, t_vec = timed(build_interaction_dict, df)
+    assert list(reference.items()) == list(vectorized.items()), "vectorized mapping differs from the reference"
+    print(f"rows: {rows}, unique pairs: {len(vectorized)}")
+    print(f"iterrows:   {t_ref:8.3f} s")
+    print(f"vectorized: {t_vec:8.3f} s")
+    print(f"speedup:    {t_ref / t_vec:8.1f}x")
@@ -0,0 +1,52 @@
+"""
+Memory and lookup cost of the interaction store (interaction_store.InteractionStore) against the
+interaction dict wrapped in an InteractionGraph, as held by every worker before, on a synthetic
+interactions file (~200k rows by default, see bench_interaction_dict.py). Memory is what
+tracemalloc sees still allocated once each structure is built from the same interaction table;
+the dict shares the table's description strings, so their size is only counted for the store.
+
+    python benchmarks/bench_interaction_store.py [rows]
+"""
+import gc, os, random, sys, time, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from utils import interaction_table
+from interaction_graph import InteractionGraph
+from interaction_store import InteractionStore
+from bench_interaction_dict import synthetic_interactions
+
+def dict_graph(table):
+    keys = zip(table["first"].tolist(), table["second"].tolist())
+    values = zip(table["risk"].tolist(), table["undesirable"].tolist(), table["description"].tolist())
+    return InteractionGraph({key: {"risk": r, "undesirable": u, "description": d} for key, (r, u, d) in zip(keys, values)})
+
+def retained(build, table):
+    """ (structure, bytes still allocated after building it, seconds) """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    structure = build(table)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, size, seconds
+
+def lookups(graph, regimens):
+    start = time.perf_counter()
+    found = sum(len(graph.pairs_among(drugs)) for drugs in regimens)
+    return time.perf_counter() - start, found
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    table = interaction_table(synthetic_interactions(rows))
+    print(f"rows: {rows}, unique pairs: {len(table)}")
+    rng = random.Random(0)
+    print(f"{'structure':>16} {'MB':>8} {'bytes/pair':>11} {'build s':>8} {'10-drug lookups/s':>18}")
+    for label, build in (("dict + graph", dict_graph), ("store", InteractionStore.from_table)):
+        graph, size, seconds = retained(build, table)
+        names = graph.drugs()
+        regimens = [rng.sample(names, 10) for _ in range(2000)]
+        lookup, found = lookups(graph, regimens)
+        print(f"{label:>16} {size / 1e6:>8.1f} {size / len(table):>11.0f} {seconds:>8.3f} {len(regimens) / lookup:>18.0f}")
+        del graph
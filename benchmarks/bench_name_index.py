@@ -0,0 +1,62 @@
+"""
+Latency of drug-name suggestions (name_index.NameIndex): index build time and the median and
+99th percentile suggest() time for misspelled queries, over the real drug vocabulary and over NAMES
+synthetic names (default 5000) added to it, the size of a full formulary.
+
+    python benchmarks/bench_name_index.py [names]
+"""
+import os, random, statistics, string, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from name_index import NameIndex
+from utils import load_data, get_catalog, build_interaction_dict
+from interaction_graph import as_interaction_graph
+
+SYLLABLES = ["am", "bu", "cef", "da", "dox", "ep", "flu", "ga", "hy", "ib", "lo", "met", "mo", "na", "ol",
+             "pra", "pro", "ri", "sar", "ta", "tri", "va", "xa", "zo"]
+SUFFIXES = ["mab", "pril", "sartan", "olol", "statin", "azole", "cillin", "mycin", "pine", "dronate", "tide", "vir"]
+
+def synthetic_names(count, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) + rng.choice(SUFFIXES)).title())
+    return sorted(names)
+
+def misspell(name, rng):
+    """ `name` with one character dropped, doubled, swapped with the next one or replaced. """
+    i = rng.randrange(len(name) - 1)
+    edit = rng.randrange(4)
+    if edit == 0:
+        return name[:i] + name[i + 1:]
+    if edit == 1:
+        return name[:i] + name[i] + name[i:]
+    if edit == 2:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+def measure(index, names, queries=2000, seed=0):
+    rng = random.Random(seed)
+    samples = [misspell(rng.choice(names), rng) for _ in range(queries)]
+    times = []
+    for query in samples:
+        start = time.perf_counter()
+        index.suggest(query)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99)]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"), os.path.join(ROOT, "data", "common_drugs.csv"))
+    catalog = get_catalog(df_drugs)
+    vocabulary = as_interaction_graph(build_interaction_dict(df_interactions)).drugs()
+    extra = synthetic_names(count)
+    print(f"{'vocabulary':>12} {'names':>7} {'build ms':>9} {'median ms':>10} {'p99 ms':>8}")
+    for label, other in (("real", vocabulary), (f"+{count}", list(vocabulary) + extra)):
+        start = time.perf_counter()
+        index = NameIndex.from_catalog(catalog, other)
+        build = time.perf_counter() - start
+        median, p99 = measure(index, sorted(catalog.names()) + (extra if other is not vocabulary else []))
+        print(f"{label:>12} {len(index):>7} {build * 1000:>9.2f} {median * 1000:>10.3f} {p99 * 1000:>8.3f}")
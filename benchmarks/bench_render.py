@@ -0,0 +1,65 @@
+"""
+Bulk export of COUNT synthetic schedules (default 10000) through one render.ScheduleWriter per
+format, next to the previous way of writing them: wrapping every warning with textwrap for each
+dose and writing line by line, as save_schedule_to_file did per schedule.
+
+    python benchmarks/bench_render.py [count]
+"""
+import io, os, random, sys, textwrap, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from render import ScheduleWriter, EXPORT_FORMATS
+from utils import load_data, get_catalog
+
+def synthetic_schedules(catalog, count, seed=0):
+    rng = random.Random(seed)
+    names = sorted(catalog.names())
+    times = [f"{h:02d}:00" for h in range(6, 23)]
+    schedules = []
+    for _ in range(count):
+        schedule = {}
+        for drug in rng.sample(names, 6):
+            for t in rng.sample(times, rng.randint(1, 3)):
+                schedule.setdefault(t, []).append(drug)
+        schedules.append(dict(sorted(schedule.items())))
+    return schedules
+
+def per_call_text(schedules, catalog, out):
+    warnings_map = catalog.warnings_map()
+    for schedule in schedules:
+        out.write("Medication Schedule\n")
+        out.write("=" * 20 + "\n")
+        for t, drugs in schedule.items():
+            out.write(f"\nTime: {t}\n")
+            out.write(f"Drugs: {', '.join(drugs)}\n")
+            out.write("Warnings:\n")
+            for d in drugs:
+                wrapped = textwrap.wrap(warnings_map.get(d.title(), "None"), width=60) or ["None"]
+                out.write(f"  {d.title()}: {wrapped[0]}\n")
+                for line in wrapped[1:]:
+                    out.write(f"    {line}\n")
+            out.write("\n")
+
+def writer_export(schedules, catalog, out, fmt):
+    with ScheduleWriter(out, fmt, catalog) as writer:
+        for patient, schedule in enumerate(schedules):
+            writer.add(schedule, f"p{patient}")
+
+def timed(fn, *args):
+    out = io.StringIO()
+    start = time.perf_counter()
+    fn(*args, out)
+    return time.perf_counter() - start, out.tell()
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    _, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"), os.path.join(ROOT, "data", "common_drugs.csv"))
+    catalog = get_catalog(df_drugs)
+    schedules = synthetic_schedules(catalog, count)
+    print(f"{count} schedules")
+    print(f"{'output':>18} {'seconds':>9} {'schedules/s':>12} {'MB':>7}")
+    cases = [("txt, per call", per_call_text, ())] + [(f"{fmt}, writer", writer_export, (fmt,)) for fmt in EXPORT_FORMATS]
+    for label, fn, extra in cases:
+        seconds, size = timed(lambda s, c, out: fn(s, c, out, *extra), schedules, catalog)
+        print(f"{label:>18} {seconds:>9.3f} {count / seconds:>12.0f} {size / 1e6:>7.1f}")
@@ -0,0 +1,69 @@
+"""
+Re-planning after a regimen change against solving the new regimen from scratch, on synthetic
+regimens (see bench_formulations.py): each change removes one drug and adds one that interacts
+with a drug still prescribed. Reports the solve times, the doses moved from the previous schedule
+and the soft-constraint penalty of both schedules (moves left out).
+
+    python benchmarks/bench_replan.py [sizes...]
+"""
+import contextlib, io, os, random, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from utils import (load_data, build_interaction_dict, get_catalog, solve_schedule, replan_schedule, apply_delta,
+                   previous_dose_slots, count_moved, SolverConfig)
+from interaction_graph import InteractionGraph
+from bench_formulations import synthetic_prescriptions, thin_interactions, INTERACTION_DENSITY, DIET
+
+CHANGES = 5  # changes per regimen size
+
+def solve(prescriptions, interactions, catalog, formulation):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = solve_schedule(prescriptions, interactions, catalog, DIET, formulation=formulation,
+                                solver_config=SolverConfig(gap=0))
+    return time.perf_counter() - start, result
+
+def replan(previous, prescriptions, add, remove, interactions, catalog, formulation):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, result = replan_schedule(previous.schedule, prescriptions, interactions, catalog, DIET, add, remove,
+                                    formulation=formulation, solver_config=SolverConfig(gap=0))
+    return time.perf_counter() - start, result
+
+def changes(prescriptions, interactions, rng, count):
+    """ (add, remove) deltas: drop a random drug, add a new partner of another one. """
+    names = [pres['name'] for pres in prescriptions]
+    for _ in range(count):
+        removed = rng.choice(names)
+        kept = [name for name in names if name != removed]
+        partners = sorted({other for name in kept for other in interactions.neighbors(name)} - set(names))
+        added = {"name": rng.choice(partners), "frequency": rng.choice((1, 2, 3)), "preferred_times": []}
+        yield [added], [removed]
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 30, 60]
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(thin_interactions(build_interaction_dict(df_interactions), INTERACTION_DENSITY))
+    catalog = get_catalog(df_drugs)
+    rng = random.Random(0)
+
+    print(f"{'size':>5} {'formulation':>12} {'cold s':>8} {'replan s':>9} {'speedup':>8} "
+          f"{'moved cold':>11} {'moved replan':>13} {'penalty cold':>13} {'penalty replan':>15}")
+    for size in sizes:
+        prescriptions = synthetic_prescriptions(catalog, size)
+        for formulation in ("boolean", "integer"):
+            _, base = solve(prescriptions, interactions, catalog, formulation)
+            totals = [0.0, 0.0, 0, 0, 0, 0]
+            for add, remove in changes(prescriptions, interactions, rng, CHANGES):
+                updated = apply_delta(prescriptions, add, remove)
+                previous = previous_dose_slots(base.schedule, updated)
+                cold_time, cold = solve(updated, interactions, catalog, formulation)
+                replan_time, replanned = replan(base, prescriptions, add, remove, interactions, catalog, formulation)
+                cold_moved = count_moved(previous_dose_slots(cold.schedule, updated), previous)
+                for k, value in enumerate((cold_time, replan_time, cold_moved, replanned.moved, cold.penalty, replanned.penalty)):
+                    totals[k] += value
+            cold_time, replan_time, cold_moved, replan_moved, cold_penalty, replan_penalty = totals
+            print(f"{size:>5} {formulation:>12} {cold_time:>8.3f} {replan_time:>9.3f} {cold_time / replan_time:>7.1f}x "
+                  f"{cold_moved:>11} {replan_moved:>13} {cold_penalty:>13} {replan_penalty:>15}")
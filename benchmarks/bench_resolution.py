@@ -0,0 +1,30 @@
+"""
+Model size and solve time of both formulations as the slot resolution gets finer
+(60, 30, 15 and 5 minute slots) for a fixed synthetic regimen.
+
+    python benchmarks/bench_resolution.py [prescriptions]
+"""
+import os, sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from utils import load_data, build_interaction_dict, get_catalog
+from interaction_graph import InteractionGraph
+from bench_formulations import synthetic_prescriptions, thin_interactions, run, INTERACTION_DENSITY
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    df_interactions, df_drugs = load_data(os.path.join(ROOT, "data", "common_interactions.csv"),
+                                          os.path.join(ROOT, "data", "common_drugs.csv"))
+    interactions = InteractionGraph(thin_interactions(build_interaction_dict(df_interactions), INTERACTION_DENSITY))
+    catalog = get_catalog(df_drugs)
+    prescriptions = synthetic_prescriptions(catalog, size)
+
+    print(f"{size} prescriptions")
+    print(f"{'minutes':>7} {'formulation':>12} {'vars':>7} {'constrs':>8} {'build s':>9} {'solve s':>9} {'penalty':>8}  status")
+    for resolution in (60, 30, 15, 5):
+        for formulation in ("boolean", "integer"):
+            r = run(formulation, prescriptions, interactions, catalog, resolution)
+            check = "" if r["errors"] is None else ("valid" if not r["errors"] else f"INVALID: {r['errors'][:3]}")
+            print(f"{resolution:>7} {formulation:>12} {r['variables']:>7} {r['constraints']:>8} "
+                  f"{r['build']:>9.4f} {r['solve']:>9.4f} {str(r['penalty']):>8}  {r['status']} {check}")
@@ -0,0 +1,37 @@
+"""
+Latency of one prescription through a fresh `main.py --batch` process (imports, dataset loading,
+solve) versus a request to a warm ScheduleService, for every sample input. The service is
+called in-process, so the numbers leave out the HTTP/socket round trip (about a millisecond).
+
+    python benchmarks/bench_server.py
+"""
+import contextlib, glob, io, os, subprocess, sys, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from server import ScheduleService
+
+def cold_run(path):
+    with tempfile.TemporaryDirectory() as manifest_dir:
+        manifest = os.path.join(manifest_dir, "manifest.lst")
+        with open(manifest, "w") as f:
+            f.write(os.path.abspath(path) + "\n")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join("src", "main.py"), "--batch", manifest, "-j", "1"],
+                       cwd=ROOT, check=True, capture_output=True)
+        return time.perf_counter() - start
+
+if __name__ == "__main__":
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    with contextlib.redirect_stderr(io.StringIO()):
+        service = ScheduleService(workers=1, cache_size=0)
+    print(f"service start-up, after imports (once): {time.perf_counter() - start:.3f}s")
+    print(f"{'input':>12} {'process s':>10} {'service s':>10} {'solve s':>9}")
+    for path in sorted(glob.glob(os.path.join(ROOT, "inputs", "*.txt"))):
+        with open(path) as f:
+            request = {"input": f.read()}
+        start = time.perf_counter()
+        response = service.submit(request).result()
+        warm = time.perf_counter() - start
+        print(f"{os.path.basename(path):>12} {cold_run(path):>10.3f} {warm:>10.4f} {response.get('wall_time', 0):>9.4f}")
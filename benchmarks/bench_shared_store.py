@@ -0,0 +1,67 @@
+"""
+Per-worker cost of getting the interaction data into a fresh worker process (spawned, so nothing
+is inherited), on a synthetic interactions file (~200k rows by default, see
+bench_interaction_dict.py):
+
+- reload: the worker reads the CSV and builds the interaction dict itself
+- pickled store: the worker receives a copy of an in-memory InteractionStore
+- attached store: the worker receives a published store and memory-maps it (interaction_store.py)
+
+Each worker then runs a thousand 10-drug lookups and reports the time it took to get the data and
+the private (anonymous) memory it added; mapped pages are shared with every other process.
+
+    python benchmarks/bench_shared_store.py [rows]
+"""
+import multiprocessing, os, pickle, random, sys, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils import load_data, interaction_table, build_interaction_dict
+from interaction_graph import InteractionGraph
+from interaction_store import InteractionStore
+from bench_interaction_dict import synthetic_interactions
+
+def rss_kb(field):
+    """ A memory field of /proc/self/status (RssAnon, RssFile, RssShmem), in kB. """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+def worker(mode, payload):
+    private, shared = rss_kb("RssAnon"), rss_kb("RssFile") + rss_kb("RssShmem")
+    start = time.perf_counter()
+    if mode == "reload":
+        df_interactions, _ = load_data(payload, os.path.join(ROOT, "data", "common_drugs.csv"))
+        graph = InteractionGraph(build_interaction_dict(df_interactions))
+    else:
+        graph = pickle.loads(payload)  # a copy of the arrays, or a mapping of the published file
+    seconds = time.perf_counter() - start
+    rng = random.Random(0)
+    names = graph.drugs()
+    for _ in range(1000):
+        graph.pairs_among(rng.sample(names, 10))
+    return seconds, rss_kb("RssAnon") - private, rss_kb("RssFile") + rss_kb("RssShmem") - shared
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "interactions.csv")
+        synthetic_interactions(rows).to_csv(csv_path, index=False)
+        df_interactions, _ = load_data(csv_path, os.path.join(ROOT, "data", "common_drugs.csv"))
+        store = InteractionStore.from_table(interaction_table(df_interactions))
+        published = store.publish()
+        print(f"rows: {rows}, pairs: {len(store)}, store file: {store.nbytes() / 1e6:.1f} MB")
+        print(f"{'worker gets':>16} {'seconds':>8} {'private MB':>11} {'shared MB':>10}")
+        try:
+            for mode, payload in (("reload", csv_path), ("pickled store", pickle.dumps(store)),
+                                  ("attached store", pickle.dumps(published))):
+                with ctx.Pool(1) as pool:
+                    pool.apply(len, ((),))  # start the worker before timing
+                    seconds, private, shared = pool.apply(worker, (mode, payload))
+                print(f"{mode:>16} {seconds:>8.3f} {private / 1e3:>11.1f} {shared / 1e3:>10.1f}")
+        finally:
+            os.unlink(published.path)
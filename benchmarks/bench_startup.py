@@ -0,0 +1,63 @@
+"""
+Start-up cost of the command-line entry points, each measured in a fresh interpreter:
+- cold: empty bytecode cache (every module is compiled, as after an install or an upgrade);
+- warm: bytecode cache filled by a previous run (the usual case).
+Also reports which heavy dependencies each path ends up importing. With --budget SECONDS the
+script exits with status 1 when the warm `--check` start-up exceeds it, or when that path loads
+pandas or OR-Tools, so it can guard against import regressions.
+
+    python benchmarks/bench_startup.py [--runs N] [--budget SECONDS]
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY = ("pandas", "numpy", "ortools")
+
+# (label, code run in the fresh interpreter with src/ on the path)
+CASES = [
+    ("import main", "import main"),
+    ("--help", "import runpy, sys; sys.argv = ['main.py', '--help']\n"
+               "try: runpy.run_path('src/main.py', run_name='__main__')\nexcept SystemExit: pass"),
+    ("--check", "import runpy, sys; sys.argv = ['main.py', '--check', 'inputs/input.txt']\n"
+                "try: runpy.run_path('src/main.py', run_name='__main__')\nexcept SystemExit: pass"),
+    ("solve", "import main\nm = main.MedicationScheduleOptimizer(cache_size=0, greedy=False)\nm.load_and_prepare_data()\n"
+              "m.parse_input_prescriptions(input_str=open('inputs/input1.txt').read())\nm.solve()"),
+]
+
+REPORT = "\nimport json, sys as _sys\n_sys.__stdout__.write('\\n' + json.dumps(sorted(m for m in {heavy!r} if m in _sys.modules)))"
+
+def run_case(code, pycache_prefix):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache_prefix, PYTHONPATH=os.path.join(ROOT, "src"))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # the warm runs need the bytecode written by the cold one
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code + REPORT.format(heavy=HEAVY)], cwd=ROOT, env=env,
+                         check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - start, json.loads(out.strip().splitlines()[-1])
+
+def measure(code, runs):
+    cold, warm = [], []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as prefix:
+            elapsed, loaded = run_case(code, prefix)
+            cold.append(elapsed)
+            warm.append(run_case(code, prefix)[0])
+    return statistics.median(cold), statistics.median(warm), loaded
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--budget", type=float, default=None, metavar="SECONDS")
+    args = arg_parser.parse_args()
+
+    baseline = measure("pass", args.runs)[1]
+    print(f"bare interpreter: {baseline:.3f}s (median of {args.runs})")
+    print(f"{'path':>12} {'cold s':>8} {'warm s':>8}  heavy modules loaded")
+    failed = False
+    for label, code in CASES:
+        cold, warm, loaded = measure(code, args.runs)
+        print(f"{label:>12} {cold:>8.3f} {warm:>8.3f}  {', '.join(loaded) or '-'}")
+        if label == "--check" and args.budget is not None and (warm > args.budget or loaded):
+            failed = True
+    if failed:
+        print(f"FAIL: the --check start-up exceeds {args.budget}s or loads heavy dependencies")
+        sys.exit(1)
@@ -0,0 +1,138 @@
+"""
+Benchmark suite over synthetic regimens (see synthetic.py), timing each stage of the pipeline
+separately: data load, interaction-dict build, then per scenario parse, model build, solve and
+render. Every scenario runs `--repeat` times and the median is kept.
+
+With --save the results become the baseline (benchmarks/baselines.json by default). Otherwise
+they are compared with the stored baseline and the script exits with status 1 when a stage got
+slower than the baseline by more than --threshold (relative) and --min-delta seconds (absolute,
+so that sub-millisecond stages do not fail on noise). Baselines depend on the machine: save one
+before comparing.
+
+    python benchmarks/bench_suite.py [--scenario NAME ...] [--repeat N] [--save] [--threshold 0.25]
+"""
+import argparse, contextlib, io, json, os, platform, statistics, sys, time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from parser import parse_prescriptions
+from utils import load_data, build_interaction_dict, get_catalog, solve_schedule, print_schedule, SolverConfig
+from interaction_graph import InteractionGraph
+from telemetry import Telemetry
+from synthetic import synthetic_regimens, thin_interactions, regimen_text
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+INTERACTIONS_CSV = os.path.join(ROOT, "data", "common_interactions.csv")
+DRUGS_CSV = os.path.join(ROOT, "data", "common_drugs.csv")
+
+# name: regimen count, interaction density and synthetic_regimen parameters
+SCENARIOS = {
+    "small": {"count": 100, "density": 0.2, "drugs": 5},
+    "medium": {"count": 20, "density": 0.2, "drugs": 20},
+    "large": {"count": 5, "density": 0.05, "drugs": 60},
+    "dense": {"count": 10, "density": 1.0, "drugs": 10},
+    "food": {"count": 10, "density": 0.2, "drugs": 10, "food_share": 0.8, "diet_share": 0.5},
+    "preferences": {"count": 10, "density": 0.2, "drugs": 15, "preferred_share": 1.0, "frequency_mix": (1, 1, 2)},
+}
+STAGES = ("parse", "build_model", "solve", "render")
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def measure_data(repeat):
+    loads, builds = [], []
+    for _ in range(repeat):
+        load, (df_interactions, df_drugs) = timed(load_data, INTERACTIONS_CSV, DRUGS_CSV)
+        build, interactions = timed(build_interaction_dict, df_interactions)
+        loads.append(load)
+        builds.append(build)
+    return {"load_data": statistics.median(loads), "build_interaction_dict": statistics.median(builds)}, \
+        interactions, get_catalog(df_drugs)
+
+def run_scenario(texts, interactions, catalog):
+    """ Seconds per stage over all the regimens, plus the statuses and total penalty as a sanity check. """
+    stages = dict.fromkeys(STAGES, 0.0)
+    statuses, penalty = {}, 0
+    for text in texts:
+        start = time.perf_counter()
+        prescriptions, diet = parse_prescriptions(text)
+        for pres in prescriptions:
+            pres['name'] = pres['name'].title()
+        stages["parse"] += time.perf_counter() - start
+        # greedy off so every regimen goes through model build and search; one worker keeps timings steady
+        telemetry = Telemetry()
+        result = solve_schedule(prescriptions, interactions, catalog, diet, greedy=False, telemetry=telemetry,
+                                solver_config=SolverConfig(workers=1, seed=0, max_time=30))
+        phases = telemetry.to_dict()["phases"]
+        stages["build_model"] += phases.get("build_model", {}).get("wall", 0.0)
+        stages["solve"] += phases.get("cp_sat", {}).get("wall", 0.0)
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+        penalty += result.penalty
+        if result.schedule:
+            start = time.perf_counter()
+            print_schedule(result.schedule, catalog)
+            stages["render"] += time.perf_counter() - start
+    return stages, statuses, penalty
+
+def measure_scenario(spec, interactions, catalog, repeat, seed):
+    params = {k: v for k, v in spec.items() if k not in ("count", "density")}
+    thinned = InteractionGraph(thin_interactions(interactions, spec["density"], seed))
+    texts = [regimen_text(*regimen) for regimen in synthetic_regimens(catalog, spec["count"], seed, **params)]
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            runs.append(run_scenario(texts, thinned, catalog))
+    stages = {stage: statistics.median(run[0][stage] for run in runs) for stage in STAGES}
+    return stages, runs[0][1], runs[0][2]
+
+def compare(results, baseline, threshold, min_delta):
+    """ Lines describing the stages slower than their baseline beyond both limits. """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(scenario, {}).get(stage)
+            if before is not None and seconds > before * (1 + threshold) and seconds - before > min_delta:
+                regressions.append(f"{scenario}/{stage}: {seconds:.4f}s vs {before:.4f}s ({seconds / before - 1:+.0%})")
+    return regressions
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE, metavar="FILE")
+    arg_parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    arg_parser.add_argument("--min-delta", type=float, default=0.005, metavar="SECONDS",
+                            help="slowdowns smaller than this are never reported")
+    args = arg_parser.parse_args()
+
+    data, interactions, catalog = measure_data(args.repeat)
+    results = {"data": data}
+    print(f"load_data {data['load_data']:.4f}s, build_interaction_dict {data['build_interaction_dict']:.4f}s")
+    print(f"{'scenario':>12} " + " ".join(f"{stage + ' s':>13}" for stage in STAGES) + "  statuses, penalty")
+    for name in args.scenario:
+        stages, statuses, penalty = measure_scenario(SCENARIOS[name], interactions, catalog, args.repeat, args.seed)
+        results[name] = stages
+        print(f"{name:>12} " + " ".join(f"{stages[stage]:>13.4f}" for stage in STAGES) +
+              f"  {', '.join(f'{n} {s}' for s, n in sorted(statuses.items()))}, {penalty}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "seed": args.seed,
+                       "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save to create one.")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold, args.min_delta)
+        if regressions:
+            print(f"FAIL: {len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"OK: no stage slower than the baseline by more than {args.threshold:.0%}")
@@ -0,0 +1,43 @@
+"""
+Cost of the telemetry layer: the whole parse-and-solve pipeline over the sample inputs with
+telemetry disabled and enabled, with the result cache off so every run solves. Also times one
+phase() block of each kind on its own.
+
+    python benchmarks/bench_telemetry.py [rounds]
+"""
+import contextlib, glob, io, os, statistics, sys, time, timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from main import MedicationScheduleOptimizer
+from telemetry import Telemetry, NO_TELEMETRY
+
+def pipeline_time(inputs, telemetry):
+    optimizer = MedicationScheduleOptimizer(cache_size=0, telemetry=telemetry)
+    optimizer.load_and_prepare_data()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for input_str in inputs:
+            optimizer.parse_input_prescriptions(input_str=input_str)
+            optimizer.solve()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    os.chdir(ROOT)
+    inputs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "inputs", "*.txt"))):
+        with open(path) as f:
+            inputs.append(f.read())
+    pipeline_time(inputs, False)  # warm-up: imports and solver initialisation
+
+    for label, telemetry in (("disabled", NO_TELEMETRY), ("enabled", Telemetry())):
+        n = 100000
+        per_block = timeit.timeit("with telemetry.phase('x'): pass", globals={"telemetry": telemetry}, number=n) / n
+        print(f"phase() block, {label}: {per_block * 1e9:.0f} ns")
+
+    off = statistics.median(pipeline_time(inputs, False) for _ in range(rounds))
+    on = statistics.median(pipeline_time(inputs, True) for _ in range(rounds))
+    print(f"{len(inputs)} inputs, median of {rounds} rounds:")
+    print(f"  telemetry disabled: {off:.4f}s")
+    print(f"  telemetry enabled:  {on:.4f}s ({(on - off) / off:+.1%})")
@@ -0,0 +1,74 @@
+"""
+Synthetic regimens drawn from the bundled datasets, shared by the benchmarks. The knobs:
+- drugs: prescriptions per regimen (names repeat once the catalog is exhausted);
+- frequency_mix: relative weights of once, twice and thrice daily;
+- preferred_share: share of prescriptions with preferred times of day;
+- food_share: share of prescriptions drawn from drugs that must be taken with or without food
+  (None draws from the whole catalog);
+- diet_share: share of regimens with their own meal times instead of the defaults;
+- interaction density: share of the dataset's interaction pairs kept (thin_interactions); the full
+  set of risky pairs makes large regimens infeasible.
+"""
+import random
+
+TIMES_OF_DAY = ("morning", "afternoon", "evening")
+FREQUENCY_WORDS = {1: "once", 2: "twice", 3: "thrice"}
+# hours the validator accepts for each meal
+MEAL_HOURS = {"breakfast": range(6, 12), "lunch": range(13, 18), "dinner": range(18, 23)}
+
+def thin_interactions(interactions, density, seed=0):
+    """ The interaction dictionary with a random `density` share of its pairs. """
+    rng = random.Random(seed)
+    return {pair: interaction for pair, interaction in interactions.items() if rng.random() < density}
+
+def draw_names(rng, pool, count):
+    if count <= len(pool):
+        return rng.sample(pool, count)
+    return [rng.choice(pool) for _ in range(count)]
+
+def synthetic_regimen(catalog, rng, drugs=10, frequency_mix=(2, 1, 1), preferred_share=0.5, food_share=None,
+                      diet_share=0.0):
+    """ (prescriptions, diet) of one random regimen, see the module docstring for the parameters. """
+    names = sorted(record.key for record in catalog)
+    if food_share is None:
+        picked = draw_names(rng, names, drugs)
+    else:
+        food = [r.key for r in catalog if r.requires_food or r.requires_no_food]
+        plain = [r.key for r in catalog if not (r.requires_food or r.requires_no_food)]
+        with_food = sum(rng.random() < food_share for _ in range(drugs))
+        picked = draw_names(rng, food, with_food) + draw_names(rng, plain, drugs - with_food)
+        rng.shuffle(picked)
+
+    prescriptions = []
+    for name in picked:
+        frequency = rng.choices((1, 2, 3), weights=frequency_mix)[0]
+        preferred = []
+        if rng.random() < preferred_share:
+            # either one time of day for every dose or one per dose, the two forms the parser accepts
+            preferred = sorted(rng.sample(TIMES_OF_DAY, rng.choice((1, frequency))), key=TIMES_OF_DAY.index)
+        prescriptions.append({"name": name, "frequency": frequency, "preferred_times": preferred})
+    diet = {}
+    if rng.random() < diet_share:
+        diet = {meal: f"{rng.choice(hours):02d}:00" for meal, hours in MEAL_HOURS.items()}
+    return prescriptions, diet
+
+def synthetic_regimens(catalog, count, seed=0, **params):
+    """ `count` regimens from synthetic_regimen, reproducible for a given seed. """
+    rng = random.Random(seed)
+    return [synthetic_regimen(catalog, rng, **params) for _ in range(count)]
+
+def regimen_text(prescriptions, diet):
+    """ A regimen in the input file format, for the benchmarks that go through the parser. """
+    lines = []
+    for pres in prescriptions:
+        line = f"{pres['name']}: {FREQUENCY_WORDS[pres['frequency']]} daily"
+        if pres['preferred_times']:
+            line += f" ({', '.join(pres['preferred_times'])})"
+        lines.append(line)
+    if diet:
+        meals = []
+        for meal, t in diet.items():
+            hour = int(t[:2])
+            meals.append(f"{meal} {hour % 12 or 12} {'am' if hour < 12 else 'pm'}")
+        lines.append(f"Diet: {'; '.join(meals)}")
+    return "\n".join(lines)
@@ -0,0 +1,232 @@
+"""
+Bulk audit of published schedules, independent of the solver. Every scheduled dose of a batch is
+one row of three int32 arrays (patient, minute of the day, drug id): the non-zero entries of each
+patient's slot-by-drug incidence matrix, kept sparse since a patient takes a handful of drugs out
+of the whole vocabulary. Every rule is then checked for all patients at once with array
+operations, and only the violations are turned into Python objects:
+
+- missing / extra: a prescribed drug with fewer or more doses than its frequency, or a drug
+  scheduled without being prescribed;
+- food / no_food: a drug taken with food at a time that is not a meal, or without food at a meal;
+- window: a dose outside the day (06:00 - 22:00) that is not at a meal;
+- spacing: two doses of a drug less than MIN_DOSE_GAP_MINUTES apart;
+- risk: a risky pair in the same slot;
+- preference, undesirable (soft): a dose outside its preferred time of day, an undesirable pair in
+  the same slot.
+
+A drug prescribed more than once in a regimen is only checked for its total number of doses, since
+a schedule does not tell its prescriptions apart.
+"""
+import json, sys
+from array import array
+import numpy as np
+from utils import MIN_DOSE_GAP_MINUTES, DEFAULT_MEAL_TIMES, get_catalog, time_to_minutes, minutes_to_time
+from interaction_graph import as_interaction_graph
+
+SOFT_RULES = ("preference", "undesirable")
+TIME_OF_DAY_BITS = {"morning": 1, "afternoon": 2, "evening": 4}
+# minutes of each time of day, as in utils.get_time_preferences
+TIME_OF_DAY_MINUTES = ((1, 6 * 60, 12 * 60), (2, 12 * 60 + 1, 17 * 60 + 59), (4, 18 * 60, 22 * 60))
+DAY_START, DAY_END = 6 * 60, 22 * 60
+# NTH_BIT[mask, k]: the k-th time of day (in day order) of a preferred-times mask, 0 if it has fewer
+NTH_BIT = np.array([[bits[k] if k < len(bits) else 0 for k in range(3)]
+                    for bits in ([b for b in (1, 2, 4) if mask & b] for mask in range(8))], dtype=np.int32)
+
+class Finding:
+    """ One broken rule of one patient's schedule: the rule, the drugs and time involved, and a readable message. """
+    __slots__ = ("patient", "rule", "drugs", "time", "message")
+
+    def __init__(self, patient, rule, drugs, time, message):
+        self.patient = patient
+        self.rule = rule
+        self.drugs = drugs
+        self.time = time
+        self.message = message
+
+    @property
+    def soft(self):
+        return self.rule in SOFT_RULES
+
+    def to_dict(self):
+        return {"patient": self.patient, "rule": self.rule, "drugs": self.drugs, "time": self.time,
+                "message": self.message}
+
+    def __repr__(self):
+        return f"Finding({self.patient!r}, {self.rule!r}, {self.message!r})"
+
+class ScheduleAudit:
+    """
+    Collects the schedules of a batch with add() (kept as compact typed arrays, about 12 bytes per
+    dose) and checks them all in one pass with run(). `interactions` and `drug_data` are the
+    datasets the schedules were made from; `interactions` may also be a function returning the
+    interactions among the drug names it is given (e.g. InteractionDatabase.interactions_for).
+    """
+    def __init__(self, interactions, drug_data):
+        self.interactions = interactions
+        self.catalog = get_catalog(drug_data)
+        self.patients = []
+        self._drug_ids = {}
+        self._minutes = {}  # "HH:MM" -> minutes, parsed once per distinct time
+        self._doses = (array("i"), array("i"), array("i"))  # patient, minute, drug
+        self._prescribed = (array("i"), array("i"), array("i"), array("i"))  # patient, drug, frequency, preference flags
+        self._meals = []  # per patient: tuple of meal minutes
+
+    def _drug(self, name):
+        drug_id = self._drug_ids.get(name)
+        if drug_id is None:
+            drug_id = self._drug_ids[name] = len(self._drug_ids)
+        return drug_id
+
+    def _minute(self, t):
+        minute = self._minutes.get(t)
+        if minute is None:
+            minute = self._minutes[t] = time_to_minutes(t)
+        return minute
+
+    def add(self, patient, prescriptions, diet, schedule):
+        """ Queue one patient's regimen (prescriptions, diet) and its schedule ({time: [drugs]}). """
+        p = len(self.patients)
+        self.patients.append(patient)
+        self._meals.append(tuple(self._minute(t) for t in (set(diet.values()) if diet else DEFAULT_MEAL_TIMES)))
+        drug_ids = self._drug_ids
+        pres_patient, pres_drug, pres_frequency, pres_flags = self._prescribed
+        flags = []
+        for pres in prescriptions:
+            parts = {t.lower() for t in pres.get('preferred_times') or ()} & TIME_OF_DAY_BITS.keys()
+            # one time of day per dose: dose k must be in the k-th one (see utils.get_preferred_window)
+            per_dose = 8 if parts and len(parts) == pres['frequency'] else 0
+            flags.append(sum(TIME_OF_DAY_BITS[part] for part in parts) | per_dose)
+        pres_patient.extend([p] * len(prescriptions))
+        pres_drug.extend([drug_ids[pres['name']] if pres['name'] in drug_ids else self._drug(pres['name'])
+                          for pres in prescriptions])
+        pres_frequency.extend([pres['frequency'] for pres in prescriptions])
+        pres_flags.extend(flags)
+        dose_patient, dose_minute, dose_drug = self._doses
+        for t, drugs in schedule.items():
+            dose_minute.extend([self._minute(t)] * len(drugs))
+            dose_drug.extend([drug_ids[name] if name in drug_ids else self._drug(name) for name in drugs])
+        dose_patient.extend([p] * (len(dose_minute) - len(dose_patient)))
+
+    def __len__(self):
+        return len(self.patients)
+
+    def run(self):
+        """ Findings of every queued schedule, by patient (in the order they were added) and time. """
+        names = list(self._drug_ids)
+        drug_count = max(len(names), 1)
+        patient, minute, drug = (np.frombuffer(a, dtype=np.int32) for a in self._doses)
+        pres_patient, pres_drug, pres_frequency, pres_flags = (np.frombuffer(a, dtype=np.int32) for a in self._prescribed)
+        findings = []
+
+        def report(rule, p, drugs, m, message):
+            p, m = int(p), (int(m) if m is not None else -1)
+            findings.append((p, m, Finding(self.patients[p], rule, drugs, minutes_to_time(m) if m >= 0 else None,
+                                           message)))
+
+        # Prescriptions per (patient, drug); a drug prescribed twice in a regimen sums its frequencies.
+        # A sentinel key (-1, no dose expected) keeps the arrays non-empty for the lookups below.
+        pres_keys, first, inverse, repeats = np.unique(
+            np.concatenate([[-1], pres_patient.astype(np.int64) * drug_count + pres_drug]),
+            return_index=True, return_inverse=True, return_counts=True)
+        expected = np.bincount(inverse.ravel(), weights=np.concatenate([[0], pres_frequency]),
+                               minlength=len(pres_keys)).astype(np.int64)
+        flags = np.where(repeats == 1, np.concatenate([[0], pres_flags])[first], 0)  # no per-dose checks for repeated drugs
+        mask, per_dose = flags & 7, (flags & 8) != 0
+
+        dose_keys = patient.astype(np.int64) * drug_count + drug
+        position = np.minimum(np.searchsorted(pres_keys, dose_keys), len(pres_keys) - 1)
+        prescribed = pres_keys[position] == dose_keys
+
+        # missing / extra doses
+        for key in np.unique(dose_keys[~prescribed]).tolist():
+            p, d = divmod(key, drug_count)
+            report("extra", p, [names[d]], None, f"{names[d]} is scheduled but not prescribed")
+        counts = np.bincount(position[prescribed], minlength=len(pres_keys))
+        for k in np.flatnonzero(counts != expected).tolist():
+            p, d = divmod(int(pres_keys[k]), drug_count)
+            rule = "missing" if counts[k] < expected[k] else "extra"
+            report(rule, p, [names[d]], None, f"{names[d]} has {counts[k]} doses scheduled for {expected[k]} prescribed")
+
+        # food rules and the day window, against each patient's meal times
+        meals = np.full((len(self.patients), max((len(m) for m in self._meals), default=0) or 1), -1, dtype=np.int32)
+        for p, times in enumerate(self._meals):
+            meals[p, :len(times)] = times
+        at_meal = (meals[patient] == minute[:, None]).any(axis=1)
+        requires_food = np.array([self.catalog.requires_food(name) for name in names] or [False])
+        requires_no_food = np.array([self.catalog.requires_no_food(name) for name in names] or [False])
+        for i in np.flatnonzero(requires_food[drug] & ~at_meal).tolist():
+            report("food", patient[i], [names[drug[i]]], minute[i],
+                   f"{names[drug[i]]} at {minutes_to_time(minute[i])} must be taken with a meal")
+        for i in np.flatnonzero(requires_no_food[drug] & at_meal).tolist():
+            report("no_food", patient[i], [names[drug[i]]], minute[i],
+                   f"{names[drug[i]]} at {minutes_to_time(minute[i])} must not be taken with a meal")
+        for i in np.flatnonzero(~at_meal & ((minute < DAY_START) | (minute > DAY_END))).tolist():
+            report("window", patient[i], [names[drug[i]]], minute[i],
+                   f"{names[drug[i]]} at {minutes_to_time(minute[i])} is outside the day (06:00 - 22:00)")
+
+        # spacing and preferred times, over the doses of each (patient, drug) in time order
+        order = np.lexsort((minute, dose_keys))
+        keys, times, slots = dose_keys[order], minute[order], position[order]
+        checked = prescribed[order] & (repeats[slots] == 1)
+        same = keys[1:] == keys[:-1]
+        for i in np.flatnonzero(same & checked[1:] & (times[1:] - times[:-1] < MIN_DOSE_GAP_MINUTES)).tolist():
+            d, p = drug[order[i]], patient[order[i]]
+            report("spacing", p, [names[d]], times[i + 1], f"{names[d]} doses at {minutes_to_time(times[i])} and "
+                   f"{minutes_to_time(times[i + 1])} are less than {MIN_DOSE_GAP_MINUTES} minutes apart")
+        index = np.arange(len(keys))
+        starts = np.maximum.accumulate(np.where(np.concatenate([[True], ~same]), index, 0)) if len(keys) else index
+        rank = np.minimum(index - starts, 2)
+        dose_mask, dose_per_dose = mask[slots], per_dose[slots]
+        allowed = np.where(dose_per_dose, NTH_BIT[dose_mask, rank], dose_mask)
+        part = np.zeros(len(times), dtype=np.int32)
+        for bit, low, high in TIME_OF_DAY_MINUTES:
+            part[(times >= low) & (times <= high)] = bit
+        for i in np.flatnonzero(checked & (dose_mask != 0) & ((part & allowed) == 0)).tolist():
+            d, p = drug[order[i]], patient[order[i]]
+            report("preference", p, [names[d]], times[i],
+                   f"{names[d]} dose {rank[i] + 1} at {minutes_to_time(times[i])} is outside its preferred time of day")
+
+        # risky and undesirable pairs sharing a slot: compare each dose with the next ones of its slot
+        interactions = self.interactions(names) if callable(self.interactions) else self.interactions
+        pair_kinds = {}
+        for (drug1, drug2), interaction in as_interaction_graph(interactions).pairs_among(names):
+            a, b = sorted((self._drug_ids[drug1], self._drug_ids[drug2]))
+            if interaction['risk'] == 1:
+                pair_kinds[a * drug_count + b] = 2
+            elif interaction.get('undesirable', 0) == 1:
+                pair_kinds.setdefault(a * drug_count + b, 1)
+        if pair_kinds:
+            pair_keys = np.array(sorted(pair_kinds), dtype=np.int64)
+            kinds = np.array([pair_kinds[k] for k in pair_keys.tolist()], dtype=np.int8)
+            order = np.lexsort((drug, minute, patient))
+            slot_keys = patient[order].astype(np.int64) * (24 * 60) + minute[order]
+            ordered_drugs = drug[order].astype(np.int64)
+            for step in range(1, len(order)):
+                together = np.flatnonzero(slot_keys[step:] == slot_keys[:-step])
+                if not len(together):
+                    break
+                low = np.minimum(ordered_drugs[together], ordered_drugs[together + step])
+                high = np.maximum(ordered_drugs[together], ordered_drugs[together + step])
+                keys = low * drug_count + high
+                found = np.minimum(np.searchsorted(pair_keys, keys), len(pair_keys) - 1)
+                for i in np.flatnonzero((pair_keys[found] == keys) & (low != high)).tolist():
+                    j = order[together[i]]
+                    pair = [names[low[i]], names[high[i]]]
+                    if kinds[found[i]] == 2:
+                        report("risk", patient[j], pair, minute[j],
+                               f"{pair[0]} and {pair[1]} are both scheduled at {minutes_to_time(minute[j])}")
+                    else:
+                        report("undesirable", patient[j], pair, minute[j],
+                               f"{pair[0]} and {pair[1]} (undesirable together) share {minutes_to_time(minute[j])}")
+
+        findings.sort(key=lambda found: found[:2])
+        return [finding for _, _, finding in findings]
+
+def write_findings(path, findings):
+    """ Write findings as JSON lines to `path`, or to stderr for "-". """
+    text = "".join(json.dumps(finding.to_dict()) + "\n" for finding in findings)
+    if path == "-":
+        sys.stderr.write(text)
+        return
+    with open(path, 'w') as f:
+        f.write(text)
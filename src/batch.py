@@ -0,0 +1,273 @@
+import contextlib, io, itertools, json, multiprocessing, os, sys, threading
+from main import MedicationScheduleOptimizer
+from telemetry import Telemetry, write_telemetry
+from audit import ScheduleAudit, write_findings
+from render import open_export
+from parser import iter_patients
+from structured import iter_csv_patients, iter_json_patients
+
+FEED_FORMATS = ("text", "json", "jsonl", "csv")
+
+# Per-process optimizer, set up once by _init_worker and reused for every file the worker receives
+_optimizer = None
+_audit = False  # attach the solved regimen to scheduled records, for the parent's ScheduleAudit
+
+def collect_input_files(path):
+    """
+    Resolve the batch source into a list of prescription files.
+    A directory yields all its .txt files; any other file is read as a manifest
+    with one path per line (blank lines and '#' comments are skipped).
+    """
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.txt'))
+    base_dir = os.path.dirname(os.path.abspath(path))
+    files = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            files.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return files
+
+def _init_worker(options, interactions, drug_data, index, dataset_version, audit=False):
+    global _optimizer, _audit
+    _audit = audit
+    _optimizer = MedicationScheduleOptimizer(**options)
+    _optimizer.interactions = interactions
+    _optimizer.drug_data = drug_data
+    _optimizer.index = index
+    _optimizer.dataset_version = dataset_version
+
+def schedule_file(path):
+    """ Schedule a single prescription file and return its JSON-serialisable result record. """
+    record = {"patient": os.path.splitext(os.path.basename(path))[0], "file": path}
+
+    def load():
+        with open(path, 'r') as f:
+            input_str = f.read()
+        _optimizer.parse_input_prescriptions(input_str=input_str)
+
+    return solve_record(record, load)
+
+def schedule_patient(patient):
+    """ Schedule one PatientRecord of a feed; a patient with malformed lines gets an error record listing them. """
+    record = {"patient": patient.patient or f"line-{patient.line}", "line": patient.line}
+    if patient.errors:
+        record["status"] = "error"
+        record["error"] = patient.errors[0].message
+        record["errors"] = [error.to_dict() for error in patient.errors]
+        return record
+    if not patient.prescriptions:
+        record["status"] = "error"
+        record["error"] = "No prescriptions found for this patient."
+        return record
+    return solve_record(record, lambda: _optimizer.load_regimen(patient.prescriptions, patient.diet))
+
+def solve_record(record, load):
+    """ Run `load` (which sets up the worker's optimizer), solve and fill in `record`. """
+    messages = io.StringIO()
+    if _optimizer.telemetry.enabled:
+        _optimizer.telemetry = Telemetry()  # one telemetry record per patient
+    try:
+        # The parser and validators report problems on stdout and exit, keep them out of the JSON stream
+        with contextlib.redirect_stdout(messages):
+            load()
+            result = _optimizer.solve()
+    except SystemExit:
+        record["status"] = "error"
+        record["error"] = messages.getvalue().strip() or "Invalid input."
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    else:
+        record.update(result_record(result))
+        if _audit and result.schedule is not None:
+            record["regimen"] = {"prescriptions": _optimizer.prescriptions, "diet": _optimizer.diet}
+        if _optimizer.corrections:
+            record["corrections"] = [{"given": given, "drug": drug} for given, drug in _optimizer.corrections]
+    if _optimizer.telemetry.enabled:
+        record["telemetry"] = _optimizer.telemetry.to_dict()
+    return record
+
+def result_record(result):
+    """ JSON-serialisable fields describing a ScheduleResult, with an overall status for the patient. """
+    record = {"solver_status": result.status, "wall_time": round(result.wall_time, 6), "penalty": result.penalty,
+              "method": result.method, "cached": result.cached}
+    if result.moved is not None:
+        record["moved"] = result.moved
+    if result.schedule is not None:
+        record["status"] = "scheduled"
+        record["schedule"] = result.schedule
+    elif result.status == "INFEASIBLE":
+        record["status"] = "infeasible"
+        if result.conflicts:
+            record["conflicts"] = result.conflict_records()
+    elif result.status in ("UNKNOWN", "FEASIBLE"):
+        record["status"] = "timeout"  # time budget ran out (without a solution, or with anytime disabled)
+    else:
+        record["status"] = "error"
+        record["error"] = f"Solver returned {result.status}."
+    return record
+
+def pool_results(pool, worker, items, jobs):
+    """
+    imap_unordered over `items` with at most jobs * 64 of them handed to the pool and not yet
+    returned: Pool reads its whole input up front, which would pull a streamed feed into memory.
+    The pool's feeder waits for a slot as each result comes back, so the workers never drain.
+    """
+    items = iter(items)
+    window = jobs * 64
+    head = list(itertools.islice(items, window))
+    # a feed shorter than the window is spread thinner so that every worker gets some of it
+    chunksize = max(1, min(16, len(head) // (jobs * 4)))
+    slots = threading.Semaphore(window)
+    stopped = threading.Event()
+
+    def feed():
+        for item in itertools.chain(head, items):
+            slots.acquire()
+            if stopped.is_set():
+                return
+            yield item
+
+    try:
+        for result in pool.imap_unordered(worker, feed(), chunksize=chunksize):
+            slots.release()
+            yield result
+    finally:
+        # let a feeder waiting for a slot see the stop, so the pool can shut down
+        stopped.set()
+        slots.release(window)
+
+def run_batch(source, jobs=None, output=None, telemetry_path=None, telemetry_format="json", export=None,
+              export_format=None, audit=None, **options):
+    """
+    Schedule every prescription file in `source` (directory or manifest) and stream
+    one JSON line per patient to `output` (a path, or stdout when None).
+    With `telemetry_path` (and the `telemetry` option), the per-file telemetry records are appended
+    there as JSON lines, or summed and written once as Prometheus text. With `export`, the schedules
+    are also written to that file as text, JSON, CSV or iCalendar (`export_format`, or from the
+    extension; see render.ScheduleWriter). With `audit` (a path, or "-" for stderr), every schedule
+    is checked again once the batch is done (audit.ScheduleAudit) and the findings are written there
+    as JSON lines.
+    `options` are MedicationScheduleOptimizer keyword arguments (data_dir, formulation, solver_config, ...).
+    Datasets are loaded once in the parent and handed to each worker process.
+    Returns a dict counting the records per status, and how many were served from the result cache;
+    with `audit`, also the hard-rule violations ("audit_violations") and soft ones ("audit_warnings") found.
+    """
+    files = collect_input_files(source)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(files) or 1))
+    return process(lambda optimizer: files, schedule_file, jobs, output, telemetry_path, telemetry_format, options,
+                   export, export_format, audit)
+
+def detect_feed_format(path):
+    """ Feed format from the file extension: .csv, .json and .jsonl are structured, anything else is text. """
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return extension if extension in FEED_FORMATS else "text"
+
+def read_patients(stream, fmt, known_drugs=None, resolve=None):
+    """
+    PatientRecords of a feed in one of FEED_FORMATS; the structured formats check drug names against
+    `known_drugs` up front (see structured.flag_unknown_drugs).
+    """
+    if fmt == "csv":
+        return iter_csv_patients(stream, known_drugs, resolve)
+    if fmt in ("json", "jsonl"):
+        return iter_json_patients(stream, known_drugs, lines=fmt == "jsonl", resolve=resolve)
+    return iter_patients(stream)
+
+def run_feed(source, jobs=None, output=None, telemetry_path=None, telemetry_format="json", feed_format=None,
+             export=None, export_format=None, audit=None, **options):
+    """
+    Like run_batch for a single feed file holding many patients (`source`, or "-" for stdin), read
+    one patient at a time: text (parser.iter_patients), CSV or JSON (structured.py), as given by
+    `feed_format` or the file extension. Patients are handed to the workers in bounded windows, so
+    the feed is never held in memory. Records carry the patient's id (or "line-N") and, for
+    malformed patients, the list of line errors.
+    """
+    fmt = feed_format or detect_feed_format(source)
+    jobs = max(1, jobs or os.cpu_count() or 1)
+
+    def patients(optimizer):
+        known_drugs = optimizer.drug_data.names() if optimizer.drug_data is not None and len(optimizer.drug_data) else None
+        return read_patients(stream, fmt, known_drugs, optimizer.resolve_drug_name)
+
+    stream = sys.stdin if source == "-" else open(source, 'r', newline='' if fmt == "csv" else None)
+    try:
+        return process(patients, schedule_patient, jobs, output, telemetry_path, telemetry_format, options,
+                       export, export_format, audit)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def process(items, worker, jobs, output, telemetry_path, telemetry_format, options, export=None, export_format=None,
+            audit=None):
+    """
+    Load the datasets, run `worker` over `items(optimizer)` (called once the datasets are loaded)
+    on `jobs` processes and stream the records to `output`, and their schedules to `export`.
+    With `audit`, the scheduled regimens are collected and checked in one pass at the end.
+    """
+    optimizer = MedicationScheduleOptimizer(**options)
+    optimizer.load_and_prepare_data()
+    items = items(optimizer)
+    published = None
+    if jobs > 1 and getattr(optimizer.interactions, "path", "") is None:
+        # an in-memory InteractionStore: workers map one published copy instead of each holding their own
+        published = optimizer.interactions = optimizer.interactions.publish()
+    init_args = (options, optimizer.interactions, optimizer.drug_data, optimizer.index, optimizer.dataset_version,
+                 audit is not None)
+
+    counts = {"scheduled": 0, "infeasible": 0, "timeout": 0, "error": 0, "cached": 0}
+    totals = Telemetry()
+    out = open(output, 'w') if output else sys.stdout
+    exporter = open_export(export, optimizer.drug_data, export_format) if export else None
+    # the parent only holds the prescribed pairs when reading the index: look them up for the whole batch at the end
+    auditor = ScheduleAudit(optimizer.index.interactions_for if optimizer.index is not None else optimizer.interactions,
+                            optimizer.drug_data) if audit is not None else None
+    pool = None
+    try:
+        if jobs == 1:
+            _init_worker(*init_args)
+            results = map(worker, items)
+        else:
+            # fork lets the workers inherit the loaded datasets without pickling them
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("fork" if "fork" in methods else None)
+            pool = ctx.Pool(processes=jobs, initializer=_init_worker, initargs=init_args)
+            results = pool_results(pool, worker, items, jobs)
+        for record in results:
+            counts[record["status"]] += 1
+            counts["cached"] += record.get("cached", False)
+            telemetry = record.pop("telemetry", None)
+            regimen = record.pop("regimen", None)
+            if regimen is not None and auditor is not None:
+                auditor.add(record["patient"], regimen["prescriptions"], regimen["diet"], record["schedule"])
+            if telemetry is not None and telemetry_path:
+                totals.merge(telemetry)
+                if telemetry_format == "json":
+                    line = {"patient": record["patient"], "status": record["status"], **telemetry}
+                    write_telemetry(telemetry_path, json.dumps(line) + "\n")
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if exporter is not None and record.get("schedule"):
+                exporter.add(record["schedule"], record["patient"])
+    finally:
+        if pool is not None:
+            results.close()
+            pool.terminate()
+        if published is not None:
+            os.unlink(published.path)
+        if exporter is not None:
+            exporter.close()
+        if output:
+            out.close()
+    if auditor is not None:
+        findings = auditor.run()
+        write_findings(audit, findings)
+        counts["audit_warnings"] = sum(finding.soft for finding in findings)
+        counts["audit_violations"] = len(findings) - counts["audit_warnings"]
+    if telemetry_path and telemetry_format == "prometheus":
+        totals.merge(optimizer.telemetry)  # dataset loading in the parent
+        totals.emit(telemetry_path, "prometheus")
+    return counts
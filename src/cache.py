@@ -0,0 +1,138 @@
+import hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+
+# Results worth reusing: proven outcomes only, a timed-out solve might do better with another budget
+CACHEABLE_STATUSES = ("OPTIMAL", "INFEASIBLE")
+
+def canonical_regimen(prescriptions, diet):
+    """
+    Order-independent form of a regimen: drugs sorted by normalized name with their frequency and
+    sorted preferred times, and the meal times sorted by meal. Two inputs listing the same drugs and
+    meals in another order or letter case share it.
+    """
+    drugs = sorted(
+        (pres['name'].strip().title(), pres['frequency'], sorted(t.strip().lower() for t in pres.get('preferred_times', [])))
+        for pres in prescriptions
+    )
+    meals = sorted((meal.lower(), t) for meal, t in (diet or {}).items())
+    return {"drugs": drugs, "diet": meals}
+
+def cache_key(prescriptions, diet, dataset_version, settings=None):
+    """ Hex digest identifying a solve: canonical regimen, dataset version and the solve settings. """
+    payload = {"regimen": canonical_regimen(prescriptions, diet), "dataset": dataset_version, "settings": settings or {}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class ScheduleCache:
+    """
+    Two-tier cache of solve results (ScheduleResult.to_dict() records) keyed by cache_key().
+    - memory: LRU of at most `max_entries` records (0 disables it).
+    - disk: optional SQLite file at `path`, shared by processes and kept across restarts.
+    The dataset version is part of every key, so results computed on other datasets are never
+    returned; prune() drops them from the disk tier. Safe to use from several threads.
+    """
+    def __init__(self, max_entries=256, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        # entries and the sqlite connection stay in the process that made them
+        state = self.__dict__.copy()
+        state["_memory"] = OrderedDict()
+        state["_lock"] = None
+        state["_conn"] = None
+        state["_pid"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._memory)
+
+    @property
+    def conn(self):
+        if self.path is None:
+            return None
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    dataset TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    created REAL NOT NULL
+                ) WITHOUT ROWID""")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """ The cached record for `key`, or None. Disk hits are promoted to the memory tier. """
+        with self._lock:
+            record = self._memory.get(key)
+            if record is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return record
+            if self.conn is not None:
+                row = self.conn.execute("SELECT record FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    record = json.loads(row[0])
+                    self._remember(key, record)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return record
+            self.misses += 1
+            return None
+
+    def put(self, key, record, dataset_version):
+        with self._lock:
+            self._remember(key, record)
+            if self.conn is not None:
+                self.conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                  (key, dataset_version, json.dumps(record), time.time()))
+                self.conn.commit()
+
+    def _remember(self, key, record):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = record
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def prune(self, dataset_version):
+        """ Drop the disk entries computed on any other dataset version, returns how many. """
+        if self.conn is None:
+            return 0
+        with self._lock:
+            removed = self.conn.execute("DELETE FROM results WHERE dataset != ?", (dataset_version,)).rowcount
+            self.conn.commit()
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM results")
+                self.conn.commit()
+
+    def stats(self):
+        """ Counters for monitoring: hits (per tier), misses, hit ratio, evictions and current size. """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                "misses": self.misses, "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions, "entries": len(self._memory)}
@@ -0,0 +1,86 @@
+FOOD_PHRASES = ("with food", "with meals")
+NO_FOOD_PHRASES = ("without food", "empty stomach", "before a meal")
+
+def normalize_drug_name(name):
+    """ Key used for every drug lookup: the same title-casing the prescriptions go through. """
+    return name.title()
+
+class DrugRecord:
+    __slots__ = ("key", "name", "generic_name", "warnings", "requires_food", "requires_no_food")
+
+    def __init__(self, name, generic_name, instructions):
+        self.key = normalize_drug_name(name)
+        self.name = name
+        self.generic_name = generic_name if isinstance(generic_name, str) else None
+        self.warnings = instructions if isinstance(instructions, str) else "None"
+        instructions_lower = instructions.lower() if isinstance(instructions, str) else ""
+        self.requires_food = any(p in instructions_lower for p in FOOD_PHRASES)
+        self.requires_no_food = any(p in instructions_lower for p in NO_FOOD_PHRASES)
+
+    def __repr__(self):
+        return f"DrugRecord({self.key!r}, food={self.requires_food}, no_food={self.requires_no_food})"
+
+class DrugCatalog:
+    """
+    Per-drug attributes precomputed once at load time, keyed by normalized name.
+    The datasets repeat some drugs with different warnings: the food flags come from the first
+    row of a drug and the displayed warning from the last one, as the DataFrame lookups did.
+    """
+    def __init__(self, rows=()):
+        self._records = {}
+        for name, generic_name, instructions in rows:
+            if not isinstance(name, str):
+                continue
+            record = DrugRecord(name, generic_name, instructions)
+            first = self._records.get(record.key)
+            if first is not None:
+                record.requires_food = first.requires_food
+                record.requires_no_food = first.requires_no_food
+            self._records[record.key] = record
+
+    @classmethod
+    def from_frame(cls, drug_data):
+        return cls(cls.frame_rows(drug_data))
+
+    @staticmethod
+    def frame_rows(drug_data):
+        """ (name, generic name, instructions) rows of a drug DataFrame, as the constructor takes them. """
+        if drug_data is None or 'Drug Name' not in drug_data.columns:
+            return []
+        names = drug_data['Drug Name'].tolist()
+        generic = drug_data['Generic Name'].tolist() if 'Generic Name' in drug_data.columns else [None] * len(names)
+        if 'Warnings and Precautions' in drug_data.columns:
+            warnings = drug_data['Warnings and Precautions'].tolist()
+        else:
+            warnings = [None] * len(names)
+        return list(zip(names, generic, warnings))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, drug_name):
+        return normalize_drug_name(drug_name) in self._records
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def get(self, drug_name):
+        return self._records.get(normalize_drug_name(drug_name))
+
+    def names(self):
+        return set(self._records)
+
+    def requires_food(self, drug_name):
+        record = self.get(drug_name)
+        return record is not None and record.requires_food
+
+    def requires_no_food(self, drug_name):
+        record = self.get(drug_name)
+        return record is not None and record.requires_no_food
+
+    def warnings(self, drug_name):
+        record = self.get(drug_name)
+        return record.warnings if record is not None else "None"
+
+    def warnings_map(self):
+        return {key: record.warnings for key, record in self._records.items()}
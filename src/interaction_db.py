@@ -0,0 +1,191 @@
+import hashlib, os, sqlite3, sys, threading
+from utils import load_data, build_interaction_dict
+from catalog import DrugCatalog
+
+INDEX_VERSION = 2  # bump whenever the schema or the interaction classification changes
+DEFAULT_INDEX_NAME = "interactions.sqlite"
+
+def file_stamp(path):
+    """ Cheap change detector: size and modification time of a source file. """
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def dataset_version(interactions_csv, drug_data_csv):
+    """ Identifier of the dataset contents (and of how they are classified), used to key cached results. """
+    return f"{INDEX_VERSION}:{file_digest(interactions_csv)[:16]}:{file_digest(drug_data_csv)[:16]}"
+
+def build_index(interactions_csv, drug_data_csv, index_path):
+    """
+    Compile the interaction and drug CSVs into a SQLite index at `index_path`.
+    The file is written next to the target and moved into place, so readers never see a half-built index.
+    """
+    df_db_interactions, df_drug_data = load_data(interactions_csv, drug_data_csv)
+    interactions = build_interaction_dict(df_db_interactions)
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("""
+            CREATE TABLE interactions (
+                drug1 TEXT NOT NULL,
+                drug2 TEXT NOT NULL,
+                risk INTEGER NOT NULL,
+                undesirable INTEGER NOT NULL,
+                description TEXT,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (drug1, drug2)
+            ) WITHOUT ROWID""")
+        conn.execute("CREATE INDEX interactions_drug2 ON interactions (drug2)")
+        conn.executemany(
+            "INSERT INTO interactions VALUES (?, ?, ?, ?, ?, ?)",
+            ((d1, d2, i['risk'], i['undesirable'], i['description'], pos)
+             for pos, ((d1, d2), i) in enumerate(interactions.items()))
+        )
+        df_drug_data.to_sql("drugs", conn, index=False)
+        meta = {
+            "version": str(INDEX_VERSION),
+            "interactions_stamp": file_stamp(interactions_csv),
+            "interactions_sha256": file_digest(interactions_csv),
+            "drugs_stamp": file_stamp(drug_data_csv),
+            "drugs_sha256": file_digest(drug_data_csv),
+        }
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+
+class InteractionDatabase:
+    """
+    Read side of the compiled index. Only the pairs involving the prescribed drugs are
+    pulled into memory, and the index is rebuilt automatically when the source CSVs change.
+    """
+    def __init__(self, index_path, interactions_csv, drug_data_csv):
+        self.index_path = index_path
+        self.interactions_csv = interactions_csv
+        self.drug_data_csv = drug_data_csv
+        self._local = threading.local() # one read-only connection per thread (and per process)
+
+    @classmethod
+    def open(cls, index_path, interactions_csv, drug_data_csv):
+        db = cls(index_path, interactions_csv, drug_data_csv)
+        if not db.is_fresh():
+            build_index(interactions_csv, drug_data_csv, index_path)
+        return db
+
+    def __getstate__(self):
+        # sqlite connections cannot cross process boundaries, workers reconnect on first use
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            local.conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+            local.pid = os.getpid()
+        return local.conn
+
+    def read_meta(self):
+        try:
+            conn = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+        except sqlite3.OperationalError:
+            return {}
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            return {}
+        finally:
+            conn.close()
+
+    def is_fresh(self):
+        """
+        Compare the stored source stamps with the CSVs on disk. A changed stamp falls back to
+        the content hash, so touching a file without editing it does not force a rebuild; the new
+        stamp is then stored so that later starts skip the hash again.
+        """
+        if not os.path.exists(self.index_path):
+            return False
+        meta = self.read_meta()
+        if meta.get("version") != str(INDEX_VERSION):
+            return False
+        stamps = {}
+        for prefix, path in (("interactions", self.interactions_csv), ("drugs", self.drug_data_csv)):
+            stamp = file_stamp(path)
+            if meta.get(f"{prefix}_stamp") == stamp:
+                continue
+            if meta.get(f"{prefix}_sha256") != file_digest(path):
+                return False
+            stamps[f"{prefix}_stamp"] = stamp
+        if stamps:
+            self.update_meta(stamps)
+        return True
+
+    def update_meta(self, values):
+        """ Overwrite meta entries; best effort, an index that cannot be written (read-only mount) keeps the old ones. """
+        try:
+            conn = sqlite3.connect(self.index_path)
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", values.items())
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def dataset_version(self):
+        """ Same identifier as dataset_version() for the CSVs the index was built from, read from its metadata. """
+        meta = self.read_meta()
+        return f"{meta.get('version')}:{meta.get('interactions_sha256', '')[:16]}:{meta.get('drugs_sha256', '')[:16]}"
+
+    def interactions_for(self, drug_names):
+        """ Interaction dict (same shape as build_interaction_dict) restricted to pairs among `drug_names`. """
+        names = sorted({name.title() for name in drug_names})
+        if len(names) < 2:
+            return {}
+        marks = ",".join("?" * len(names))
+        rows = self.conn.execute(
+            f"SELECT drug1, drug2, risk, undesirable, description FROM interactions "
+            f"WHERE drug1 IN ({marks}) AND drug2 IN ({marks}) ORDER BY position",
+            names + names
+        )
+        return {(d1, d2): {"risk": risk, "undesirable": undesirable, "description": desc}
+                for d1, d2, risk, undesirable, desc in rows}
+
+    def interaction_names(self):
+        """ Every drug name of the interaction table. """
+        return [row[0] for row in self.conn.execute("SELECT drug1 FROM interactions UNION SELECT drug2 FROM interactions")]
+
+    def drug_data(self):
+        import pandas as pd
+        return pd.read_sql_query("SELECT * FROM drugs", self.conn)
+
+    def drug_catalog(self):
+        """ Build the DrugCatalog straight from the index, without going through pandas. """
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(drugs)")]
+        wanted = ["Drug Name", "Generic Name", "Warnings and Precautions"]
+        select = ", ".join(f'"{c}"' if c in columns else "NULL" for c in wanted)
+        return DrugCatalog(self.conn.execute(f"SELECT {select} FROM drugs"))
+
+if __name__ == "__main__":
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    interactions_csv = os.path.join(data_dir, "common_interactions.csv")
+    drug_data_csv = os.path.join(data_dir, "common_drugs.csv")
+    index_path = os.path.join(data_dir, DEFAULT_INDEX_NAME)
+    build_index(interactions_csv, drug_data_csv, index_path)
+    print(f"Index written to {index_path}")
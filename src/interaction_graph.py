@@ -0,0 +1,78 @@
+from collections.abc import Mapping
+
+class InteractionGraph(Mapping):
+    """
+    Adjacency index over an interaction dict ({(drug1, drug2): interaction}).
+    It is still a read-only mapping with the same keys and values, but lookups for a
+    prescription only touch the prescribed drugs instead of scanning every pair.
+    """
+    def __init__(self, interactions):
+        self._pairs = dict(interactions)
+        self._rank = {}  # position of each pair in the source dict, keeps results in database order
+        self._adjacency = {}
+        for rank, pair in enumerate(self._pairs):
+            drug1, drug2 = pair
+            self._rank[pair] = rank
+            self._adjacency.setdefault(drug1, {})[drug2] = pair
+            self._adjacency.setdefault(drug2, {})[drug1] = pair
+
+    def __getitem__(self, pair):
+        return self._pairs[pair]
+
+    def __iter__(self):
+        return iter(self._pairs)
+
+    def __len__(self):
+        return len(self._pairs)
+
+    def drugs(self):
+        """ Every drug taking part in at least one interaction. """
+        return list(self._adjacency)
+
+    def neighbors(self, drug):
+        """ {neighbor: interaction} for every drug that interacts with `drug`. """
+        return {other: self._pairs[pair] for other, pair in self._adjacency.get(drug, {}).items()}
+
+    def pairs_among(self, drugs):
+        """ [(pair, interaction)] for the known interactions between drugs of the given set. """
+        drugs = [d for d in set(drugs) if d in self._adjacency]
+        found = []
+        for idx, drug in enumerate(drugs):
+            adjacent = self._adjacency[drug]
+            for other in drugs[idx + 1:]:
+                pair = adjacent.get(other)
+                if pair is not None:
+                    found.append(pair)
+        found.sort(key=self._rank.__getitem__)
+        return [(pair, self._pairs[pair]) for pair in found]
+
+    def components(self, drugs, relevant=None):
+        """
+        Connected components of the given drugs, linked by their known interactions (only those
+        for which `relevant(interaction)` is true, when given). Drugs without any such link come
+        out as single-drug components. Components and their drugs keep the order of `drugs`.
+        """
+        drugs = list(dict.fromkeys(drugs))
+        parent = {drug: drug for drug in drugs}
+
+        def find(drug):
+            while parent[drug] != drug:
+                parent[drug] = parent[parent[drug]]
+                drug = parent[drug]
+            return drug
+
+        for (drug1, drug2), interaction in self.pairs_among(drugs):
+            if relevant is None or relevant(interaction):
+                root1, root2 = find(drug1), find(drug2)
+                if root1 != root2:
+                    parent[root2] = root1
+        groups = {}
+        for drug in drugs:
+            groups.setdefault(find(drug), []).append(drug)
+        return list(groups.values())
+
+def as_interaction_graph(interactions):
+    """ Use `interactions` directly if it already provides pairs_among(), otherwise index it. """
+    if hasattr(interactions, "pairs_among"):
+        return interactions
+    return InteractionGraph(interactions)
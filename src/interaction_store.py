@@ -0,0 +1,265 @@
+"""
+Compact, array-backed interaction store. Drug names are interned to integer ids; each pair is a
+row of int32 id arrays with uint8 risk/undesirable flags, and all descriptions share one UTF-8
+blob sliced by an offsets array. Python objects exist only for the drug names: a worker holding
+the whole dataset keeps about 45 bytes of arrays per pair plus the description text, instead of a
+tuple, a dict and their strings. Interaction values are built on access.
+
+A store can be saved to one file and memory-mapped read-only by any number of processes
+(attach()): they share the same physical pages, and attaching costs no parsing or index build.
+"""
+import json, mmap, os, tempfile
+from collections.abc import Mapping
+from functools import lru_cache
+import numpy as np
+from interaction_graph import InteractionGraph
+
+STORE_MAGIC = b"MEDSCHED-STORE-1\n"
+ALIGNMENT = 64
+SHARED_MEMORY_DIR = "/dev/shm"  # tmpfs on Linux: a file there is shared memory with a name
+# arrays written to a store file, in order
+ARRAYS = ("first", "second", "risk", "undesirable", "offsets", "order", "keys", "adjacent", "adjacent_pairs",
+          "adjacency_start")
+
+@lru_cache(maxsize=128)
+def upper_pairs(count):
+    """ Index arrays of the pairs i < j among `count` items (np.triu_indices, built once per size). """
+    return np.triu_indices(count, 1)
+
+class Interaction(Mapping):
+    """
+    Read-only view of one pair of an InteractionStore with the keys of an interaction dict
+    (risk, undesirable, description). The description is decoded from the blob only when read.
+    """
+    __slots__ = ("_store", "_position")
+    KEYS = ("risk", "undesirable", "description")
+
+    def __init__(self, store, position):
+        self._store = store
+        self._position = position
+
+    def __getitem__(self, key):
+        if key == "risk":
+            return int(self._store._risk[self._position])
+        if key == "undesirable":
+            return int(self._store._undesirable[self._position])
+        if key == "description":
+            return self._store.description(self._position)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class InteractionStore(InteractionGraph):
+    """
+    Same read-only mapping as InteractionGraph ({(drug1, drug2): interaction}, pairs in database
+    order), backed by arrays: pairs are found by binary search over their sorted int64 keys
+    (id1 * drugs + id2), the neighbours of a drug from a CSR adjacency.
+    `path` and `meta` are set on a store attached from a file.
+    """
+    path = None
+    meta = None
+
+    def __init__(self, names, first, second, risk, undesirable, blob, offsets):
+        self._set_names(names)
+        self._first = np.asarray(first, dtype=np.int32)
+        self._second = np.asarray(second, dtype=np.int32)
+        self._risk = np.asarray(risk, dtype=np.uint8)
+        self._undesirable = np.asarray(undesirable, dtype=np.uint8)
+        self._blob = blob  # bytes or any buffer, e.g. a memory-mapped file
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+
+        count = len(self._names)
+        keys = self._first.astype(np.int64) * count + self._second
+        self._order = np.argsort(keys, kind="stable").astype(np.int32)  # sorted key -> pair position
+        self._keys = keys[self._order]
+
+        ends = np.concatenate([self._first, self._second])
+        positions = np.concatenate([np.arange(len(keys), dtype=np.int32)] * 2)
+        adjacency = np.lexsort((positions, ends))  # by drug, then database order
+        self._adjacent = np.concatenate([self._second, self._first])[adjacency]
+        self._adjacent_pairs = positions[adjacency]
+        self._adjacency_start = np.concatenate([[0], np.cumsum(np.bincount(ends, minlength=count))]).astype(np.int64)
+
+    def _set_names(self, names):
+        self._names = list(names)
+        self._ids = {name: i for i, name in enumerate(self._names)}
+
+    @classmethod
+    def from_table(cls, table):
+        """ Store of an utils.interaction_table DataFrame. """
+        import pandas as pd
+        codes, names = pd.factorize(pd.concat([table["first"], table["second"]], ignore_index=True), sort=True)
+        count = len(table)
+        descriptions = [d.encode("utf-8") if isinstance(d, str) else b"" for d in table["description"].tolist()]
+        return cls(names.tolist(), codes[:count], codes[count:], table["risk"].to_numpy(),
+                   table["undesirable"].to_numpy(), b"".join(descriptions), cls._offsets_of(descriptions))
+
+    @classmethod
+    def from_dict(cls, interactions):
+        """ Store holding the pairs of an interaction dict, in the same order. """
+        names = sorted({drug for pair in interactions for drug in pair})
+        ids = {name: i for i, name in enumerate(names)}
+        descriptions = [(i['description'] or "").encode("utf-8") for i in interactions.values()]
+        return cls(names, [ids[d1] for d1, _ in interactions], [ids[d2] for _, d2 in interactions],
+                   [i['risk'] for i in interactions.values()], [i.get('undesirable', 0) for i in interactions.values()],
+                   b"".join(descriptions), cls._offsets_of(descriptions))
+
+    @staticmethod
+    def _offsets_of(descriptions):
+        offsets = np.zeros(len(descriptions) + 1, dtype=np.int64)
+        np.cumsum([len(d) for d in descriptions], out=offsets[1:])
+        return offsets
+
+    def nbytes(self):
+        """ Size of the arrays and the description blob (the interned names are not counted). """
+        return sum(getattr(self, f"_{name}").nbytes for name in ARRAYS) + len(self._blob)
+
+    def save(self, path, **meta):
+        """
+        Write the store to `path` (through a temporary file moved into place, so readers never see a
+        partial one) for attach(). `meta` is any JSON-serialisable data kept along with it.
+        """
+        sections, position = {}, 0
+        for name in ARRAYS:
+            array = getattr(self, f"_{name}")
+            sections[name] = [array.dtype.str, position, len(array)]
+            position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({"names": self._names, "arrays": sections, "blob": [position, len(self._blob)],
+                             "meta": meta}).encode("utf-8")
+        start = -(-(len(STORE_MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".store-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(STORE_MAGIC + len(header).to_bytes(8, "little") + header)
+                for name in ARRAYS:
+                    f.seek(start + sections[name][1])
+                    f.write(getattr(self, f"_{name}").tobytes())
+                f.seek(start + position)
+                f.write(self._blob)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def read_header(f):
+        """ Header of a store file open in binary mode, with the data offset under "start"; None if it is not one. """
+        if f.read(len(STORE_MAGIC)) != STORE_MAGIC:
+            return None
+        size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(size))
+        header["start"] = -(-(len(STORE_MAGIC) + 8 + size) // ALIGNMENT) * ALIGNMENT
+        return header
+
+    @classmethod
+    def stored_meta(cls, path):
+        """ The meta a store file was saved with, or None when there is no readable store at `path`. """
+        try:
+            with open(path, "rb") as f:
+                header = cls.read_header(f)
+        except (OSError, ValueError):
+            return None
+        return header["meta"] if header is not None else None
+
+    @classmethod
+    def attach(cls, path):
+        """ Memory-map a store saved with save(): arrays are read-only views of the file, nothing is copied. """
+        with open(path, "rb") as f:
+            header = cls.read_header(f)
+            if header is None:
+                raise ValueError(f"{path} is not an interaction store file.")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        store = cls.__new__(cls)
+        store._set_names(header["names"])
+        start = header["start"]
+        for name, (dtype, offset, length) in header["arrays"].items():
+            setattr(store, f"_{name}", np.frombuffer(mapped, dtype=dtype, count=length, offset=start + offset))
+        blob_offset, blob_length = header["blob"]
+        store._blob = memoryview(mapped)[start + blob_offset:start + blob_offset + blob_length]
+        store._mapped = mapped
+        store.path = path
+        store.meta = header["meta"]
+        return store
+
+    def publish(self, directory=None):
+        """
+        Save the store to a new temporary file (in shared memory when available) and return it
+        attached; the caller removes the file (os.unlink(store.path)) once no process needs to attach it.
+        """
+        if directory is None:
+            directory = SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else tempfile.gettempdir()
+        fd, path = tempfile.mkstemp(prefix="medsched-", suffix=".store", dir=directory)
+        os.close(fd)
+        self.save(path, **(self.meta or {}))
+        return self.attach(path)
+
+    def __reduce_ex__(self, protocol):
+        # an attached store travels as its path: the receiving process maps the same file
+        if self.path is not None:
+            return type(self).attach, (self.path,)
+        return super().__reduce_ex__(protocol)
+
+    def description(self, position):
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def _position(self, pair):
+        try:
+            drug1, drug2 = pair
+            key = self._ids[drug1] * len(self._names) + self._ids[drug2]
+        except (KeyError, TypeError, ValueError):
+            return None
+        index = int(np.searchsorted(self._keys, key))
+        if index < len(self._keys) and self._keys[index] == key:
+            return int(self._order[index])
+        return None
+
+    def _pair(self, position):
+        return self._names[self._first[position]], self._names[self._second[position]]
+
+    def __getitem__(self, pair):
+        position = self._position(pair)
+        if position is None:
+            raise KeyError(pair)
+        return Interaction(self, position)
+
+    def __contains__(self, pair):
+        return self._position(pair) is not None
+
+    def __iter__(self):
+        names, first, second = self._names, self._first.tolist(), self._second.tolist()
+        return ((names[a], names[b]) for a, b in zip(first, second))
+
+    def __len__(self):
+        return len(self._first)
+
+    def drugs(self):
+        return list(self._names)
+
+    def neighbors(self, drug):
+        drug_id = self._ids.get(drug)
+        if drug_id is None:
+            return {}
+        start, end = self._adjacency_start[drug_id], self._adjacency_start[drug_id + 1]
+        return {self._names[other]: Interaction(self, position)
+                for other, position in zip(self._adjacent[start:end].tolist(), self._adjacent_pairs[start:end].tolist())}
+
+    def pairs_among(self, drugs):
+        ids = sorted({self._ids[d] for d in drugs if d in self._ids})
+        if len(ids) < 2 or not len(self._keys):
+            return []
+        ids = np.array(ids, dtype=np.int64)
+        left, right = upper_pairs(len(ids))
+        candidates = ids[left] * len(self._names) + ids[right]
+        found = np.minimum(np.searchsorted(self._keys, candidates), len(self._keys) - 1)
+        positions = np.sort(self._order[found[self._keys[found] == candidates]])
+        return [(self._pair(position), Interaction(self, position)) for position in positions.tolist()]
@@ -1,13 +1,40 @@
-import os, random, sys
+import argparse, contextlib, io, os, random, sys, time
 from parser import parse_prescriptions
-from utils import load_data, build_interaction_dict, create_schedule, print_schedule, save_schedule_to_file
+from utils import (load_data, interaction_table, solve_schedule, print_schedule, save_schedule_to_file, apply_delta,
+                   unchanged_drugs, SolverConfig, ScheduleResult, FORMULATIONS, RESOLUTIONS)
+from interaction_db import InteractionDatabase, DEFAULT_INDEX_NAME, dataset_version, file_stamp
+from catalog import DrugCatalog
+from interaction_graph import as_interaction_graph
+from cache import ScheduleCache, CACHEABLE_STATUSES, cache_key
+from telemetry import Telemetry, NO_TELEMETRY
+from name_index import NameIndex, unknown_drug_message
+from render import EXPORT_FORMATS, FORMAT_NAMES
 
 release_mode = 1 # insert 1 for the normal functioning of the program, 0 to test the program with input.txt
 
 class MedicationScheduleOptimizer:
-    def __init__(self, data_dir="data", input_dir="inputs"):
+    def __init__(self, data_dir="data", input_dir="inputs", use_index=True, formulation="boolean", resolution=60,
+                 solver_config=None, decompose=True, greedy=True, cache_size=256, cache_path=None, telemetry=False,
+                 autocorrect=None, store_path=None):
         self.data_dir = data_dir
         self.input_dir = input_dir
+        self.use_index = use_index # query the compiled SQLite index instead of re-parsing the CSVs
+        self.store_path = store_path # memory-mapped interaction store shared by the processes of the host
+        self.formulation = formulation # CP-SAT encoding used by create_schedule ("boolean" or "integer")
+        self.resolution = resolution # length of a schedule slot in minutes
+        self.solver_config = solver_config or SolverConfig() # CP-SAT workers, time budget, seed
+        self.decompose = decompose # solve independent groups of interacting drugs separately
+        self.greedy = greedy # try the constructive heuristic before building a CP-SAT model
+        # results of identical regimens are reused (memory LRU, plus a SQLite file when cache_path is set)
+        self.cache = ScheduleCache(cache_size, cache_path) if cache_size or cache_path else None
+        # per-phase timings, model size and solver statistics (see telemetry.py); a no-op when disabled
+        self.telemetry = Telemetry() if telemetry else NO_TELEMETRY
+        self.autocorrect = autocorrect # similarity above which an unknown drug name is replaced by the closest drug
+        self.corrections = [] # (name given, drug used) of the current prescriptions
+        self._name_index = None
+        self.dataset_version = None
+        self.result = None
+        self.index = None
         self.interactions = {}
         self.prescriptions = []
         self.schedule = {}
@@ -15,36 +42,103 @@ class MedicationScheduleOptimizer:
         self.diet = {}
 
     def load_and_prepare_data(self):
-        db_interactions_csv = "data/common_interactions.csv"
-        drug_data_csv = "data/common_drugs.csv"
-        df_db_interactions, df_drug_data = load_data(db_interactions_csv, drug_data_csv)
-        self.interactions = build_interaction_dict(df_db_interactions)
-        self.drug_data = df_drug_data
+        db_interactions_csv = os.path.join(self.data_dir, "common_interactions.csv")
+        drug_data_csv = os.path.join(self.data_dir, "common_drugs.csv")
+        if self.store_path is not None:
+            self.attach_store(db_interactions_csv, drug_data_csv)
+            return
+        if self.use_index:
+            index_path = os.path.join(self.data_dir, DEFAULT_INDEX_NAME)
+            with self.telemetry.phase("open_index"):
+                self.index = InteractionDatabase.open(index_path, db_interactions_csv, drug_data_csv)
+                self.drug_data = self.index.drug_catalog()
+            self.interactions = {} # filled with the prescribed pairs only, see load_prescribed_interactions
+            if self.cache is not None:
+                self.dataset_version = self.index.dataset_version()
+                self.cache.prune(self.dataset_version)
+            return
+        with self.telemetry.phase("load_data"):
+            df_db_interactions, df_drug_data = load_data(db_interactions_csv, drug_data_csv)
+        with self.telemetry.phase("build_interaction_dict"):
+            from interaction_store import InteractionStore # needs numpy, which comes with pandas
+            self.interactions = InteractionStore.from_table(interaction_table(df_db_interactions)) # array-backed, see interaction_store.py
+            self.drug_data = DrugCatalog.from_frame(df_drug_data) # per-drug flags and warnings, computed once
+        if self.cache is not None:
+            self.dataset_version = dataset_version(db_interactions_csv, drug_data_csv)
+            self.cache.prune(self.dataset_version)
 
-    def parse_input_prescriptions(self, input_str=None):
-        if input_str is None:
-            input_file = f"{self.input_dir}/input.txt"
-            try:
-                with open(input_file, 'r') as f:
-                    input_str = f.read()
-            except FileNotFoundError:
-                print(f"Input file {input_file} not found.")
-                sys.exit(1)
-        self.prescriptions, self.diet = parse_prescriptions(input_str)
-        for pres in self.prescriptions:
-            pres['name'] = pres['name'].title() # normalising drug names by capitalising the first letter
-        if not self.prescriptions:
-            print("No prescriptions found in input. Please check the format.")
-            sys.exit(1)
-        self.validate_drug_names() # validate drug names against known drugs
+    def attach_store(self, db_interactions_csv, drug_data_csv):
+        """
+        Memory-map the interaction store and drug rows published at self.store_path, publishing them
+        from the CSVs first when the file is missing or was built from other dataset contents.
+        Every process attaching the file shares one copy of the data and skips pandas altogether.
+        """
+        from interaction_store import InteractionStore
+        meta = InteractionStore.stored_meta(self.store_path) or {}
+        stamps = [file_stamp(db_interactions_csv), file_stamp(drug_data_csv)]
+        version = meta.get("version") if meta.get("stamps") == stamps else dataset_version(db_interactions_csv, drug_data_csv)
+        if meta.get("version") != version:
+            with self.telemetry.phase("load_data"):
+                df_db_interactions, df_drug_data = load_data(db_interactions_csv, drug_data_csv)
+            with self.telemetry.phase("build_interaction_dict"):
+                store = InteractionStore.from_table(interaction_table(df_db_interactions))
+                store.save(self.store_path, version=version, stamps=stamps, drugs=DrugCatalog.frame_rows(df_drug_data))
+        elif meta.get("stamps") != stamps:
+            # same contents under new stamps (touch, checkout): store them so later starts skip the hashes;
+            # best effort, the store is rewritten next to the old one and moved into place
+            with contextlib.suppress(OSError):
+                store = InteractionStore.attach(self.store_path)
+                store.save(self.store_path, **{**store.meta, "stamps": stamps})
+        with self.telemetry.phase("attach_store"):
+            self.interactions = InteractionStore.attach(self.store_path)
+            self.drug_data = DrugCatalog(self.interactions.meta["drugs"])
+        if self.cache is not None:
+            self.dataset_version = version
+            self.cache.prune(self.dataset_version)
+
+    def load_prescribed_interactions(self):
+        if self.index is not None:
+            with self.telemetry.phase("load_interactions"):
+                self.interactions = self.index.interactions_for(pres['name'] for pres in self.prescriptions)
+
+    def prescribed_interactions(self):
+        """ (pair, interaction) for every known interaction between two prescribed drugs. """
+        prescribed_drugs = {pres['name'].title() for pres in self.prescriptions}
+        return as_interaction_graph(self.interactions).pairs_among(prescribed_drugs)
+
+    @property
+    def name_index(self):
+        """ NameIndex over the drug and generic names and the interaction vocabulary, built on first use. """
+        if self._name_index is None:
+            if self.index is not None:
+                other_names = self.index.interaction_names()
+            else:
+                other_names = as_interaction_graph(self.interactions).drugs()
+            self._name_index = NameIndex.from_catalog(self.drug_data, other_names)
+        return self._name_index
+
+    def resolve_drug_name(self, name):
+        """
+        (drug, suggestions) for a name missing from the drug data: the drug when the name is a generic
+        name, or when autocorrect is set and the closest drug is similar enough; None otherwise,
+        with ranked suggestions for the message.
+        """
+        target = self.name_index.correct(name, self.autocorrect)
+        if target is not None:
+            return target, []
+        return None, self.name_index.suggest(name)
 
     def validate_drug_names(self):
-        if self.drug_data is not None and 'Drug Name' in self.drug_data.columns:
-            known_drugs = set(self.drug_data['Drug Name'].str.title())
+        if self.drug_data is not None and len(self.drug_data) > 0:
             for pres in self.prescriptions:
-                if pres['name'] not in known_drugs:
-                    print(f"Unknown drug: {pres['name']}. Please correct the name or update your datasets.")
-                    sys.exit(1)
+                if pres['name'] not in self.drug_data:
+                    target, suggestions = self.resolve_drug_name(pres['name'])
+                    if target is None:
+                        print(unknown_drug_message(pres['name'], suggestions))
+                        sys.exit(1)
+                    print(f"Note: unknown drug {pres['name']} read as {target}.")
+                    self.corrections.append((pres['name'], target))
+                    pres['name'] = target
         else:
             print("Warning: Drug data not available or missing 'Drug Name' column, cannot validate drug names.")
 
@@ -57,14 +151,24 @@ class MedicationScheduleOptimizer:
             except FileNotFoundError:
                 print(f"Input file {input_file} not found.")
                 sys.exit(1)
-        self.prescriptions, self.diet = parse_prescriptions(input_str)
-        self.validate_meal_times()
-        for pres in self.prescriptions:
-            pres['name'] = pres['name'].title()  # Normalize drug names by capitalizing the first letter
-        if not self.prescriptions:
-            print("No prescriptions found in input. Please check the format.")
-            sys.exit(1)
-        self.validate_drug_names()  # Validate drug names against known drugs
+        with self.telemetry.phase("parse"):
+            prescriptions, diet = parse_prescriptions(input_str)
+        self.load_regimen(prescriptions, diet)
+
+    def load_regimen(self, prescriptions, diet):
+        """ Validate parsed prescriptions and meal times and fetch their interactions; exits on invalid input. """
+        self.prescriptions, self.diet = prescriptions, diet
+        self.corrections = []
+        with self.telemetry.phase("validate"):
+            self.validate_meal_times()
+            for pres in self.prescriptions:
+                pres['name'] = pres['name'].title()  # Normalize drug names by capitalizing the first letter
+            if not self.prescriptions:
+                print("No prescriptions found in input. Please check the format.")
+                sys.exit(1)
+            self.validate_drug_names()  # Validate drug names against known drugs
+        self.telemetry.count("prescriptions", len(self.prescriptions))
+        self.load_prescribed_interactions()
 
     def validate_meal_times(self):
         """ Ensure that meals are placed in the correct time categories. """
@@ -73,34 +177,93 @@ class MedicationScheduleOptimizer:
             "afternoon": ("12:01", "17:59"),
             "evening": ("18:00", "22:00")
         }
-        for meal, time in self.diet.items():
-            if meal == "breakfast" and not (time_preferences["morning"][0] <= time <= time_preferences["morning"][1]):
-                print(f"Invalid breakfast time {time}. Breakfast must be in the morning (06:00 - 12:00).")
+        for meal, meal_time in self.diet.items():
+            if meal == "breakfast" and not (time_preferences["morning"][0] <= meal_time <= time_preferences["morning"][1]):
+                print(f"Invalid breakfast time {meal_time}. Breakfast must be in the morning (06:00 - 12:00).")
                 sys.exit(1)
-            elif meal == "lunch" and not (time_preferences["afternoon"][0] <= time <= time_preferences["afternoon"][1]):
-                print(f"Invalid lunch time {time}. Lunch must be in the afternoon (12:01 - 17:59).")
+            elif meal == "lunch" and not (time_preferences["afternoon"][0] <= meal_time <= time_preferences["afternoon"][1]):
+                print(f"Invalid lunch time {meal_time}. Lunch must be in the afternoon (12:01 - 17:59).")
                 sys.exit(1)
-            elif meal == "dinner" and not (time_preferences["evening"][0] <= time <= time_preferences["evening"][1]):
-                print(f"Invalid dinner time {time}. Dinner must be in the evening (18:00 - 22:00).")
+            elif meal == "dinner" and not (time_preferences["evening"][0] <= meal_time <= time_preferences["evening"][1]):
+                print(f"Invalid dinner time {meal_time}. Dinner must be in the evening (18:00 - 22:00).")
                 sys.exit(1)
 
-    def optimize_schedule(self):
-        self.schedule = create_schedule(self.prescriptions, self.interactions, self.drug_data, self.diet)
-        if self.schedule is None:
+    def solve_settings(self):
+        """ Options that change the result of a solve, part of the cache key. """
+        return {"formulation": self.formulation, "resolution": self.resolution, "gap": self.solver_config.gap,
+                "decompose": self.decompose, "greedy": self.greedy}
+
+    def solve(self, previous_schedule=None, keep=()):
+        """
+        Solve the parsed prescriptions with the configured formulation, resolution and solver settings,
+        or return the cached result of the same regimen on the same datasets. A re-plan from
+        `previous_schedule` (see solve_schedule) depends on that schedule and is never cached.
+        """
+        if self.cache is None or self.dataset_version is None or previous_schedule is not None:
+            return self.solve_uncached(previous_schedule, keep)
+        start = time.perf_counter()
+        with self.telemetry.phase("cache_lookup"):
+            key = cache_key(self.prescriptions, self.diet, self.dataset_version, self.solve_settings())
+            record = self.cache.get(key)
+        if record is not None:
+            self.telemetry.count("cache_hits")
+            return ScheduleResult.from_dict(record, wall_time=time.perf_counter() - start, cached=True)
+        result = self.solve_uncached()
+        if result.status in CACHEABLE_STATUSES:
+            self.cache.put(key, result.to_dict(), self.dataset_version)
+        return result
+
+    def solve_uncached(self, previous_schedule=None, keep=()):
+        with self.telemetry.phase("solve"):
+            return solve_schedule(self.prescriptions, self.interactions, self.drug_data, self.diet,
+                                  formulation=self.formulation, resolution=self.resolution,
+                                  solver_config=self.solver_config, decompose=self.decompose, greedy=self.greedy,
+                                  telemetry=self.telemetry, previous_schedule=previous_schedule,
+                                  keep=keep)
+
+    def replan(self, add=(), remove=()):
+        """
+        Change the regimen (prescriptions to add or replace, drug names to remove, see utils.apply_delta)
+        and re-plan from the current schedule: groups of drugs the change leaves alone keep their slots,
+        the others move as few doses as possible.
+        """
+        previous_schedule = self.schedule
+        keep = unchanged_drugs(self.prescriptions, self.interactions, add, remove)
+        self.load_regimen(apply_delta(self.prescriptions, add, remove), self.diet)
+        self.optimize_schedule(previous_schedule, keep)
+
+    def optimize_schedule(self, previous_schedule=None, keep=()):
+        self.result = self.solve(previous_schedule, keep)
+        self.schedule = self.result.schedule
+        if self.schedule is None and self.result.status in ("UNKNOWN", "FEASIBLE"):
+            print(f"\nNo schedule returned within the time limit (solver status {self.result.status}). Please allow more time.")
+        elif self.schedule is None:
             print("\nUnable to find a feasible schedule. Please adjust constraints or inputs.")
+            if self.result.conflicts:
+                print("These requirements cannot all be met:")
+                for violation in self.result.conflicts:
+                    print(f" - {violation.message}")
+        elif self.result.status == "FEASIBLE":
+            print(f"\nTime limit reached: returning the best schedule found in {self.result.wall_time:.2f}s.")
         else:
             print("\nSchedule optimised successfully.")
+        if self.schedule is not None and self.result.penalty:
+            print(f"Some preferred times or undesirable combinations could not be respected (penalty {self.result.penalty}).")
+        if self.schedule is not None and self.result.moved:
+            print(f"{self.result.moved} dose(s) moved from the previous schedule.")
     
     def display_schedule(self):
      if self.schedule:
-        print_schedule(self.schedule, self.drug_data)
+        with self.telemetry.phase("render"):
+            print_schedule(self.schedule, self.drug_data)
         if release_mode == 1:
-            choice = input("Do you want the schedule to be saved in a .txt file? (y/n): ").strip().lower()
+            choice = input("Do you want the schedule to be saved to a file (text, JSON, CSV or iCalendar)? (y/n): ").strip().lower()
         else:
             choice = 'n'
         if choice in ['y', 'yes']:
-            filename = input("Please write the desired name for the file (include .txt): ").strip()
-            if not filename.endswith(".txt"):
+            extensions = ", ".join(f".{fmt} for {FORMAT_NAMES[fmt]}" for fmt in EXPORT_FORMATS)
+            filename = input(f"Please write the desired name for the file ({extensions}): ").strip()
+            if not filename.lower().endswith(tuple(f".{fmt}" for fmt in EXPORT_FORMATS)):
                 print("Invalid file name. The schedule was not saved.")
             else:
                 save_schedule_to_file(self.schedule, self.drug_data, filename=filename)
@@ -146,7 +309,7 @@ class MedicationScheduleOptimizer:
                 print('  Metformin: twice daily (morning, evening)')
                 print("\nInclude a 'Diet:' line if desired, e.g.:")
                 print('  Diet: breakfast 8 am; lunch 1 pm; dinner 8 pm')
-                print('Note: Times should be discrete hours in 12-hour format (e.g., 8 am, 1 pm).')
+                print('Note: Times use the 12-hour format, on the hour or with minutes (e.g., 8 am, 1 pm, 7:30 am).')
                 print("Press Enter on an empty line to run.\n")
                 lines = []
                 while True:
@@ -182,19 +345,17 @@ class MedicationScheduleOptimizer:
                 print("\nNo interactions found between prescribed drugs.")
             else:
                 print("\nInteractions between drugs:")
-                for pair, interaction in self.interactions.items():
+                for pair, interaction in self.prescribed_interactions():
                     drug1, drug2 = pair
-                    prescribed_drugs = {pres['name'].title() for pres in self.prescriptions}
-                    if drug1 in prescribed_drugs and drug2 in prescribed_drugs:
-                        description = interaction['description']
-                        # Make drug names bold in the description
-                        description = description.replace(drug1, f"\033[1m{drug1}\033[0m")
-                        description = description.replace(drug2, f"\033[1m{drug2}\033[0m")
-                        print(f" - {description}")
-                        if interaction['risk'] == 1:  # Check for risky interactions
-                            risky_pairs.append(f"{drug1} and {drug2}")
-                        elif interaction['undesirable'] == 1:
-                            undesirable_pairs.append(f"{drug1} and {drug2}")  
+                    description = interaction['description']
+                    # Make drug names bold in the description
+                    description = description.replace(drug1, f"\033[1m{drug1}\033[0m")
+                    description = description.replace(drug2, f"\033[1m{drug2}\033[0m")
+                    print(f" - {description}")
+                    if interaction['risk'] == 1:  # Check for risky interactions
+                        risky_pairs.append(f"{drug1} and {drug2}")
+                    elif interaction['undesirable'] == 1:
+                        undesirable_pairs.append(f"{drug1} and {drug2}")  
             if risky_pairs:
                 print("\nRisky drug combinations are:")
                 for pair in risky_pairs:
@@ -213,6 +374,131 @@ class MedicationScheduleOptimizer:
         self.optimize_schedule()
         self.display_schedule()
 
+def check_inputs(paths, **options):
+    """
+    Parse and validate prescription files (or directories of .txt files) without solving them, and
+    print one line per file. Only the index is read, so neither pandas nor OR-Tools gets loaded.
+    Returns the number of invalid files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.txt')))
+        else:
+            files.append(path)
+    optimizer = MedicationScheduleOptimizer(**{**options, "cache_size": 0, "cache_path": None})
+    optimizer.load_and_prepare_data()
+    invalid = 0
+    for path in files:
+        messages = io.StringIO()
+        try:
+            with open(path, 'r') as f:
+                input_str = f.read()
+            with contextlib.redirect_stdout(messages):
+                optimizer.parse_input_prescriptions(input_str=input_str)
+        except (OSError, SystemExit) as e:
+            invalid += 1
+            error = messages.getvalue().strip() or (str(e) if isinstance(e, OSError) else "Invalid input.")
+            print(f"{path}: {error}")
+            continue
+        interactions = optimizer.prescribed_interactions()
+        risky = sum(1 for _, interaction in interactions if interaction['risk'] == 1)
+        print(f"{path}: OK ({len(optimizer.prescriptions)} prescriptions, {len(interactions)} known interactions, {risky} risky)")
+    return invalid
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Medication Schedule Optimizer")
+    arg_parser.add_argument("--batch", metavar="PATH",
+                            help="schedule every .txt file in a directory (or every path listed in a manifest file) non-interactively")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None,
+                            help="number of worker processes for --batch and --feed (default: number of CPUs)")
+    arg_parser.add_argument("-o", "--output", metavar="FILE",
+                            help="JSON Lines file for --batch and --feed results (default: stdout)")
+    arg_parser.add_argument("--feed", metavar="FILE",
+                            help="schedule every patient of a multi-patient feed file ('-' for stdin), see iter_patients in parser.py")
+    arg_parser.add_argument("--feed-format", choices=("text", "json", "jsonl", "csv"), default=None,
+                            help="format of the --feed file (default: from its extension, text otherwise)")
+    arg_parser.add_argument("--export", metavar="FILE",
+                            help="also write the --batch and --feed schedules to FILE as text, JSON, CSV or iCalendar ('-' for stdout)")
+    arg_parser.add_argument("--export-format", choices=EXPORT_FORMATS, default=None,
+                            help="format of the --export file (default: from its extension, text otherwise)")
+    arg_parser.add_argument("--audit", metavar="FILE",
+                            help="check every --batch and --feed schedule again once all are solved, write the rule "
+                                 "violations found to FILE as JSON lines ('-' for stderr) and exit with 1 if any hard rule is broken")
+    arg_parser.add_argument("--check", nargs="+", metavar="PATH",
+                            help="only parse and validate prescription files (or directories of them), without solving")
+    add_optimizer_arguments(arg_parser)
+    return arg_parser.parse_args(argv)
+
+def add_optimizer_arguments(arg_parser):
+    """ Dataset, model and solver options shared by the command-line entry points (see optimizer_options). """
+    arg_parser.add_argument("--data-dir", default="data", help="directory containing the datasets")
+    arg_parser.add_argument("--formulation", choices=FORMULATIONS, default="boolean",
+                            help="CP-SAT encoding: a BoolVar per dose and slot, or an integer slot variable per dose")
+    arg_parser.add_argument("--resolution", type=int, choices=RESOLUTIONS, default=60, metavar="MINUTES",
+                            help="slot length in minutes (60, 30, 20, 15, 10 or 5); use --formulation integer for fine grids")
+    arg_parser.add_argument("--no-index", action="store_true",
+                            help="parse the CSVs on every run instead of using the compiled interaction index")
+    arg_parser.add_argument("--solver-workers", type=int, default=None, metavar="N",
+                            help="number of CP-SAT search workers (default: OR-Tools default)")
+    arg_parser.add_argument("--max-time", type=float, default=None, metavar="SECONDS",
+                            help="time budget for each solve")
+    arg_parser.add_argument("--seed", type=int, default=None,
+                            help="CP-SAT random seed (reproducible together with --solver-workers 1)")
+    arg_parser.add_argument("--gap", type=float, default=0.05,
+                            help="stop once the soft-constraint penalty is proven within this relative gap of the optimum")
+    arg_parser.add_argument("--no-decompose", action="store_true",
+                            help="solve the whole regimen as one model instead of one model per group of interacting drugs")
+    arg_parser.add_argument("--no-greedy", action="store_true",
+                            help="always build a CP-SAT model instead of first trying the constructive heuristic")
+    arg_parser.add_argument("--cache-size", type=int, default=256, metavar="N",
+                            help="results of identical regimens kept in memory (0 disables the memory cache)")
+    arg_parser.add_argument("--cache-file", metavar="PATH",
+                            help="SQLite file persisting cached results across runs and batch workers")
+    arg_parser.add_argument("--no-anytime", action="store_true",
+                            help="return no schedule instead of the best one found when --max-time runs out")
+    arg_parser.add_argument("--store-file", metavar="PATH",
+                            help="memory-map the interaction and drug data from PATH (e.g. under /dev/shm), publishing it there "
+                                 "from the CSVs first if needed, so that every process of the host shares one copy; replaces the index")
+    arg_parser.add_argument("--autocorrect", nargs="?", type=float, const=0.8, default=None, metavar="SIMILARITY",
+                            help="replace an unknown drug name by the closest known drug when their trigram similarity "
+                                 "reaches SIMILARITY (default 0.8) and no other drug is as close")
+    arg_parser.add_argument("--telemetry", metavar="FILE",
+                            help="record per-phase timings, model size and solver statistics and append them to FILE ('-' for stderr)")
+    arg_parser.add_argument("--telemetry-format", choices=("json", "prometheus"), default="json",
+                            help="JSON Lines (one record per solve) or Prometheus text (totals) for --telemetry")
+
+def optimizer_options(args):
+    """ Keyword arguments of MedicationScheduleOptimizer taken from the command line. """
+    solver_config = SolverConfig(workers=args.solver_workers, max_time=args.max_time, seed=args.seed,
+                                 anytime=not args.no_anytime, gap=args.gap)
+    return {"data_dir": args.data_dir, "use_index": not args.no_index, "formulation": args.formulation,
+            "resolution": args.resolution, "solver_config": solver_config, "decompose": not args.no_decompose,
+            "greedy": not args.no_greedy, "cache_size": args.cache_size, "cache_path": args.cache_file,
+            "telemetry": args.telemetry is not None, "autocorrect": args.autocorrect,
+            "store_path": args.store_file}
+
 if __name__ == "__main__":
-    optimizer = MedicationScheduleOptimizer()
-    optimizer.run()
\ No newline at end of file
+    args = parse_args()
+    if args.check:
+        sys.exit(1 if check_inputs(args.check, **optimizer_options(args)) else 0)
+    elif args.batch or args.feed:
+        from batch import run_batch, run_feed
+        options = dict(jobs=args.jobs, output=args.output, telemetry_path=args.telemetry,
+                       telemetry_format=args.telemetry_format, export=args.export, export_format=args.export_format,
+                       audit=args.audit, **optimizer_options(args))
+        if args.batch:
+            counts = run_batch(args.batch, **options)
+        else:
+            counts = run_feed(args.feed, feed_format=args.feed_format, **options)
+        print(f"Batch finished: {counts['scheduled']} scheduled, {counts['infeasible']} infeasible, "
+              f"{counts['timeout']} timed out, {counts['error']} errors ({counts['cached']} from cache).", file=sys.stderr)
+        if args.audit:
+            print(f"Audit: {counts['audit_violations']} violations, {counts['audit_warnings']} soft-rule warnings.",
+                  file=sys.stderr)
+            sys.exit(1 if counts['audit_violations'] else 0)
+    else:
+        optimizer = MedicationScheduleOptimizer(**optimizer_options(args))
+        optimizer.run()
+        if args.telemetry:
+            optimizer.telemetry.emit(args.telemetry, args.telemetry_format)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import heapq
+from collections import Counter
+from catalog import normalize_drug_name
+
+class Suggestion:
+    """ A candidate for an unknown drug name: the indexed name that matched, the drug it stands for and the similarity. """
+    __slots__ = ("name", "target", "score", "schedulable")
+
+    def __init__(self, name, target, score, schedulable):
+        self.name = name
+        self.target = target
+        self.score = score
+        self.schedulable = schedulable  # the target has drug data, so it can be scheduled
+
+    def __repr__(self):
+        return f"Suggestion({self.name!r} -> {self.target!r}, {self.score:.2f})"
+
+def unknown_drug_message(name, suggestions):
+    """ Error shown for a drug name that could not be resolved, listing the closest known names. """
+    if not suggestions:
+        return f"Unknown drug: {name}. Please correct the name or update your datasets."
+    names = ", ".join(s.target if s.schedulable else f"{s.target} (no drug data)" for s in suggestions)
+    return f"Unknown drug: {name}. Did you mean: {names}? Please correct the name or update your datasets."
+
+def trigrams(text):
+    """ Distinct character trigrams of a lower-cased, padded name ("  metformin "), as pg_trgm does. """
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    """
+    Trigram index over drug names for typo-tolerant lookups. Each indexed name points to a target,
+    the drug name it stands for: a drug's own name and its generic name point to the drug, names
+    only known from the interaction data point to themselves. suggest() ranks targets by the
+    Dice similarity of their names' trigrams, counting shared trigrams over the posting lists
+    of the query's trigrams only.
+    """
+    def __init__(self, schedulable=()):
+        self.schedulable = set(schedulable)
+        self._names = []  # indexed names as given
+        self._targets = []
+        self._sizes = []  # number of distinct trigrams of each name
+        self._exact = {}  # lower-cased name -> entry id
+        self._postings = {}  # trigram -> [entry ids]
+
+    @classmethod
+    def from_catalog(cls, catalog, other_names=()):
+        """ Index the catalog's drug and generic names, plus `other_names` (e.g. the interaction vocabulary). """
+        index = cls(schedulable=catalog.names())
+        for record in catalog:
+            index.add(record.key, record.key)
+            if record.generic_name:
+                index.add(record.generic_name, record.key)
+        for name in other_names:
+            index.add(name, normalize_drug_name(name))
+        return index
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name, target):
+        key = name.strip().lower()
+        if not key or key in self._exact:
+            return
+        entry = len(self._names)
+        grams = trigrams(key)
+        self._names.append(name.strip())
+        self._targets.append(target)
+        self._sizes.append(len(grams))
+        self._exact[key] = entry
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry)
+
+    def lookup(self, name):
+        """ Target of an exact (case-insensitive) drug or generic name, or None. """
+        entry = self._exact.get(name.strip().lower())
+        return self._targets[entry] if entry is not None else None
+
+    def suggest(self, name, limit=5, min_score=0.3):
+        """ Up to `limit` Suggestions for `name`, best first, one per target, with a similarity of at least `min_score`. """
+        grams = trigrams(name.strip())
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        size = len(grams)
+        scored = ((2 * count / (size + self._sizes[entry]), entry) for entry, count in shared.items())
+        best = {}
+        for score, entry in heapq.nlargest(limit * 3, scored):
+            target = self._targets[entry]
+            if score >= min_score and target not in best:
+                best[target] = Suggestion(self._names[entry], target, score, target in self.schedulable)
+        return sorted(best.values(), key=lambda s: -s.score)[:limit]
+
+    def correct(self, name, threshold):
+        """
+        The schedulable drug `name` most likely means, or None: an exact drug or generic name, or the
+        best suggestion when its similarity reaches `threshold` and no other drug scores as high.
+        """
+        target = self.lookup(name)
+        if target is not None:
+            return target if target in self.schedulable else None
+        if threshold is None:
+            return None
+        suggestions = self.suggest(name, limit=2, min_score=threshold)
+        if suggestions and suggestions[0].schedulable and (len(suggestions) == 1 or suggestions[1].score < suggestions[0].score):
+            return suggestions[0].target
+        return None
@@ -1,83 +1,150 @@
 import re
+import sys
+
+FREQUENCIES = {"once": 1, "twice": 2, "thrice": 3}
+ALLOWED_TIMES = {"morning", "afternoon", "evening"}  # Allowed preferred times
+# Patterns are compiled once, not looked up again for every line
+DRUG_LINE = re.compile(r"^(.*?):\s*(once|twice|thrice)\s+daily(?:\s*\((.*?)\))?$", re.IGNORECASE)
+MEAL_TIME = re.compile(r"^\d{1,2}(:\d{2})?\s*(am|pm)$")  # e.g., "8 am", "1 pm", "7:30 am"
+PATIENT_HEADER = re.compile(r"^patient\s*:\s*(.*)$", re.IGNORECASE)
+PATIENT_SEPARATOR = "---"
+
+class InputError(ValueError):
+    """ A malformed input line; the message is the one shown to the user. """
+
+class LineError:
+    """ A line of a feed that could not be parsed: its number, its text and what is wrong with it. """
+    __slots__ = ("line", "text", "message")
+
+    def __init__(self, line, text, message):
+        self.line = line
+        self.text = text
+        self.message = message
+
+    def to_dict(self):
+        return {"line": self.line, "text": self.text, "message": self.message}
+
+    def __repr__(self):
+        return f"LineError({self.line}, {self.message!r})"
+
+class PatientRecord:
+    """ One patient of a feed: header id (None without a header), first line, parsed regimen and line errors. """
+    __slots__ = ("patient", "line", "prescriptions", "diet", "errors")
+
+    def __init__(self, patient, line):
+        self.patient = patient
+        self.line = line
+        self.prescriptions = []
+        self.diet = {}
+        self.errors = []
+
+    def is_blank(self):
+        """ True for a separator followed by nothing: no header id, no regimen, no errors. """
+        return self.patient is None and not (self.prescriptions or self.diet or self.errors)
+
+    def __repr__(self):
+        return f"PatientRecord({self.patient!r}, {len(self.prescriptions)} prescriptions, {len(self.errors)} errors)"
+
+def parse_line(line, prescriptions, diet):
+    """ Add one stripped, non-comment line to `prescriptions` or `diet`, raising InputError when it is malformed. """
+    if line.lower().startswith("diet:"):
+        meal_entries = [m.strip() for m in line[len("Diet:"):].split(';') if m.strip()]  # Filter out empty entries
+        for m in meal_entries:  # Format: "breakfast 8 am"
+            parts = m.split()
+            if len(parts) < 2:  # Validate diet format
+                raise InputError("Syntax error in diet input. Please check input.")
+            meal_name = parts[0].lower()
+            meal_time = " ".join(parts[1:]).strip()
+            if not MEAL_TIME.match(meal_time):  # Check for valid time
+                raise InputError(f"Invalid time format for {meal_name}: '{meal_time}'. Please check input.")
+            diet[meal_name] = time_to_24h(meal_time)
+        return
+
+    match = DRUG_LINE.match(line)
+    if not match:
+        raise InputError(f"Syntax error in drug input: '{line}'. Please check input.")
+    drug = match.group(1).strip()
+    times_str = match.group(3)
+    preferred_times = []
+    if times_str:  # Validate preferred times if present
+        preferred_times = [t.strip() for t in times_str.split(',')]
+        for t in preferred_times:
+            if t not in ALLOWED_TIMES:
+                raise InputError(f"Invalid preferred time '{t}' for drug '{drug}'. Allowed values are: morning, afternoon, evening.")
+    prescriptions.append({
+        "name": drug,
+        "frequency": FREQUENCIES[match.group(2).lower()],
+        "preferred_times": preferred_times
+    })
 
 def parse_prescriptions(input_str: str):
-    lines = input_str.strip().split('\n')
+    """ (prescriptions, diet) of a single regimen; prints the problem and exits on the first malformed line. """
     prescriptions = []
     diet = {}
-    freq_map = {"once": 1, "twice": 2, "thrice": 3}
-    allowed_times = {"morning", "afternoon", "evening"}  # Allowed preferred times
-    drug_pattern = r"^(.*?):\s*(once|twice|thrice)\s+daily(?:\s*\((.*?)\))?$"
-    time_pattern = r"^\d{1,2}\s*(am|pm)$"  # e.g., "8 am", "1 pm"
-
-    for line in lines:
+    for line in input_str.strip().split('\n'):
         line = line.strip()
-        if line.startswith('#'):
-            continue  # Ignore comment lines
-
-        if line.lower().startswith("diet:"):
-            diet_line = line[len("Diet:"):].strip()
-            meal_entries = [m.strip() for m in diet_line.split(';') if m.strip()]  # Filter out empty entries
-            
-            for m in meal_entries:  # Format: "breakfast 8 am"
-                parts = m.split()
-                if len(parts) < 2:  # Validate diet format
-                    print("Syntax error in diet input. Please check input.")
-                    exit(1)
-                
-                meal_name = parts[0].lower()
-                meal_time = " ".join(parts[1:]).strip()
-
-                if not re.match(time_pattern, meal_time):  # Check for valid time
-                    print(f"Invalid time format for {meal_name}: '{meal_time}'. Please check input.")
-                    exit(1)
-
-                diet[meal_name] = convert_time_to_24h(meal_time)
-        
-        else:  # Drug line
-            match = re.match(drug_pattern, line, re.IGNORECASE)
-            if not match:
-                print(f"Syntax error in drug input: '{line}'. Please check input.")
-                exit(1)
-
-            drug = match.group(1).strip()
-            freq_word = match.group(2).lower().strip()
-            times_str = match.group(3)
-            
-            # Validate preferred times if present
-            if times_str:
-                preferred_times = [t.strip() for t in times_str.split(',')]
-                for t in preferred_times:
-                    if t not in allowed_times:
-                        print(f"Invalid preferred time '{t}' for drug '{drug}'. Allowed values are: morning, afternoon, evening.")
-                        exit(1)
-            else:
-                preferred_times = []
-
-            frequency = freq_map.get(freq_word, 1)
-
-            prescriptions.append({
-                "name": drug,
-                "frequency": frequency,
-                "preferred_times": preferred_times
-            })
-
+        if not line or line.startswith('#'):
+            continue  # Ignore blank and comment lines
+        try:
+            parse_line(line, prescriptions, diet)
+        except InputError as e:
+            print(e)
+            sys.exit(1)
     return prescriptions, diet
 
-def convert_time_to_24h(time_str):  # Simple conversion assuming format like "8 am", "1 pm"
+def iter_patients(stream):
+    """
+    Yield a PatientRecord per patient of a feed, reading `stream` (a file object or any iterable of
+    lines) one line at a time, so memory does not grow with the size of the feed.
+    A patient starts at a "Patient: <id>" header or after a "---" separator line; lines before the
+    first one form a patient without id. Malformed lines are collected in the record's errors and
+    parsing goes on with the next line.
+    """
+    record = None
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        header = PATIENT_HEADER.match(line)
+        if line == PATIENT_SEPARATOR or (header and not DRUG_LINE.match(line)):
+            if record is not None and not record.is_blank():
+                yield record
+            record = PatientRecord((header.group(1).strip() or None) if header else None, number)
+            continue
+        if record is None:
+            record = PatientRecord(None, number)
+        try:
+            parse_line(line, record.prescriptions, record.diet)
+        except InputError as e:
+            record.errors.append(LineError(number, line, str(e)))
+    if record is not None and not record.is_blank():
+        yield record
+
+def time_to_24h(time_str):
+    """ "HH:MM" of a time like "8 am", "1 pm" or "7:30 am", raising InputError when it is invalid. """
     parts = time_str.split()
-    if len(parts) != 2 or not parts[0].isdigit() or parts[1].lower() not in {"am", "pm"}:
-        print(f"Invalid time format: '{time_str}'. Please use formats like '8 am' or '1 pm'.")
-        exit(1)
-    
-    hour = int(parts[0])
+    clock = parts[0].split(':') if parts else []
+    if len(parts) != 2 or len(clock) > 2 or not all(c.isdigit() for c in clock) or parts[1].lower() not in {"am", "pm"}:
+        raise InputError(f"Invalid time format: '{time_str}'. Please use formats like '8 am', '1 pm' or '7:30 am'.")
+
+    hour = int(clock[0])
+    minute = int(clock[1]) if len(clock) == 2 else 0
     ampm = parts[1].lower()
     if hour < 1 or hour > 12:  # Validate hour range
-        print(f"Invalid hour in time: '{hour}'. Must be between 1 and 12.")
-        exit(1)
+        raise InputError(f"Invalid hour in time: '{hour}'. Must be between 1 and 12.")
+    if minute > 59:  # Validate minute range
+        raise InputError(f"Invalid minutes in time: '{time_str}'. Must be between 00 and 59.")
 
     if ampm == "pm" and hour != 12:
         hour += 12
     elif ampm == "am" and hour == 12:
         hour = 0
 
-    return f"{hour:02d}:00"
\ No newline at end of file
+    return f"{hour:02d}:{minute:02d}"
+
+def convert_time_to_24h(time_str):  # Simple conversion assuming format like "8 am", "1 pm" or "7:30 am"
+    try:
+        return time_to_24h(time_str)
+    except InputError as e:
+        print(e)
+        sys.exit(1)
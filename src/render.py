@@ -0,0 +1,215 @@
+"""
+Schedule output: the console table, the text file and the bulk export formats (JSON, CSV,
+iCalendar), all built from per-drug pieces formatted once and reused for every dose and patient.
+"""
+import csv, datetime, json, sys, textwrap, weakref
+from catalog import normalize_drug_name
+
+WARNING_WIDTH = 60
+EXPORT_FORMATS = ("txt", "json", "csv", "ics")
+FORMAT_NAMES = {"txt": "text", "json": "JSON", "csv": "CSV", "ics": "iCalendar"}
+ICS_PRODID = "-//medication-schedule-optimizer//EN"
+
+class WarningLayout:
+    """
+    Warning text of each drug of a catalog, wrapped to `width` on first use and kept: the lines of
+    a drug's block ("Drug: first line", then the continuation lines) are computed once per drug,
+    not once per dose.
+    """
+    def __init__(self, catalog, width=WARNING_WIDTH):
+        self.catalog = catalog
+        self.width = width
+        self._lines = {}
+
+    def warning(self, drug):
+        return self.catalog.warnings(drug)
+
+    def lines(self, drug):
+        """ Tuple of the wrapped warning lines of `drug`, the first one prefixed with its name. """
+        lines = self._lines.get(drug)
+        if lines is None:
+            key = normalize_drug_name(drug)
+            wrapped = textwrap.wrap(self.catalog.warnings(key), width=self.width) or ["None"]
+            lines = self._lines[drug] = (f"{key}: {wrapped[0]}", *wrapped[1:])
+        return lines
+
+_layouts = weakref.WeakKeyDictionary()
+
+def warning_layout(catalog, width=WARNING_WIDTH):
+    """ The WarningLayout of `catalog`, shared by every render of the same catalog. """
+    layouts = _layouts.setdefault(catalog, {})
+    if width not in layouts:
+        layouts[width] = WarningLayout(catalog, width)
+    return layouts[width]
+
+def format_table(schedule, layout):
+    """ The schedule as the console table (Time | Drugs | Warnings), one string without trailing newline. """
+    headers = ["Time", "Drugs", "Warnings"]
+    all_rows = []
+    for t, drugs in schedule.items():
+        combined_warnings = []
+        for d in drugs:
+            if combined_warnings:
+                combined_warnings.append("")  # blank line between drugs
+            combined_warnings.extend(layout.lines(d))
+        all_rows.append([[t], [", ".join(drugs)], combined_warnings])
+
+    col_widths = [0, 0, 0]
+    for row in all_rows:
+        for i, col_lines in enumerate(row):
+            col_widths[i] = max(col_widths[i], max(map(len, col_lines)))
+
+    sep = "+" + "+".join("-" * (w + 2) for w in col_widths) + "+"
+    header = "|"
+    for i, h in enumerate(headers):
+        space = col_widths[i] - len(h)
+        header += " " + (" " * (space // 2)) + h + (" " * (space - space // 2)) + " |"
+    out = [sep, header, sep]
+    for row in all_rows:
+        for line_idx in range(max(len(col) for col in row)):
+            line = "|"
+            for i, col_lines in enumerate(row):
+                cell_line = col_lines[line_idx] if line_idx < len(col_lines) else ""
+                line += " " + cell_line + " " * (col_widths[i] - len(cell_line) + 1) + "|"
+            out.append(line)
+        out.append(sep)
+    return "\n".join(out)
+
+def ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def ics_fold(line):
+    """ A content line folded at 75 octets as RFC 5545 requires, with CRLF endings. """
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # do not split a UTF-8 sequence
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start, limit = end, 74  # continuation lines start with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+class ScheduleWriter:
+    """
+    Writes the schedules of many patients to one stream in an export format: "txt" (the text
+    file layout), "json" (an array of {"patient", "schedule", "warnings"} objects), "csv" (one row
+    per dose: patient, time, drug, warnings) or "ics" (one daily recurring event per dose, starting
+    on `start`, default today). Output is collected in memory and written in chunks of about
+    `buffer_size` characters; use it as a context manager or call close() to write the ending
+    (and close the stream with `close_stream`).
+    """
+    def __init__(self, stream, fmt, catalog, start=None, buffer_size=1 << 16, close_stream=False):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}. Expected one of {', '.join(EXPORT_FORMATS)}.")
+        self.stream = stream
+        self.fmt = fmt
+        self.layout = warning_layout(catalog)
+        self.buffer_size = buffer_size
+        self.close_stream = close_stream
+        self.count = 0
+        self._parts = []
+        self._size = 0
+        self._pieces = {}  # drug -> its formatted piece in this format
+        if fmt == "csv":
+            self._csv = csv.writer(self, lineterminator="\n")
+            self._csv.writerow(["patient", "time", "drug", "warnings"])
+        elif fmt == "json":
+            self.write_raw("[")
+        elif fmt == "ics":
+            self.start = (start or datetime.date.today()).strftime("%Y%m%d")
+            self.stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            self.write_raw(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{ICS_PRODID}\r\nCALSCALE:GREGORIAN\r\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write_raw(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    write = write_raw  # file-like target of the csv writer
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts, self._size = [], 0
+
+    def close(self):
+        if self.fmt == "json":
+            self.write_raw("\n]\n" if self.count else "]\n")
+        elif self.fmt == "ics":
+            self.write_raw("END:VCALENDAR\r\n")
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+
+    def piece(self, drug):
+        piece = self._pieces.get(drug)
+        if piece is None:
+            piece = self._pieces[drug] = self._format_piece(drug)
+        return piece
+
+    def _format_piece(self, drug):
+        if self.fmt == "txt":
+            lines = self.layout.lines(drug)
+            return "".join([f"  {lines[0]}\n"] + [f"    {line}\n" for line in lines[1:]])
+        if self.fmt == "ics":
+            key = normalize_drug_name(drug)
+            return ics_fold(f"SUMMARY:{ics_escape(key)}") + ics_fold(f"DESCRIPTION:{ics_escape(self.layout.warning(key))}")
+        return self.layout.warning(drug)
+
+    def add(self, schedule, patient=None):
+        """ Append the schedule ({time: [drugs]}) of one patient; empty schedules are skipped. """
+        if not schedule:
+            return
+        getattr(self, f"_add_{self.fmt}")(schedule, patient)
+        self.count += 1
+
+    def _add_txt(self, schedule, patient):
+        parts = ["" if not self.count else "\n", f"Patient: {patient}\n" if patient is not None else "",
+                 "Medication Schedule\n", "=" * 20, "\n"]
+        for t, drugs in schedule.items():
+            parts.append(f"\nTime: {t}\nDrugs: {', '.join(drugs)}\nWarnings:\n")
+            parts.extend(self.piece(d) for d in drugs)
+            parts.append("\n")
+        self.write_raw("".join(parts))
+
+    def _add_json(self, schedule, patient):
+        warnings = {normalize_drug_name(d): self.piece(d) for drugs in schedule.values() for d in drugs}
+        entry = json.dumps({"patient": patient, "schedule": schedule, "warnings": warnings})
+        self.write_raw(("\n" if not self.count else ",\n") + entry)
+
+    def _add_csv(self, schedule, patient):
+        self._csv.writerows([patient, t, d, self.piece(d)] for t, drugs in schedule.items() for d in drugs)
+
+    def _add_ics(self, schedule, patient):
+        uid = f"{ics_escape(str(patient))}-{self.count}" if patient is not None else str(self.count)
+        parts = []
+        for t, drugs in schedule.items():
+            clock = t.replace(":", "")
+            for d in drugs:
+                parts.append(f"BEGIN:VEVENT\r\nUID:{uid}-{clock}-{normalize_drug_name(d).replace(' ', '')}@medsched\r\n"
+                             f"DTSTAMP:{self.stamp}\r\nDTSTART:{self.start}T{clock}00\r\nDURATION:PT15M\r\n"
+                             f"RRULE:FREQ=DAILY\r\n{self.piece(d)}END:VEVENT\r\n")
+        self.write_raw("".join(parts))
+
+def export_format(path):
+    """ Export format implied by a file name's extension ("txt" when it is not one of EXPORT_FORMATS). """
+    extension = path.rsplit(".", 1)[-1].lower() if "." in path else ""
+    return extension if extension in EXPORT_FORMATS else "txt"
+
+def open_export(path, catalog, fmt=None, start=None):
+    """ A ScheduleWriter over a new file at `path` ("-" for stdout), closed along with the writer. """
+    fmt = fmt or export_format(path)
+    if path == "-":
+        return ScheduleWriter(sys.stdout, fmt, catalog, start=start)
+    stream = open(path, "w", newline="" if fmt in ("csv", "ics") else None)
+    return ScheduleWriter(stream, fmt, catalog, start=start, close_stream=True)
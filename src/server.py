@@ -0,0 +1,312 @@
+"""
+Resident scheduling service: loads the datasets once and answers prescription requests as JSON,
+over a local HTTP port or a Unix socket.
+
+    python src/server.py --port 8765 [optimizer options]
+    python src/server.py --socket /tmp/medsched.sock [optimizer options]
+
+HTTP: POST /schedule with a request body, GET /stats, GET /health, and GET /metrics (Prometheus
+text) when started with --telemetry.
+Unix socket: one JSON request per line, answered by one JSON line; {"op": "stats"} and
+{"op": "health"} return the service counters, {"op": "metrics"} the telemetry totals, anything
+else is a schedule request.
+
+A schedule request is either {"input": "<prescription text, same format as the input files>"} or
+{"prescriptions": [{"name": "Metformin", "frequency": 2, "preferred_times": ["morning"]}, ...],
+ "diet": {"breakfast": "08:00", ...}}.
+Either may carry "previous_schedule": the {time: [drugs]} schedule returned before the regimen
+changed; the request is then re-planned from it, moving as few doses as possible ("moved" in the response).
+"""
+import argparse, contextlib, io, json, os, queue, re, signal, socketserver, sys, threading, time, traceback
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from main import MedicationScheduleOptimizer, add_optimizer_arguments, optimizer_options
+from batch import result_record
+from structured import regimen_from_dict
+from telemetry import Telemetry, NO_TELEMETRY
+
+class ServiceBusy(Exception):
+    """ The request queue is full. """
+
+class ThreadOutput:
+    """
+    Stand-in for sys.stdout that sends what a thread prints to that thread's capture buffer, if any.
+    The optimizer reports input problems on stdout; with several requests solved at once,
+    contextlib.redirect_stdout would mix their messages.
+    """
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def capture(self):
+        buffer = io.StringIO()
+        self._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            self._local.buffer = None
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._default).write(text)
+
+    def flush(self):
+        buffer = getattr(self._local, "buffer", None)
+        (buffer or self._default).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._default, name)
+
+class ScheduleService:
+    """
+    Warm datasets, a bounded request queue and `workers` solver threads.
+    submit() queues a request and returns a Future; it raises ServiceBusy when `queue_size`
+    requests are already waiting. CP-SAT releases the GIL while searching, so threads solve
+    requests concurrently.
+    With the `telemetry` option, the telemetry of every request is added to self.telemetry and, when
+    `telemetry_path` is set, appended there as a JSON line.
+    """
+    def __init__(self, workers=None, queue_size=64, telemetry_path=None, **options):
+        self.options = options
+        self.telemetry_path = telemetry_path
+        self.base = MedicationScheduleOptimizer(**options)
+        self.base.load_and_prepare_data()
+        self.base.name_index  # built once here, shared by every request's optimizer
+        self.telemetry = Telemetry() if options.get("telemetry") else NO_TELEMETRY
+        self.telemetry.merge(self.base.telemetry)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.started = time.time()
+        self.counters = {"served": 0, "scheduled": 0, "infeasible": 0, "timeout": 0, "error": 0, "rejected": 0}
+        self._lock = threading.Lock()
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        self._threads = [threading.Thread(target=self._work, daemon=True, name=f"solver-{n}")
+                         for n in range(workers or os.cpu_count() or 1)]
+        for thread in self._threads:
+            thread.start()
+        self.warm_up()
+
+    def warm_up(self):
+        """ Run one solve up front so the first request does not pay for the solver's initialisation. """
+        names = sorted(record.key for record in self.base.drug_data)[:2]
+        if names:
+            self.handle({"prescriptions": [{"name": name, "frequency": 1} for name in names]}, count=False)
+
+    def optimizer(self):
+        """ A per-request optimizer sharing the loaded datasets, index and result cache. """
+        optimizer = MedicationScheduleOptimizer(**{**self.options, "cache_size": 0, "cache_path": None})
+        optimizer.interactions = self.base.interactions
+        optimizer.drug_data = self.base.drug_data
+        optimizer.index = self.base.index
+        optimizer._name_index = self.base._name_index
+        optimizer.cache = self.base.cache
+        optimizer.dataset_version = self.base.dataset_version
+        return optimizer
+
+    def submit(self, request):
+        future = Future()
+        try:
+            self.queue.put_nowait((request, future))
+        except queue.Full:
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise ServiceBusy(f"{self.queue.maxsize} requests already waiting")
+        return future
+
+    def _work(self):
+        while True:
+            request, future = self.queue.get()
+            try:
+                future.set_result(self.handle(request))
+            except Exception as e:  # keep the worker alive, the caller gets the error
+                future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    def handle(self, request, count=True):
+        """
+        Schedule one request and return the JSON response: result fields plus the interaction report.
+        An unexpected exception gives an error response marked "internal" (popped by the transports,
+        HTTP answers it with 500) and its traceback on stderr.
+        """
+        start = time.perf_counter()
+        optimizer = self.optimizer()
+        with sys.stdout.capture() as messages:
+            try:
+                if not isinstance(request, dict):
+                    raise ValueError("Expected a JSON object.")
+                if isinstance(request.get("input"), str):
+                    optimizer.parse_input_prescriptions(input_str=request["input"])
+                else:
+                    prescriptions, diet = regimen_from_dict(request)
+                    if not prescriptions:
+                        raise ValueError("No prescriptions found in the request.")
+                    optimizer.load_regimen(prescriptions, diet)
+                previous_schedule = request.get("previous_schedule")
+                if previous_schedule is not None and not (
+                        isinstance(previous_schedule, dict) and all(
+                            re.fullmatch(r"\d\d:\d\d", t) and isinstance(drugs, list)
+                            and all(isinstance(drug, str) for drug in drugs) for t, drugs in previous_schedule.items())):
+                    raise ValueError("previous_schedule must map times (HH:MM) to lists of drugs.")
+                result = optimizer.solve(previous_schedule)
+                response = result_record(result)
+            except SystemExit:
+                response = {"status": "error", "error": messages.getvalue().strip() or "Invalid input."}
+            except ValueError as e:
+                response = {"status": "error", "error": str(e)}
+            except Exception as e:
+                traceback.print_exc(file=sys.stderr)
+                response = {"status": "error", "error": f"{type(e).__name__}: {e}", "internal": True}
+        if response["status"] != "error":
+            response["interactions"] = interaction_report(optimizer)
+            if optimizer.corrections:
+                response["corrections"] = [{"given": given, "drug": drug} for given, drug in optimizer.corrections]
+        response["latency"] = round(time.perf_counter() - start, 6)
+        if count and self.telemetry.enabled:
+            self.telemetry.merge(optimizer.telemetry)
+            if self.telemetry_path:
+                optimizer.telemetry.emit(self.telemetry_path, status=response["status"], latency=response["latency"])
+        if count:
+            with self._lock:
+                self.counters["served"] += 1
+                self.counters[response["status"]] += 1
+        return response
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        stats = {"uptime": round(time.time() - self.started, 3), "workers": len(self._threads),
+                 "queued": self.queue.qsize(), "queue_size": self.queue.maxsize, **counters}
+        if self.base.cache is not None:
+            stats["cache"] = self.base.cache.stats()
+        return stats
+
+def interaction_report(optimizer):
+    """ The known interactions between the prescribed drugs, as listed by the interactive report. """
+    return [{"drugs": list(pair), "risk": bool(interaction['risk']),
+             "undesirable": bool(interaction.get('undesirable', 0)), "description": interaction['description']}
+            for pair, interaction in optimizer.prescribed_interactions()]
+
+def make_http_server(service, host, port):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self.send_json(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self.send_json(200, service.stats())
+            elif self.path == "/metrics" and service.telemetry.enabled:
+                body = service.telemetry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_json(404, {"status": "error", "error": f"Unknown path {self.path}."})
+
+        def do_POST(self):
+            if self.path != "/schedule":
+                self.send_json(404, {"status": "error", "error": f"Unknown path {self.path}."})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self.send_json(400, {"status": "error", "error": "Request body is not valid JSON."})
+                return
+            try:
+                response = service.submit(request).result()
+            except ServiceBusy as e:
+                self.send_json(503, {"status": "error", "error": f"Service busy: {e}."})
+                return
+            if response.pop("internal", False):
+                self.send_json(500, response)
+            else:
+                self.send_json(400 if response["status"] == "error" else 200, response)
+
+        def log_message(self, format, *args):
+            pass  # no per-request access log on stderr
+
+    class Server(ThreadingHTTPServer):
+        request_queue_size = 128  # pending connections; the service queue decides what is refused
+
+    return Server((host, port), Handler)
+
+def make_socket_server(service, path):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"status": "error", "error": "Request is not valid JSON."}
+                else:
+                    op = request.get("op", "schedule") if isinstance(request, dict) else "schedule"
+                    if op == "health":
+                        response = {"status": "ok"}
+                    elif op == "stats":
+                        response = service.stats()
+                    elif op == "metrics":
+                        response = service.telemetry.to_dict()
+                    else:
+                        try:
+                            response = service.submit(request).result()
+                        except ServiceBusy as e:
+                            response = {"status": "error", "error": f"Service busy: {e}."}
+                        response.pop("internal", None)
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+
+    if os.path.exists(path):
+        os.remove(path)
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    return Server(path, Handler)
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Medication Schedule Optimizer service")
+    listen = arg_parser.add_mutually_exclusive_group()
+    listen.add_argument("--port", type=int, default=8765, help="local HTTP port (default: 8765)")
+    listen.add_argument("--socket", metavar="PATH", help="serve newline-delimited JSON on a Unix socket instead of HTTP")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="HTTP address to bind (default: 127.0.0.1)")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="requests solved at the same time (default: number of CPUs)")
+    arg_parser.add_argument("--queue-size", type=int, default=64,
+                            help="requests allowed to wait for a worker before new ones are refused")
+    add_optimizer_arguments(arg_parser)
+    return arg_parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    # one JSON line per request in the --telemetry file; Prometheus totals are served on /metrics instead
+    telemetry_path = args.telemetry if args.telemetry_format == "json" else None
+    service = ScheduleService(workers=args.workers, queue_size=args.queue_size, telemetry_path=telemetry_path,
+                              **optimizer_options(args))
+    if args.socket:
+        server = make_socket_server(service, args.socket)
+        print(f"Serving on unix socket {args.socket}", file=sys.stderr)
+    else:
+        server = make_http_server(service, args.host, args.port)
+        print(f"Serving on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))  # clean up the socket on kill too
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
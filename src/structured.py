@@ -0,0 +1,189 @@
+"""
+Structured prescription inputs: JSON objects and CSV rows, turned into the same prescription and
+diet structures as the text format without going through its regular expressions.
+
+JSON regimen: {"patient": "id", "prescriptions": [{"name": "Metformin", "frequency": 2,
+"preferred_times": ["morning"]}, ...], "diet": {"breakfast": "08:00", ...}}. A .json file holds one
+regimen or an array of them; a .jsonl file holds one per line (use it for large feeds, a document
+has to be loaded whole).
+
+CSV: one row per prescription with the columns patient, drug, frequency, preferred_times and
+optionally breakfast, lunch and dinner. Rows of a patient must be consecutive. Frequencies are
+1-3 or once/twice/thrice; preferred times are separated by ';', '|' or ','; meal times are
+HH:MM or "8 am".
+"""
+import csv, json
+from catalog import normalize_drug_name
+from name_index import unknown_drug_message
+from parser import ALLOWED_TIMES, FREQUENCIES, MEAL_TIME, InputError, LineError, PatientRecord, time_to_24h
+
+MEALS = ("breakfast", "lunch", "dinner")
+CSV_COLUMNS = ("patient", "drug", "frequency", "preferred_times")
+FREQUENCY_CODES = {**FREQUENCIES, "1": 1, "2": 2, "3": 3}
+
+def parse_frequency(value, drug):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        value = FREQUENCIES.get(value, int(value) if value.isascii() and value.isdecimal() else None)
+    if type(value) is not int or value not in (1, 2, 3):  # no bools, no floats such as 2.0
+        raise InputError(f"Invalid frequency for {drug}: expected 1, 2 or 3 doses a day.")
+    return value
+
+def parse_preferred_times(value, drug):
+    if isinstance(value, str):
+        value = [t.strip().lower() for t in value.replace('|', ';').replace(',', ';').split(';') if t.strip()]
+    if not isinstance(value, list) or any(not isinstance(t, str) or t not in ALLOWED_TIMES for t in value):
+        raise InputError(f"Invalid preferred times for {drug}. Allowed values are: morning, afternoon, evening.")
+    return list(value)
+
+def parse_meal_time(meal, value):
+    """ "HH:MM" of a meal time given as "HH:MM" or in the 12-hour text format ("8 am"). """
+    if isinstance(value, str):
+        value = value.strip()
+        digits = value[:2] + value[3:]
+        if len(value) == 5 and value[2] == ':' and digits.isascii() and digits.isdecimal():
+            if int(value[:2]) > 23 or int(value[3:]) > 59:
+                raise InputError(f"Invalid time for {meal}: {value!r}, hours must be 00-23 and minutes 00-59.")
+            return value
+        if MEAL_TIME.match(value):
+            return time_to_24h(value)
+    raise InputError(f"Invalid time for {meal}: {value!r}, expected HH:MM or a time like '8 am'.")
+
+def regimen_from_dict(data):
+    """ (prescriptions, diet) of a JSON regimen, raising InputError on the first malformed field. """
+    if not isinstance(data, dict):
+        raise InputError("Expected a JSON object.")
+    entries = data.get("prescriptions") or []
+    if not isinstance(entries, list):
+        raise InputError("Invalid prescriptions: expected a list of prescription objects.")
+    prescriptions = []
+    for position, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not isinstance(entry.get("name"), str) or not entry["name"].strip():
+            raise InputError(f"Invalid prescription {position} ({entry!r}): a drug name is required.")
+        name = entry["name"].strip()
+        prescriptions.append({"name": name, "frequency": parse_frequency(entry.get("frequency", 1), name),
+                              "preferred_times": parse_preferred_times(entry.get("preferred_times", []), name)})
+    diet = data.get("diet") or {}
+    if not isinstance(diet, dict):
+        raise InputError("Invalid diet: expected an object mapping meals to times.")
+    return prescriptions, {meal.lower(): parse_meal_time(meal, t) for meal, t in diet.items()}
+
+def flag_unknown_drugs(record, known_drugs, lines, resolve=None):
+    """
+    Add a LineError to `record` for every prescription whose drug is not in `known_drugs` (a set of
+    normalized names), found with one set difference; `lines` gives the line of each prescription.
+    `resolve(name)` -> (drug or None, suggestions), when given, renames the prescriptions it can
+    resolve and provides the suggestions of the others.
+    """
+    names = [normalize_drug_name(pres['name']) for pres in record.prescriptions]
+    unknown = set(names) - known_drugs
+    if not unknown:
+        return
+    for name, pres, line in zip(names, record.prescriptions, lines):
+        if name in unknown:
+            target, suggestions = resolve(name) if resolve is not None else (None, [])
+            if target is not None:
+                pres['name'] = target
+                continue
+            record.errors.append(LineError(line, pres['name'], unknown_drug_message(name, suggestions)))
+    record.errors.sort(key=lambda error: error.line)
+
+def iter_json_patients(stream, known_drugs=None, lines=False, resolve=None):
+    """
+    Yield a PatientRecord per regimen of a JSON document (object or array), or with `lines` of a
+    JSON Lines stream, read one line at a time. The record's line is the line of a JSON Lines entry,
+    or the position in the array. With `known_drugs`, unknown drug names are reported as errors
+    (see flag_unknown_drugs for `resolve`).
+    """
+    if lines:
+        entries = ((number, line) for number, line in enumerate(stream, 1) if line.strip())
+    else:
+        try:
+            document = json.load(stream)
+        except ValueError as e:
+            record = PatientRecord(None, 1)
+            record.errors.append(LineError(e.lineno, None, f"Invalid JSON: {e.msg}."))
+            yield record
+            return
+        entries = enumerate(document if isinstance(document, list) else [document], 1)
+    for number, entry in entries:
+        record = PatientRecord(None, number)
+        try:
+            data = json.loads(entry) if lines else entry
+            if isinstance(data, dict) and data.get("patient") is not None:
+                record.patient = str(data["patient"])
+            record.prescriptions, record.diet = regimen_from_dict(data)
+        except json.JSONDecodeError as e:
+            record.errors.append(LineError(number, entry.strip(), f"Invalid JSON: {e.msg}."))
+        except InputError as e:
+            record.errors.append(LineError(number, None, str(e)))
+        if known_drugs is not None:
+            flag_unknown_drugs(record, known_drugs, [number] * len(record.prescriptions), resolve)
+        yield record
+
+def iter_csv_patients(stream, known_drugs=None, resolve=None):
+    """
+    Yield a PatientRecord per patient of a prescription CSV (see the module docstring), reading it
+    row by row with the csv module. Every bad row of a patient is reported, not only the first;
+    with `known_drugs`, drug names are checked in bulk per patient (see flag_unknown_drugs).
+    """
+    reader = csv.reader(stream)
+    header = [column.strip().lower() for column in next(reader, [])]
+    missing = [column for column in CSV_COLUMNS[1:] if column not in header]
+    if missing:
+        record = PatientRecord(None, 1)
+        record.errors.append(LineError(1, ",".join(header), f"Missing CSV columns: {', '.join(missing)}."))
+        yield record
+        return
+    patient_col = header.index("patient") if "patient" in header else None
+    drug_col, frequency_col, times_col = (header.index(c) for c in CSV_COLUMNS[1:])
+    meal_cols = [(meal, header.index(meal)) for meal in MEALS if meal in header]
+    width = len(header)
+
+    # a feed repeats a handful of distinct frequency, preferred-time and meal-time strings: each is
+    # validated once and looked up afterwards
+    frequencies = dict(FREQUENCY_CODES)
+    preferred = {}
+    meal_times = {}
+    record, lines = None, []
+    for row in reader:
+        if not row or (len(row) == 1 and not row[0].strip()):
+            continue
+        number = reader.line_num
+        patient = (row[patient_col].strip() or None) if patient_col is not None and patient_col < len(row) else None
+        if record is None or patient != record.patient:
+            if record is not None:
+                yield _finish(record, known_drugs, lines, resolve)
+            record, lines = PatientRecord(patient, number), []
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+        drug = row[drug_col].strip()
+        try:
+            if not drug:
+                raise InputError("Missing drug name.")
+            frequency = frequencies.get(row[frequency_col])
+            if frequency is None:
+                frequency = frequencies[row[frequency_col]] = parse_frequency(row[frequency_col], drug)
+            times = preferred.get(row[times_col])
+            if times is None:
+                times = preferred[row[times_col]] = tuple(parse_preferred_times(row[times_col], drug))
+            pres = {"name": drug, "frequency": frequency, "preferred_times": list(times)}
+            for meal, col in meal_cols:
+                if row[col].strip():
+                    t = meal_times.get((meal, row[col]))
+                    if t is None:
+                        t = meal_times[(meal, row[col])] = parse_meal_time(meal, row[col])
+                    if record.diet.setdefault(meal, t) != t:
+                        raise InputError(f"Conflicting {meal} times for the same patient: {record.diet[meal]} and {t}.")
+        except InputError as e:
+            record.errors.append(LineError(number, ",".join(row), str(e)))
+            continue
+        record.prescriptions.append(pres)
+        lines.append(number)
+    if record is not None:
+        yield _finish(record, known_drugs, lines, resolve)
+
+def _finish(record, known_drugs, lines, resolve):
+    if known_drugs is not None:
+        flag_unknown_drugs(record, known_drugs, lines, resolve)
+    return record
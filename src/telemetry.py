@@ -0,0 +1,111 @@
+import contextlib, json, sys, threading, time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+_NO_PHASE = contextlib.nullcontext()
+
+def peak_rss_bytes():
+    """ Peak resident set size of this process, or None where it cannot be read. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, kilobytes elsewhere
+
+class Telemetry:
+    """
+    Timings and counters of one run of the pipeline.
+    - phase(name): context manager adding the wall and CPU time of the block to `name`. CPU time is
+      the process's, so it includes the solver's worker threads.
+    - count(name, value): adds to a counter (model size, solver conflicts and branches, ...).
+    - label(name, value): remembers a value (solver status, method, ...).
+    A disabled instance hands out a shared no-op context manager and ignores counts and labels,
+    so the instrumentation can stay in place at almost no cost.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phases = {}
+        self.counters = {}
+        self.labels = {}
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NO_PHASE
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self._lock:
+                entry = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+                entry["wall"] += wall
+                entry["cpu"] += cpu
+                entry["calls"] += 1
+
+    def count(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def label(self, name, value):
+        if self.enabled:
+            self.labels[name] = value
+
+    def merge(self, other):
+        """ Add the phases and counters of another Telemetry (or of its to_dict() record) into this one. """
+        record = other.to_dict() if isinstance(other, Telemetry) else other
+        with self._lock:
+            for name, entry in record.get("phases", {}).items():
+                mine = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0})
+                for key in mine:
+                    mine[key] += entry[key]
+            for name, value in record.get("counters", {}).items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        with self._lock:
+            phases = {name: {"wall": round(e["wall"], 6), "cpu": round(e["cpu"], 6), "calls": e["calls"]}
+                      for name, e in self.phases.items()}
+            return {"phases": phases, "counters": dict(self.counters), "labels": dict(self.labels),
+                    "peak_rss_bytes": peak_rss_bytes()}
+
+    def to_json_line(self, **extra):
+        return json.dumps({**extra, **self.to_dict()}) + "\n"
+
+    def to_prometheus(self, prefix="medsched"):
+        """ Prometheus text exposition: per-phase seconds and calls, counters and peak memory. """
+        record = self.to_dict()
+        lines = [f"# TYPE {prefix}_phase_seconds counter"]
+        for name, e in sorted(record["phases"].items()):
+            lines.append(f'{prefix}_phase_seconds{{phase="{name}",clock="wall"}} {e["wall"]}')
+            lines.append(f'{prefix}_phase_seconds{{phase="{name}",clock="cpu"}} {e["cpu"]}')
+        lines.append(f"# TYPE {prefix}_phase_calls counter")
+        for name, e in sorted(record["phases"].items()):
+            lines.append(f'{prefix}_phase_calls{{phase="{name}"}} {e["calls"]}')
+        for name, value in sorted(record["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name} {value}")
+        if record["peak_rss_bytes"] is not None:
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {record['peak_rss_bytes']}")
+        return "\n".join(lines) + "\n"
+
+    def emit(self, path, fmt="json", **extra):
+        """ Append the record to `path` ("-" for stderr) as a JSON line or Prometheus text. """
+        write_telemetry(path, self.to_json_line(**extra) if fmt == "json" else self.to_prometheus())
+
+def write_telemetry(path, text):
+    if path == "-":
+        sys.stderr.write(text)
+        return
+    with open(path, 'a') as f:
+        f.write(text)
+
+NO_TELEMETRY = Telemetry(enabled=False)  # default of the instrumented functions
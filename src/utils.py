@@ -1,73 +1,73 @@
-import pandas as pd
-import textwrap
-from ortools.sat.python import cp_model
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+# pandas and OR-Tools are imported inside the functions that need them: together they take most of
+# the start-up time, and parsing, validation or the greedy path can do without them
+from catalog import DrugCatalog
+from interaction_graph import as_interaction_graph
+from verify import Violation, verify_slots, precheck
+from telemetry import NO_TELEMETRY
+from render import FORMAT_NAMES, format_table, open_export, export_format, warning_layout
 
 RISK_PRIORITY = {"Unknown": 0}
+DEFAULT_MEAL_TIMES = frozenset({"08:00", "13:00", "19:00"})  # meal slots of a regimen without a diet
 
 def load_data(db_interactions_csv, drug_data_csv):
+    import pandas as pd
     df_db_interactions = pd.read_csv(db_interactions_csv)
     df_drug_data = pd.read_csv(drug_data_csv)
     return df_db_interactions, df_drug_data
 
-def build_interaction_dict(df_db_interactions):
-    df_db_interactions['Drug 1'] = df_db_interactions['Drug 1'].str.title()
-    df_db_interactions['Drug 2'] = df_db_interactions['Drug 2'].str.title()
-
+def interaction_table(df_db_interactions):
+    """
+    DataFrame of the distinct sorted drug pairs (columns first, second, risk, undesirable,
+    description), computed column-wise. When a pair appears more than once the last row wins,
+    while the pair keeps the position of its first occurrence (same as assigning into a dict row by row).
+    """
+    import pandas as pd
     risk_phrase = "the risk or severity of adverse effects can be increased when"
     undesirable_phrase = "therapeutic efficacy of"
 
-    interactions = {}
-    for _, row in df_db_interactions.iterrows():
-        dA, dB = row['Drug 1'], row['Drug 2']
-        pair = tuple(sorted([dA, dB]))
+    drug_a = df_db_interactions['Drug 1'].str.title()
+    drug_b = df_db_interactions['Drug 2'].str.title()
+    desc = df_db_interactions['Interaction Description']
+    desc_lower = desc.str.lower()
+
+    swap = drug_a > drug_b  # canonical key: alphabetical order of the two names
+    pairs = pd.DataFrame({
+        "first": drug_a.where(~swap, drug_b),
+        "second": drug_b.where(~swap, drug_a),
+        "risk": desc_lower.str.contains(risk_phrase, regex=False).fillna(False).astype(int),
+        "undesirable": desc_lower.str.contains(undesirable_phrase, regex=False).fillna(False).astype(int),
+        "description": desc,
+    })
+    first_seen = pairs.groupby(["first", "second"], sort=False).ngroup()
+    pairs = pairs.assign(order=first_seen).drop_duplicates(subset=["first", "second"], keep="last")
+    return pairs.sort_values("order", kind="stable").drop(columns="order")
 
-        desc = row['Interaction Description']
-        desc_lower = desc.lower()
-
-        is_risky = risk_phrase in desc_lower
-        is_undesirable = undesirable_phrase in desc_lower
-
-        interactions[pair] = {
-            "risk": 1 if is_risky else 0,
-            "undesirable": 1 if is_undesirable else 0,
-            "description": desc
-        }
-    return interactions
+def build_interaction_dict(df_db_interactions):
+    """ Map each sorted drug pair to its risk/undesirable flags and description (see interaction_table). """
+    pairs = interaction_table(df_db_interactions)
+    # Only the final materialisation into the dict touches Python objects one pair at a time
+    keys = zip(pairs["first"].tolist(), pairs["second"].tolist())
+    values = zip(pairs["risk"].tolist(), pairs["undesirable"].tolist(), pairs["description"].tolist())
+    return {key: {"risk": r, "undesirable": u, "description": d} for key, (r, u, d) in zip(keys, values)}
+
+def get_catalog(drug_data):
+    """ Accept either a prebuilt DrugCatalog or a raw drug DataFrame (converted on the spot). """
+    if isinstance(drug_data, DrugCatalog):
+        return drug_data
+    return DrugCatalog.from_frame(drug_data)
 
 def get_warnings_map(drug_data):
-    warnings_map = {}
-    if drug_data is not None and 'Drug Name' in drug_data.columns and 'Warnings and Precautions' in drug_data.columns:
-        for _, row in drug_data.iterrows():
-            drug_name = row['Drug Name'].title()
-            w = row['Warnings and Precautions']
-            warnings_map[drug_name] = w if isinstance(w, str) else "None"
-    return warnings_map
+    return get_catalog(drug_data).warnings_map()
 
 def drug_requires_no_food(drug_name, drug_data):
-    if drug_data is not None and 'Drug Name' in drug_data.columns and 'Warnings and Precautions' in drug_data.columns:
-        row = drug_data[drug_data['Drug Name'].str.title() == drug_name.title()]
-        if not row.empty:
-            instructions = row.iloc[0]['Warnings and Precautions']
-            if isinstance(instructions, str):
-                instructions_lower = instructions.lower()
-                if "without food" in instructions_lower or \
-                   "empty stomach" in instructions_lower or \
-                   "before a meal" in instructions_lower:
-                    return True
-    return False
+    return get_catalog(drug_data).requires_no_food(drug_name)
 
 def drug_requires_food(drug_name, drug_data):
-    if (drug_data is not None and
-        'Drug Name' in drug_data.columns and
-        'Warnings and Precautions' in drug_data.columns):
-        row = drug_data[drug_data['Drug Name'].str.title() == drug_name.title()]
-        if not row.empty:
-            instructions = row.iloc[0]['Warnings and Precautions']
-            if isinstance(instructions, str):
-                instructions_lower = instructions.lower()
-                if "with food" in instructions_lower or "with meals" in instructions_lower:
-                    return True
-    return False
+    return get_catalog(drug_data).requires_food(drug_name)
 
 def get_max_separation_slots(time_preferences, frequency):
     """ 
@@ -86,61 +86,153 @@ def get_max_separation_slots(time_preferences, frequency):
         chosen_slots.append(group[0])  # Pick the first available time in each group
     return chosen_slots
 
+def print_diet_notes(prescriptions, drug_data, diet):
+    if diet:  # Notes are only needed when default meal times are being used
+        return
+    food_drugs = [pres['name'] for pres in prescriptions if drug_requires_food(pres['name'], drug_data)]
+    no_food_drugs = [pres['name'] for pres in prescriptions if drug_requires_no_food(pres['name'], drug_data)]
+    if food_drugs:
+        print(f"\n\033[1mNote:\033[0m Using default meal times (08:00, 13:00, 19:00) for drugs that require food: {', '.join(food_drugs)}.")
+    if no_food_drugs:
+        print(f"\033[1mNote:\033[0m Avoiding default meal times (08:00, 13:00, 19:00) for drugs that require no food: {', '.join(no_food_drugs)}.")
+
 def handle_diet_constraints(prescriptions, drug_vars, drug_data, diet, model):
-    meal_times = set(diet.values()) if diet else {"08:00", "13:00", "19:00"}
-    food_drugs = []  # Collect drugs that require food
-    no_food_drugs = []  # Collect drugs that require no food
+    meal_times = set(diet.values()) if diet else DEFAULT_MEAL_TIMES
 
     # With food => must align with meal times
     for i, pres in enumerate(prescriptions):
         if drug_requires_food(pres['name'], drug_data):
             for d_idx in range(pres['frequency']):
                 model.Add(sum(drug_vars[(i, d_idx, t)] for t in meal_times) == 1)
-            if not diet:  # Add drug name only if default meal times are being used
-                food_drugs.append(pres['name'])
 
     # Without food => must avoid meal times
     for i, pres in enumerate(prescriptions):
         if drug_requires_no_food(pres['name'], drug_data):
             for d_idx in range(pres['frequency']):
                 model.Add(sum(drug_vars[(i, d_idx, t)] for t in meal_times) == 0)  # No dose should happen at meal times
-            if not diet:  # Add drug name only if default meal times are being used
-                no_food_drugs.append(pres['name']) 
 
-    # Print notes with all food-related and no-food-related drugs
-    if food_drugs:
-        print(f"\n\033[1mNote:\033[0m Using default meal times (08:00, 13:00, 19:00) for drugs that require food: {', '.join(food_drugs)}.")
-    if no_food_drugs:
-        print(f"\033[1mNote:\033[0m Avoiding default meal times (08:00, 13:00, 19:00) for drugs that require no food: {', '.join(no_food_drugs)}.")
+
+def get_interacting_doses(prescriptions, interactions):
+    """
+    [(interaction kind, (i1, d1), (i2, d2))] for every pair of doses of two prescribed drugs with a
+    risky ("risk") or undesirable ("undesirable") interaction. Risky wins when a pair is flagged as both.
+    """
+    graph = as_interaction_graph(interactions)
+    name_indices = {}
+    for i, pres in enumerate(prescriptions):
+        name_indices.setdefault(pres['name'], []).append(i)
+
+    dose_pairs = []
+    for pair, interaction in graph.pairs_among(name_indices):
+        if interaction['risk'] == 1:
+            kind = "risk"
+        elif interaction.get('undesirable', 0) == 1:
+            kind = "undesirable"
+        else:
+            continue
+        for i1 in name_indices[pair[0]]:
+            for i2 in name_indices[pair[1]]:
+                for d1 in range(prescriptions[i1]['frequency']):
+                    for d2 in range(prescriptions[i2]['frequency']):
+                        dose_pairs.append((kind, (i1, d1), (i2, d2)))
+    return dose_pairs
 
 def add_interaction_constraints(model, prescriptions, interactions, drug_vars, times):
     """
-    Add constraints for risky and undesirable drug combinations.
-    - Risky combinations: Must be respected for feasibility.
-    - Undesirable combinations: Attempt to enforce but silently ignore if unfeasible.
-    """
-    for pair, interaction in interactions.items():
-        drug1, drug2 = pair
-        drug1_indices = [i for i, pres in enumerate(prescriptions) if pres['name'] == drug1]
-        drug2_indices = [i for i, pres in enumerate(prescriptions) if pres['name'] == drug2]
-
-        for i1 in drug1_indices:
-            for i2 in drug2_indices:
-                for t in times:
-                    if interaction['risk'] == 1:  # Risky interaction: strict constraint
-                        model.Add(drug_vars[(i1, 0, t)] + drug_vars[(i2, 0, t)] <= 1)
-                    elif interaction.get('undesirable', 0) == 1:  # Undesirable interaction: attempt but ignore if infeasible
-                        try:
-                            model.Add(drug_vars[(i1, 0, t)] + drug_vars[(i2, 0, t)] <= 1)
-                        except Exception:
-                            # Silently ignore this undesirable constraint if it causes infeasibility
-                            pass
-
-def create_schedule(prescriptions, interactions, drug_data, diet):
-    model = cp_model.CpModel()
-    base_times = [f"{hour:02d}:00" for hour in range(6, 23)]
-    meal_times = set(diet.values()) if diet else {"08:00", "13:00", "19:00"}
+    Add constraints for risky and undesirable drug combinations, over every dose of both drugs.
+    - Risky combinations: hard, two doses never share a time slot.
+    - Undesirable combinations: soft, sharing a slot is allowed at a cost.
+    Returns the penalty terms [(weight, expression)] of the undesirable combinations.
+    """
+    penalties = []
+    for kind, (i1, d1), (i2, d2) in get_interacting_doses(prescriptions, interactions):
+        if kind == "risk":
+            for t in times:
+                model.Add(drug_vars[(i1, d1, t)] + drug_vars[(i2, d2, t)] <= 1)
+        else:
+            same_slot = model.NewBoolVar(f"undesirable_{i1}_{d1}_{i2}_{d2}")
+            for t in times:
+                model.Add(drug_vars[(i1, d1, t)] + drug_vars[(i2, d2, t)] <= 1 + same_slot)
+            penalties.append((UNDESIRABLE_WEIGHT, same_slot))
+    return penalties
+
+FORMULATIONS = ("boolean", "integer")
+RESOLUTIONS = (60, 30, 20, 15, 10, 5)  # supported slot lengths in minutes (divisors of an hour)
+MIN_DOSE_GAP_MINUTES = 120  # spacing between two doses of the same drug (two slots on the hourly grid)
+EXPLAIN_MAX_TIME = 10.0  # seconds for explaining an infeasible regimen when no --max-time is set
+
+# Objective weights of the soft constraints (per dose)
+UNDESIRABLE_WEIGHT = 10  # two doses of an undesirable combination share a slot
+PREFERENCE_WEIGHT = 3  # a dose is placed outside its preferred time of day
+MOVE_WEIGHT = 2  # re-planning: a dose leaves its slot in the previous schedule (less than any other soft rule)
+
+def time_to_minutes(t):
+    hours, minutes = t.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def minutes_to_time(m):
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+def get_time_slots(diet, resolution=60):
+    """ Slots from 06:00 to 22:00 every `resolution` minutes, plus the meal times. """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unsupported slot resolution {resolution}, expected one of {', '.join(map(str, RESOLUTIONS))} minutes.")
+    base_times = [minutes_to_time(m) for m in range(6 * 60, 22 * 60 + 1, resolution)]
+    meal_times = set(diet.values()) if diet else DEFAULT_MEAL_TIMES
     times = sorted(set(base_times).union(meal_times))
+    return times, meal_times
+
+def get_time_preferences(times):
+    """ Time-of-day preferences (pre-defined slots) """
+    return {
+        "morning": [t for t in times if "06:00" <= t <= "12:00"],
+        "afternoon": [t for t in times if "12:01" <= t <= "17:59"],
+        "evening": [t for t in times if "18:00" <= t <= "22:00"]
+    }
+
+def get_dose_window(pres, times, meal_times, drug_data):
+    """ Slots a dose of `pres` may use: meal times for drugs taken with food, the others for drugs taken without. """
+    requires_food = drug_requires_food(pres['name'], drug_data)
+    requires_no_food = drug_requires_no_food(pres['name'], drug_data)
+    if requires_food and requires_no_food:  # contradictory instructions leave no slot
+        return []
+    if requires_food:
+        return [t for t in times if t in meal_times]
+    if requires_no_food:
+        return [t for t in times if t not in meal_times]
+    return list(times)
+
+def get_preferred_window(pres, time_preferences, d_idx):
+    """
+    Set of slots preferred for dose `d_idx` of `pres`, or None when it has no preference.
+    With one time of day per dose ("twice daily (morning, evening)") each dose gets its own part
+    of the day in chronological order; otherwise every dose may use any of the listed parts.
+    """
+    time_of_day = [t.lower() for t in pres.get("preferred_times", []) if t.lower() in time_preferences]
+    if not time_of_day:
+        return None
+    order = list(time_preferences)
+    time_of_day = sorted(set(time_of_day), key=order.index)
+    if len(time_of_day) == pres['frequency']:
+        time_of_day = [time_of_day[d_idx]]
+    return {t for part in time_of_day for t in time_preferences[part]}
+
+def set_objective(model, penalties):
+    """ Minimise the weighted soft-constraint violations; without any, the model stays a feasibility problem. """
+    if penalties:
+        model.Minimize(sum(weight * term for weight, term in penalties))
+
+def add_boolean_formulation(model, prescriptions, interactions, drug_data, diet, times, meal_times,
+                            previous=None, hint=None):
+    """
+    One BoolVar per (drug, dose, time slot). Returns a function reading the chosen
+    slot of every dose from a solved model. `previous` ({dose: slot}, see previous_dose_slots)
+    makes every dose leaving its slot cost MOVE_WEIGHT; `hint` ({dose: slot}) seeds the search.
+    """
+    previous = previous or {}
+    slot_minutes = {t: time_to_minutes(t) for t in times}
+    time_preferences = get_time_preferences(times)
+    penalties = []
 
     # Variables
     drug_vars = {}
@@ -150,30 +242,18 @@ def create_schedule(prescriptions, interactions, drug_data, diet):
             for t in times:
                 drug_vars[(i, d_idx, t)] = model.NewBoolVar(f"drug_{i}_dose_{d_idx}_{t}")
 
-    # Time-of-day preferences (pre-defined slots)
-    time_preferences = {
-        "morning": [t for t in times if "06:00" <= t <= "12:00"],
-        "afternoon": [t for t in times if "12:01" <= t <= "17:59"],
-        "evening": [t for t in times if "18:00" <= t <= "22:00"]
-    }
-
     # Ensure doses of the same drug are spaced out properly
     for i, pres in enumerate(prescriptions):
-        time_of_day = pres.get("preferred_times", [])
         freq = pres['frequency']
-
-        if time_of_day:
-            time_window = time_preferences.get(time_of_day[0].lower(), times)
-        else:
-            time_window = times
-
-        if drug_requires_food(pres['name'], drug_data):
-            time_window = sorted(set(time_window).intersection(meal_times))
-        elif drug_requires_no_food(pres['name'], drug_data):
-            time_window = sorted(set(time_window) - meal_times)
+        time_window = get_dose_window(pres, times, meal_times, drug_data)
 
         for d_idx in range(freq):
             model.Add(sum(drug_vars[(i, d_idx, t)] for t in time_window) == 1)
+        # Slots outside the window are off, otherwise a dose could also show up there
+        outside = set(times).difference(time_window)
+        for t in [t for t in times if t in outside]:
+            for d_idx in range(freq):
+                model.Add(drug_vars[(i, d_idx, t)] == 0)
 
         # Ensure no more than one dose of the same drug in a single time slot
         for t in times:
@@ -183,108 +263,716 @@ def create_schedule(prescriptions, interactions, drug_data, diet):
         if freq > 1:
             for d_idx in range(freq - 1):
                 model.Add(
-                    sum(drug_vars[(i, d_idx, t)] * times.index(t) for t in time_window) + 2 <=
-                    sum(drug_vars[(i, d_idx + 1, t)] * times.index(t) for t in time_window)
+                    sum(drug_vars[(i, d_idx, t)] * slot_minutes[t] for t in time_window) + MIN_DOSE_GAP_MINUTES <=
+                    sum(drug_vars[(i, d_idx + 1, t)] * slot_minutes[t] for t in time_window)
                 )
 
+        # Preferred times of day are soft: a dose outside them costs PREFERENCE_WEIGHT
+        for d_idx in range(freq):
+            preferred = get_preferred_window(pres, time_preferences, d_idx)
+            if preferred is not None:
+                preferred_slots = [t for t in time_window if t in preferred]
+                penalties.append((PREFERENCE_WEIGHT, 1 - sum(drug_vars[(i, d_idx, t)] for t in preferred_slots)))
+
+        # Re-planning: leaving the previous slot costs MOVE_WEIGHT (always, once it is outside the window)
+        for d_idx in range(freq):
+            if (i, d_idx) in previous:
+                t = previous[(i, d_idx)]
+                penalties.append((MOVE_WEIGHT, 1 - drug_vars[(i, d_idx, t)] if t in time_window else 1))
+
     # Add diet-related constraints and print notes
     handle_diet_constraints(prescriptions, drug_vars, drug_data, diet, model)
 
-    # Try to add interaction constraints
-    add_interaction_constraints(model, prescriptions, interactions, drug_vars, times)
+    # Risky combinations are hard, undesirable ones join the objective
+    penalties += add_interaction_constraints(model, prescriptions, interactions, drug_vars, times)
+    set_objective(model, penalties)
+    for (i, d_idx), slot in (hint or {}).items():
+        if slot in times:
+            for t in times:
+                model.AddHint(drug_vars[(i, d_idx, t)], t == slot)
 
-    # Solve
-    solver = cp_model.CpSolver()
-    status = solver.Solve(model)
+    def read_slots(solver):
+        return {(i, d_idx): t for (i, d_idx, t), var in drug_vars.items() if solver.Value(var) == 1}
+    return read_slots
 
-    # Output schedule
-    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        schedule = {t: [] for t in times}
-        for t in times:
-            for i, pres in enumerate(prescriptions):
-                freq = pres['frequency']
-                for d_idx in range(freq):
-                    if solver.Value(drug_vars[(i, d_idx, t)]) == 1:
-                        schedule[t].append(pres['name'])
-        return {time: drugs for time, drugs in schedule.items() if drugs}
-    else:
-        return None
+def add_integer_formulation(model, prescriptions, interactions, drug_data, diet, times, meal_times,
+                            previous=None, hint=None):
+    """
+    One integer variable per dose holding its time in minutes after midnight, with the dose
+    window as domain. Spacing and interaction separation are constraints between those variables,
+    so the model does not grow with the slot resolution. `previous` and `hint` as in add_boolean_formulation.
+    """
+    from ortools.sat.python import cp_model
+    previous = previous or {}
+    time_preferences = get_time_preferences(times)
+    penalties = []
+    slot_vars = {}
+    for i, pres in enumerate(prescriptions):
+        time_window = get_dose_window(pres, times, meal_times, drug_data)
+        allowed = [time_to_minutes(t) for t in time_window]
+        for d_idx in range(pres['frequency']):
+            if allowed:
+                domain = cp_model.Domain.FromValues(allowed)
+            else:
+                domain = cp_model.Domain(0, 0)
+                model.AddBoolOr([])  # no slot left for this dose: infeasible
+            slot_vars[(i, d_idx)] = model.NewIntVarFromDomain(domain, f"drug_{i}_dose_{d_idx}")
+        for d_idx in range(pres['frequency'] - 1):
+            model.Add(slot_vars[(i, d_idx)] + MIN_DOSE_GAP_MINUTES <= slot_vars[(i, d_idx + 1)])
+
+        # Preferred times of day are soft: a dose outside them costs PREFERENCE_WEIGHT
+        for d_idx in range(pres['frequency']):
+            preferred = get_preferred_window(pres, time_preferences, d_idx)
+            if preferred is None:
+                continue
+            preferred_values = [time_to_minutes(t) for t in time_window if t in preferred]
+            if not preferred_values:
+                penalties.append((PREFERENCE_WEIGHT, 1))
+            elif len(preferred_values) < len(allowed):
+                in_preferred = model.NewBoolVar(f"drug_{i}_dose_{d_idx}_preferred")
+                model.AddLinearExpressionInDomain(
+                    slot_vars[(i, d_idx)], cp_model.Domain.FromValues(preferred_values)).OnlyEnforceIf(in_preferred)
+                penalties.append((PREFERENCE_WEIGHT, 1 - in_preferred))
+
+        # Re-planning: leaving the previous slot costs MOVE_WEIGHT (always, once it is outside the window)
+        for d_idx in range(pres['frequency']):
+            if (i, d_idx) not in previous:
+                continue
+            minutes = time_to_minutes(previous[(i, d_idx)])
+            if minutes not in allowed:
+                penalties.append((MOVE_WEIGHT, 1))
+            else:
+                stays = model.NewBoolVar(f"drug_{i}_dose_{d_idx}_stays")
+                model.Add(slot_vars[(i, d_idx)] == minutes).OnlyEnforceIf(stays)
+                penalties.append((MOVE_WEIGHT, 1 - stays))
+
+    # Risky combinations are hard, undesirable ones join the objective
+    for kind, dose1, dose2 in get_interacting_doses(prescriptions, interactions):
+        if kind == "risk":
+            model.Add(slot_vars[dose1] != slot_vars[dose2])
+        else:
+            same_slot = model.NewBoolVar(f"undesirable_{dose1[0]}_{dose1[1]}_{dose2[0]}_{dose2[1]}")
+            model.Add(slot_vars[dose1] != slot_vars[dose2]).OnlyEnforceIf(same_slot.Not())
+            penalties.append((UNDESIRABLE_WEIGHT, same_slot))
+    set_objective(model, penalties)
+    for key, slot in (hint or {}).items():
+        model.AddHint(slot_vars[key], time_to_minutes(slot))
+
+    def read_slots(solver):
+        return {key: minutes_to_time(solver.Value(var)) for key, var in slot_vars.items()}
+    return read_slots
+
+class SolverConfig:
+    """
+    CP-SAT parameters used by solve_schedule.
+    - workers: number of search workers (None keeps the OR-Tools default).
+    - max_time: time budget in seconds (None = no limit).
+    - seed: random seed; together with workers=1 the search is reproducible.
+    - anytime: when the budget runs out, return the best schedule found so far instead of None.
+    - gap: stop as soon as the penalty is proven within this relative gap of the optimum.
+    """
+    def __init__(self, workers=None, max_time=None, seed=None, anytime=True, gap=0.05):
+        self.workers = workers
+        self.max_time = max_time
+        self.seed = seed
+        self.anytime = anytime
+        self.gap = gap
+
+    def apply(self, solver):
+        if self.workers:
+            solver.parameters.num_workers = self.workers
+        if self.max_time is not None:
+            solver.parameters.max_time_in_seconds = self.max_time
+        if self.seed is not None:
+            solver.parameters.random_seed = self.seed
+        if self.gap:
+            solver.parameters.relative_gap_limit = self.gap
+
+    def split(self, jobs):
+        """ Config for one of `jobs` concurrent solves: the search workers are shared between them. """
+        if jobs == 1:
+            return self
+        workers = self.workers or os.cpu_count() or 1
+        return SolverConfig(max(1, workers // jobs), self.max_time, self.seed, self.anytime, self.gap)
+
+class ScheduleResult:
+    """
+    Outcome of a solve: the schedule (None if none is returned), CP-SAT status name, times in seconds,
+    the penalty of the soft constraints the schedule violates (0 when all are met) and how it was
+    found: "direct" (placement only), "greedy" (constructive heuristic) or "cp-sat" (the solver was needed).
+    A re-plan (solve_schedule with `previous_schedule`) also counts the doses that left their previous slot
+    in `moved`; an infeasible regimen lists the hard rules that cannot hold together in `conflicts` (Violations).
+    """
+    def __init__(self, schedule, status, wall_time, build_time=0.0, penalty=0, method="cp-sat", cached=False,
+                 moved=None, conflicts=None):
+        self.schedule = schedule
+        self.status = status
+        self.wall_time = wall_time
+        self.build_time = build_time
+        self.penalty = penalty
+        self.method = method
+        self.cached = cached # served from a ScheduleCache instead of solved
+        self.moved = moved
+        self.conflicts = conflicts
+
+    def conflict_records(self):
+        return [{"rule": v.rule, "message": v.message} for v in self.conflicts or ()]
+
+    def to_dict(self):
+        record = {"status": self.status, "wall_time": round(self.wall_time, 6), "build_time": round(self.build_time, 6),
+                  "penalty": self.penalty, "method": self.method, "schedule": self.schedule}
+        if self.moved is not None:
+            record["moved"] = self.moved
+        if self.conflicts:
+            record["conflicts"] = self.conflict_records()
+        return record
+
+    @classmethod
+    def from_dict(cls, record, wall_time=None, cached=False):
+        conflicts = [Violation(c["rule"], [], c["message"]) for c in record.get("conflicts", ())] or None
+        return cls(record["schedule"], record["status"], record["wall_time"] if wall_time is None else wall_time,
+                   record["build_time"], record["penalty"], record["method"], cached, record.get("moved"), conflicts)
+
+def split_components(prescriptions, interactions):
+    """
+    Split the prescriptions into groups that share no risky or undesirable interaction, so each
+    group can be scheduled on its own. Returns (isolated, components): indices of the prescriptions
+    interacting with no other one, and index lists of the groups that need a solver.
+    """
+    graph = as_interaction_graph(interactions)
+    name_indices = {}
+    for i, pres in enumerate(prescriptions):
+        name_indices.setdefault(pres['name'], []).append(i)
+    relevant = lambda interaction: interaction['risk'] == 1 or interaction.get('undesirable', 0) == 1
+    isolated, components = [], []
+    for drugs in graph.components(name_indices, relevant):
+        indices = sorted(i for drug in drugs for i in name_indices[drug])
+        if len(indices) == 1:
+            isolated.extend(indices)
+        else:
+            components.append(indices)
+    return sorted(isolated), components
+
+def place_isolated(pres, times, meal_times, drug_data, previous=None):
+    """
+    Direct placement of a drug that interacts with nothing else in the regimen: the earliest doses
+    in its window that respect the spacing with the fewest doses outside their preferred time of day.
+    With `previous` ({dose index: slot}), a dose leaving its previous slot also costs MOVE_WEIGHT.
+    Returns ([slot per dose], penalty), or (None, None) when the window cannot hold all the doses.
+    """
+    previous = previous or {}
+    window = get_dose_window(pres, times, meal_times, drug_data)
+    minutes = [time_to_minutes(t) for t in window]
+    time_preferences = get_time_preferences(times)
+    freq = pres['frequency']
+    costs = []
+    for d_idx in range(freq):
+        preferred = get_preferred_window(pres, time_preferences, d_idx)
+        costs.append([(0 if preferred is None or t in preferred else PREFERENCE_WEIGHT) +
+                      (MOVE_WEIGHT if d_idx in previous and t != previous[d_idx] else 0) for t in window])
+
+    # best[d][j]: lowest cost of doses d.. when dose d takes window[j] (None if the rest do not fit)
+    best = [[None] * len(window) for _ in range(freq)]
+    for d_idx in reversed(range(freq)):
+        for j, m in enumerate(minutes):
+            if d_idx == freq - 1:
+                best[d_idx][j] = costs[d_idx][j]
+                continue
+            later = [best[d_idx + 1][k] for k in range(j + 1, len(window))
+                     if minutes[k] >= m + MIN_DOSE_GAP_MINUTES and best[d_idx + 1][k] is not None]
+            if later:
+                best[d_idx][j] = costs[d_idx][j] + min(later)
+
+    slots, penalty, lower = [], None, 0
+    for d_idx in range(freq):
+        candidates = [j for j in range(len(window)) if minutes[j] >= lower and best[d_idx][j] is not None]
+        if not candidates:
+            return None, None
+        j = min(candidates, key=lambda k: best[d_idx][k])  # min() keeps the earliest of equal costs
+        if penalty is None:
+            penalty = best[d_idx][j]
+        slots.append(window[j])
+        lower = minutes[j] + MIN_DOSE_GAP_MINUTES
+    return slots, penalty
+
+class ScheduleProblem:
+    """
+    Rules a set of dose slots is checked against, precomputed once per regimen: the dose window of
+    every prescription, the preferred slots of every dose, the interacting dose pairs and the weights.
+    """
+    def __init__(self, prescriptions, times, windows, preferred, dose_pairs):
+        self.prescriptions = prescriptions
+        self.times = times
+        self.slot_minutes = {t: time_to_minutes(t) for t in times}
+        self.windows = windows
+        self.preferred = preferred
+        self.dose_pairs = dose_pairs
+        self.min_gap = MIN_DOSE_GAP_MINUTES
+        self.preference_weight = PREFERENCE_WEIGHT
+        self.undesirable_weight = UNDESIRABLE_WEIGHT
+
+def build_problem(prescriptions, interactions, drug_data, times, meal_times):
+    time_preferences = get_time_preferences(times)
+    windows = [get_dose_window(pres, times, meal_times, drug_data) for pres in prescriptions]
+    preferred = {(i, d_idx): get_preferred_window(pres, time_preferences, d_idx)
+                 for i, pres in enumerate(prescriptions) for d_idx in range(pres['frequency'])}
+    return ScheduleProblem(prescriptions, times, windows, preferred, get_interacting_doses(prescriptions, interactions))
+
+def greedy_slots(problem, fixed=None):
+    """
+    Constructive placement without a solver. Prescriptions are taken most constrained first
+    (fewest slots per dose, most interactions); each dose gets the earliest slot of its window
+    that keeps the spacing, leaves room for the remaining doses, does not share a slot with a
+    risky partner already placed and, where possible, is in its preferred time of day without
+    meeting an undesirable partner. A prescription with a slot for every dose in `fixed`
+    ({dose: slot}) is placed there first, unchecked. Returns the dose slots, or None when a dose
+    cannot be placed.
+    """
+    partners = {}
+    for kind, dose1, dose2 in problem.dose_pairs:
+        partners.setdefault(dose1, []).append((kind, dose2))
+        partners.setdefault(dose2, []).append((kind, dose1))
+    degree = {}
+    for (i, _), links in partners.items():
+        degree[i] = degree.get(i, 0) + len(links)
+
+    prescriptions = problem.prescriptions
+    order = sorted(range(len(prescriptions)), key=lambda i: (
+        len(problem.windows[i]) / prescriptions[i]['frequency'], -degree.get(i, 0), i))
+    fixed = fixed or {}
+    pinned = {i for i, pres in enumerate(prescriptions) if all((i, d_idx) in fixed for d_idx in range(pres['frequency']))}
+    dose_slots = {(i, d_idx): fixed[(i, d_idx)] for i in pinned for d_idx in range(prescriptions[i]['frequency'])}
+    for i in order:
+        if i in pinned:
+            continue
+        freq = prescriptions[i]['frequency']
+        window = problem.windows[i]
+        minutes = [problem.slot_minutes[t] for t in window]
+        lower = None
+        for d_idx in range(freq):
+            # the remaining doses still need room after this one
+            upper = minutes[-1] - (freq - 1 - d_idx) * problem.min_gap if window else None
+            preferred = problem.preferred.get((i, d_idx))
+            best, best_cost = None, None
+            for t, m in zip(window, minutes):
+                if (lower is not None and m < lower) or m > upper:
+                    continue
+                kinds = [kind for kind, other in partners.get((i, d_idx), ()) if dose_slots.get(other) == t]
+                if "risk" in kinds:
+                    continue
+                cost = len(kinds) * problem.undesirable_weight
+                if preferred is not None and t not in preferred:
+                    cost += problem.preference_weight
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = t, cost
+                    if cost == 0:
+                        break
+            if best is None:
+                return None
+            dose_slots[(i, d_idx)] = best
+            lower = problem.slot_minutes[best] + problem.min_gap
+    return dose_slots
+
+class ModelResult:
+    """ Outcome of solve_model for one group: dose slots ({dose: time}, None if none), status name, times, penalty and method. """
+    __slots__ = ("dose_slots", "status", "wall_time", "build_time", "penalty", "method")
+
+    def __init__(self, dose_slots, status, wall_time, build_time, penalty, method):
+        self.dose_slots = dose_slots
+        self.status = status
+        self.wall_time = wall_time
+        self.build_time = build_time
+        self.penalty = penalty
+        self.method = method
+
+def try_greedy(problem, previous=None, telemetry=NO_TELEMETRY):
+    """
+    The greedy placement of a ScheduleProblem (None when it gets stuck) and whether it can be kept
+    as it is: it breaks no rule at all and moves no dose of `previous`, so no schedule can do better.
+    """
+    with telemetry.phase("greedy"):
+        dose_slots = greedy_slots(problem, previous)
+        if dose_slots is None:
+            return None, False
+        violations, penalty = verify_slots(dose_slots, problem)
+        return dose_slots, not violations and penalty == 0 and not count_moved(dose_slots, previous)
+
+def solve_model(prescriptions, interactions, drug_data, diet, times, meal_times, formulation, solver_config,
+                greedy=True, telemetry=NO_TELEMETRY, previous=None, keep=False, problem=None):
+    """
+    Schedule one group of prescriptions. With `greedy`, the constructive placement is tried first and
+    kept when the verifier finds it breaks no rule at all (then no schedule can do better); otherwise
+    one CP-SAT model is built and solved. With `previous` ({dose: slot}), the greedy placement keeps
+    the drugs whose doses all have a previous slot where they were and must move none of them, and
+    the model counts MOVE_WEIGHT per moved dose and starts from that placement (or the previous slots).
+    With `keep` (a group the regimen change did not touch), previous slots covering every dose are
+    returned as they are when they break no rule. `problem` is the group's ScheduleProblem, if already built.
+    Returns a ModelResult, whose method is "direct" (kept), "greedy" or "cp-sat". Model size and search statistics are added to `telemetry`.
+    """
+    start = time.perf_counter()
+    if problem is None and (greedy or keep):
+        problem = build_problem(prescriptions, interactions, drug_data, times, meal_times)
+    if keep and len(previous) == sum(pres['frequency'] for pres in prescriptions):
+        with telemetry.phase("keep"):
+            violations, penalty = verify_slots(previous, problem)
+        if not violations:
+            telemetry.count("groups_kept")
+            elapsed = time.perf_counter() - start
+            return ModelResult(dict(previous), "OPTIMAL", elapsed, elapsed, penalty, "direct")
+    dose_slots = None
+    if greedy:
+        dose_slots, accepted = try_greedy(problem, previous, telemetry)
+        if accepted:
+            telemetry.count("greedy_accepted")
+            elapsed = time.perf_counter() - start
+            return ModelResult(dose_slots, "OPTIMAL", elapsed, elapsed, 0, "greedy")
+
+    from ortools.sat.python import cp_model
+    with telemetry.phase("build_model"):
+        model = cp_model.CpModel()
+        add_formulation = add_boolean_formulation if formulation == "boolean" else add_integer_formulation
+        hint = (dose_slots or previous) if previous else None
+        read_slots = add_formulation(model, prescriptions, interactions, drug_data, diet, times, meal_times,
+                                     previous, hint)
+    build_time = time.perf_counter() - start
+
+    solver = cp_model.CpSolver()
+    solver_config.apply(solver)
+    with telemetry.phase("cp_sat"):
+        status = solver.Solve(model)
+    if telemetry.enabled:
+        proto = model.Proto()
+        telemetry.count("models")
+        telemetry.count("model_variables", len(proto.variables))
+        telemetry.count("model_constraints", len(proto.constraints))
+        telemetry.count("solver_conflicts", solver.NumConflicts())
+        telemetry.count("solver_branches", solver.NumBranches())
+
+    # FEASIBLE means the time budget ran out before optimality was proven
+    if status == cp_model.OPTIMAL or (status == cp_model.FEASIBLE and solver_config.anytime):
+        penalty = round(solver.ObjectiveValue()) if model.HasObjective() else 0
+        return ModelResult(read_slots(solver), solver.StatusName(status), solver.WallTime(), build_time, penalty, "cp-sat")
+    return ModelResult(None, solver.StatusName(status), solver.WallTime(), build_time, 0, "cp-sat")
+
+def explain_conflicts(problem, max_time=EXPLAIN_MAX_TIME):
+    """
+    Smallest set of hard rules of an infeasible ScheduleProblem that cannot hold together. Each
+    rule (the window of a drug, the spacing of its doses, the separation of a risky pair) gets an
+    assumption literal in one integer model; CP-SAT returns a subset of assumptions infeasible on
+    its own, which is then shrunk one rule at a time until dropping any rule left makes the rest
+    feasible (tiny solves over the same model). `max_time` is shared by all the solves: once it runs
+    out the rules kept so far are returned (still conflicting, maybe not the smallest set). Returns
+    the Violations of those rules, empty when the problem turns out to be feasible or the first
+    solve runs out of time.
+    """
+    from ortools.sat.python import cp_model
+    model = cp_model.CpModel()
+    slot_vars = {}
+    any_slot = cp_model.Domain.FromValues(sorted(set(problem.slot_minutes.values())))
+    for i, pres in enumerate(problem.prescriptions):
+        for d_idx in range(pres['frequency']):
+            slot_vars[(i, d_idx)] = model.NewIntVarFromDomain(any_slot, f"drug_{i}_dose_{d_idx}")
+
+    rules = []  # (assumption literal, Violation)
+    def add_rule(violation):
+        literal = model.NewBoolVar(f"rule_{len(rules)}")
+        rules.append((literal, violation))
+        return literal
+
+    for i, pres in enumerate(problem.prescriptions):
+        doses = [(i, d_idx) for d_idx in range(pres['frequency'])]
+        window = problem.windows[i]
+        message = f"{pres['name']} can only be taken at {', '.join(window)}" if window else \
+            f"{pres['name']} has no time slot left after the food rules"
+        literal = add_rule(Violation("window", doses, message))
+        allowed = cp_model.Domain.FromValues([problem.slot_minutes[t] for t in window])
+        for dose in doses:
+            model.AddLinearExpressionInDomain(slot_vars[dose], allowed).OnlyEnforceIf(literal)
+        if len(doses) > 1:
+            literal = add_rule(Violation("spacing", doses, f"{pres['name']} doses must be at least "
+                                                           f"{problem.min_gap} minutes apart"))
+            for dose, following in zip(doses, doses[1:]):
+                model.Add(slot_vars[dose] + problem.min_gap <= slot_vars[following]).OnlyEnforceIf(literal)
+
+    pair_rules = {}
+    for kind, dose1, dose2 in problem.dose_pairs:
+        if kind != "risk":
+            continue
+        drugs = (dose1[0], dose2[0])
+        if drugs not in pair_rules:
+            names = [problem.prescriptions[i]['name'] for i in drugs]
+            doses = [(i, d_idx) for i in drugs for d_idx in range(problem.prescriptions[i]['frequency'])]
+            pair_rules[drugs] = add_rule(Violation("risk", doses, f"{names[0]} and {names[1]} must not be taken at the same time"))
+        model.Add(slot_vars[dose1] != slot_vars[dose2]).OnlyEnforceIf(pair_rules[drugs])
+
+    deadline = time.perf_counter() + max_time
+
+    def infeasible(literals):
+        model.ClearAssumptions()
+        model.AddAssumptions(literals)
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = 1  # assumption cores are reported by the sequential search
+        solver.parameters.max_time_in_seconds = max(deadline - time.perf_counter(), 0.0)
+        return solver.Solve(model) == cp_model.INFEASIBLE, solver
+
+    found, solver = infeasible([literal for literal, _ in rules])
+    if not found:
+        return []
+    by_index = {literal.Index(): (literal, violation) for literal, violation in rules}
+    core = [by_index[index] for index in solver.SufficientAssumptionsForInfeasibility()]
+    position = 0
+    while position < len(core) and time.perf_counter() < deadline:
+        trial = core[:position] + core[position + 1:]
+        if infeasible([literal for literal, _ in trial])[0]:
+            core = trial
+        else:
+            position += 1
+    return [violation for _, violation in core]
+
+def regimen_violations(violations, indices):
+    """ Violations of a group with their doses numbered in the whole regimen (`indices[k]`: regimen index of prescription k). """
+    return [Violation(v.rule, [(indices[k], d_idx) for k, d_idx in v.doses], v.message) for v in violations]
+
+def merge_status(statuses):
+    """ Overall CP-SAT status of independent sub-solves: the weakest of them. """
+    for status in ("INFEASIBLE", "MODEL_INVALID", "UNKNOWN", "FEASIBLE"):
+        if status in statuses:
+            return status
+    return "OPTIMAL"
+
+def record_outcome(telemetry, status, method, penalty, moved=None):
+    telemetry.label("status", status)
+    telemetry.label("method", method)
+    telemetry.label("penalty", penalty)
+    if moved is not None:
+        telemetry.label("moved", moved)
+
+def previous_dose_slots(previous_schedule, prescriptions):
+    """
+    {(prescription index, dose index): time} of a schedule ({time: [drug names]}) made for an earlier
+    version of the regimen: the doses of each drug take its previous times in order, so a drug
+    taken more or less often than before keeps its earliest ones. New drugs have no entry, nor do
+    drugs prescribed more than once (the schedule does not tell their doses apart).
+    """
+    times_of = {}
+    for t in sorted(previous_schedule, key=time_to_minutes):
+        for name in previous_schedule[t]:
+            times_of.setdefault(name, []).append(t)
+    counts = Counter(pres['name'] for pres in prescriptions)
+    dose_slots = {}
+    for i, pres in enumerate(prescriptions):
+        if counts[pres['name']] > 1:
+            continue
+        remaining = times_of.get(pres['name'], [])
+        for d_idx in range(min(pres['frequency'], len(remaining))):
+            dose_slots[(i, d_idx)] = remaining[d_idx]
+    return dose_slots
+
+def count_moved(dose_slots, previous):
+    """ Number of doses with a previous slot ({dose: slot}) that `dose_slots` places elsewhere. """
+    return sum(1 for dose, t in (previous or {}).items() if dose_slots.get(dose) != t)
+
+def apply_delta(prescriptions, add=(), remove=()):
+    """
+    The regimen after a change: prescriptions of the drugs named in `remove` are dropped, those of
+    `add` replace the prescription of the same drug or are appended. The input list is not modified.
+    """
+    removed = {name.title() for name in remove}
+    added = {pres['name'].title(): pres for pres in add}
+    updated = []
+    for pres in prescriptions:
+        name = pres['name'].title()
+        if name in removed:
+            continue
+        updated.append(added.pop(name) if name in added else pres)
+    return updated + list(added.values())
+
+def unchanged_drugs(prescriptions, interactions, add=(), remove=()):
+    """
+    Drugs of the regimen after a change (see apply_delta) that the change leaves alone: neither
+    added, replaced nor removed, and without a risky or undesirable interaction with a removed or
+    replaced drug. A group of interacting drugs made only of them is the same problem as before.
+    """
+    changed = {name.title() for name in remove} | {pres['name'].title() for pres in add}
+    affected = set(changed)
+    for (drug1, drug2), interaction in as_interaction_graph(interactions).pairs_among(
+            {pres['name'] for pres in prescriptions}):
+        if interaction['risk'] == 1 or interaction.get('undesirable', 0) == 1:
+            if drug1.title() in changed:
+                affected.add(drug2.title())
+            if drug2.title() in changed:
+                affected.add(drug1.title())
+    return {pres['name'] for pres in apply_delta(prescriptions, add, remove) if pres['name'].title() not in affected}
+
+def replan_schedule(previous_schedule, prescriptions, interactions, drug_data, diet, add=(), remove=(), **options):
+    """
+    Re-plan after a change to the regimen `previous_schedule` was made for: `add` lists prescriptions
+    to add (or to replace the one of the same drug), `remove` drug names to drop. Groups the change
+    leaves alone keep their slots, the others are solved again moving as few doses as possible.
+    `options` are those of solve_schedule. Returns (the new regimen, its ScheduleResult).
+    """
+    updated = apply_delta(prescriptions, add, remove)
+    keep = unchanged_drugs(prescriptions, interactions, add, remove)
+    return updated, solve_schedule(updated, interactions, drug_data, diet, previous_schedule=previous_schedule,
+                                   keep=keep, **options)
+
+def solve_schedule(prescriptions, interactions, drug_data, diet, *, formulation="boolean", resolution=60,
+                   solver_config=None, decompose=True, greedy=True, telemetry=NO_TELEMETRY, previous_schedule=None,
+                   keep=(), explain=True):
+    """
+    Schedule a regimen and return a ScheduleResult. With `decompose`, each group of interacting drugs
+    is solved on its own (solve_model); `previous_schedule` makes it a re-plan that moves as few doses
+    as possible, leaving the groups of drugs in `keep` as they were. An infeasible regimen lists its
+    conflicting rules, found by verify.precheck or, with `explain`, by explain_conflicts.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Unknown formulation '{formulation}', expected one of {', '.join(FORMULATIONS)}.")
+    solver_config = solver_config or SolverConfig()
+    start = time.perf_counter()
+    drug_data = get_catalog(drug_data)
+    times, meal_times = get_time_slots(diet, resolution)
+    print_diet_notes(prescriptions, drug_data, diet)
+    previous = previous_dose_slots(previous_schedule, prescriptions) if previous_schedule is not None else None
+
+    def infeasible(conflicts):
+        record_outcome(telemetry, "INFEASIBLE", "direct", 0)
+        elapsed = time.perf_counter() - start
+        return ScheduleResult(None, "INFEASIBLE", elapsed, elapsed, method="direct",
+                              conflicts=sorted(conflicts, key=lambda v: min(v.doses)))
+
+    # one budget for every explanation: what is left of max_time, or EXPLAIN_MAX_TIME from the first one
+    explain_deadline = start + solver_config.max_time if solver_config.max_time else None
+
+    def explain_group(problem):
+        nonlocal explain_deadline
+        if explain_deadline is None:
+            explain_deadline = time.perf_counter() + EXPLAIN_MAX_TIME
+        remaining = explain_deadline - time.perf_counter()
+        if remaining <= 0:
+            telemetry.count("explanations_skipped")
+            return []
+        with telemetry.phase("explain"):
+            return explain_conflicts(problem, remaining)
+
+    if not decompose:
+        with telemetry.phase("precheck"):
+            problem = build_problem(prescriptions, interactions, drug_data, times, meal_times)
+            conflicts = precheck(problem)
+        if conflicts:
+            return infeasible(conflicts)
+        solved = solve_model(prescriptions, interactions, drug_data, diet, times, meal_times, formulation,
+                             solver_config, greedy, telemetry, previous,
+                             previous is not None and all(pres['name'] in keep for pres in prescriptions), problem)
+        if solved.dose_slots is None:
+            conflicts = explain_group(problem) if explain and solved.status == "INFEASIBLE" else None
+            record_outcome(telemetry, solved.status, solved.method, 0)
+            return ScheduleResult(None, solved.status, solved.wall_time, solved.build_time, method=solved.method,
+                                  conflicts=conflicts)
+        moved = count_moved(solved.dose_slots, previous) if previous is not None else None
+        penalty = solved.penalty - MOVE_WEIGHT * (moved or 0)
+        record_outcome(telemetry, solved.status, solved.method, penalty, moved)
+        return ScheduleResult(build_schedule(solved.dose_slots, prescriptions, times), solved.status, solved.wall_time,
+                              solved.build_time, penalty, solved.method, moved=moved)
+
+    if greedy and previous is None:
+        # splitting only pays off for the solver: a regimen placed whole without breaking any rule is done
+        problem = build_problem(prescriptions, interactions, drug_data, times, meal_times)
+        dose_slots, accepted = try_greedy(problem, telemetry=telemetry)
+        if accepted:
+            telemetry.count("greedy_accepted")
+            record_outcome(telemetry, "OPTIMAL", "greedy", 0)
+            elapsed = time.perf_counter() - start
+            return ScheduleResult(build_schedule(dose_slots, prescriptions, times), "OPTIMAL", elapsed, elapsed, 0,
+                                  "greedy")
+
+    isolated, components = split_components(prescriptions, interactions)
+    dose_slots, statuses, penalty, complete = {}, [], 0, True
+    methods = {"direct"}
+    telemetry.count("components", len(components))
+    # Cheap necessary conditions first: an impossible regimen is reported without solving anything
+    with telemetry.phase("precheck"):
+        problems = [build_problem([prescriptions[i] for i in indices], interactions, drug_data, times, meal_times)
+                    for indices in components]
+        conflicts = [violation for indices, problem in zip(components, problems)
+                     for violation in regimen_violations(precheck(problem), indices)]
+    placed = True
+    with telemetry.phase("place_isolated"):
+        for i in isolated:
+            before = {d_idx: previous[(i, d_idx)] for d_idx in range(prescriptions[i]['frequency'])
+                      if (i, d_idx) in previous} if previous else None
+            slots, cost = place_isolated(prescriptions[i], times, meal_times, drug_data, before)
+            if slots is None:  # the window cannot hold the doses, no need to ask the solver
+                placed = False
+                conflicts += regimen_violations(
+                    precheck(build_problem([prescriptions[i]], interactions, drug_data, times, meal_times)), [i])
+                continue
+            dose_slots.update(((i, d_idx), t) for d_idx, t in enumerate(slots))
+            penalty += cost
+    if conflicts or not placed:
+        return infeasible(conflicts)
+
+    def solve_component(indices, problem):
+        before = {(k, d_idx): previous[(i, d_idx)] for k, i in enumerate(indices)
+                  for d_idx in range(prescriptions[i]['frequency']) if (i, d_idx) in previous} if previous else None
+        return solve_model([prescriptions[i] for i in indices], interactions, drug_data, diet, times, meal_times,
+                           formulation, component_config, greedy, telemetry, before,
+                           previous is not None and all(prescriptions[i]['name'] in keep for i in indices), problem)
+
+    build_time = time.perf_counter() - start
+    if components:
+        # CP-SAT releases the GIL while solving, so threads are enough to run the components in parallel
+        jobs = min(len(components), os.cpu_count() or 1)
+        component_config = solver_config.split(jobs)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            solved = list(executor.map(solve_component, components, problems))
+        for indices, problem, result in zip(components, problems, solved):
+            statuses.append(result.status)
+            methods.add(result.method)
+            build_time += result.build_time
+            if result.dose_slots is None:
+                complete = False
+                if explain and result.status == "INFEASIBLE":
+                    conflicts += regimen_violations(explain_group(problem), indices)
+                continue
+            dose_slots.update(((indices[i], d_idx), t) for (i, d_idx), t in result.dose_slots.items())
+            penalty += result.penalty
+    status = merge_status(statuses)
+    method = "cp-sat" if "cp-sat" in methods else "greedy" if "greedy" in methods else "direct"
+    moved = count_moved(dose_slots, previous) if previous is not None and complete else None
+    penalty -= MOVE_WEIGHT * (moved or 0)
+    record_outcome(telemetry, status, method, penalty if complete else 0, moved)
+    wall_time = time.perf_counter() - start
+    if not complete:
+        return ScheduleResult(None, status, wall_time, build_time, method=method, conflicts=conflicts or None)
+    return ScheduleResult(build_schedule(dose_slots, prescriptions, times), status, wall_time, build_time, penalty,
+                          method, moved=moved)
+
+def create_schedule(prescriptions, interactions, drug_data, diet, formulation="boolean", resolution=60,
+                    solver_config=None, decompose=True, greedy=True):
+    """ The schedule found by solve_schedule, or None when there is none. """
+    return solve_schedule(prescriptions, interactions, drug_data, diet, formulation=formulation,
+                          resolution=resolution, solver_config=solver_config, decompose=decompose,
+                          greedy=greedy).schedule
+
+def build_schedule(dose_slots, prescriptions, times):
+    """ {time: [drug names]} from {(prescription index, dose index): time}, in time then prescription order. """
+    schedule = {t: [] for t in times}
+    for (i, d_idx) in sorted(dose_slots):
+        schedule[dose_slots[(i, d_idx)]].append(prescriptions[i]['name'])
+    return {time: drugs for time, drugs in schedule.items() if drugs}
 
 def print_schedule(schedule, drug_data):
     if not schedule:
         print("No medications scheduled.")
         return
-    warnings_map = get_warnings_map(drug_data)
-    headers = ["Time", "Drugs", "Warnings"]
-    max_width = 60
-    all_rows = []
-
-    for t, drugs in schedule.items():
-        drug_list = ", ".join(drugs)
-        combined_warnings = []
-        for d in drugs:
-            d_title = d.title()
-            w = warnings_map.get(d_title, "None")
-            if combined_warnings:
-                combined_warnings.append("")  # blank line between drugs
-            from textwrap import wrap
-            wrapped = wrap(w, width=max_width) or ["None"]
-            combined_warnings.extend([f"{d_title}: {wrapped[0]}"] + wrapped[1:])
-        all_rows.append([[t], [drug_list], combined_warnings])
-
-    col_widths = [0, 0, 0]
-    for row in all_rows:
-        for i, col_lines in enumerate(row):
-            for line in col_lines:
-                col_widths[i] = max(col_widths[i], len(line))
-
-    row_heights = [max(len(col) for col in row) for row in all_rows]
-
-    def sep_line():
-        return "+" + "+".join("-"*(w+2) for w in col_widths) + "+"
-
-    def format_header(hs):
-        line = "|"
-        for i, h in enumerate(hs):
-            space = col_widths[i] - len(h)
-            left_pad = space // 2
-            right_pad = space - left_pad
-            line += " " + (" " * left_pad) + h + (" " * right_pad) + " |"
-        return line
-
-    print(sep_line())
-    print(format_header(headers))
-    print(sep_line())
-
-    for row, height in zip(all_rows, row_heights):
-        for line_idx in range(height):
-            line = "|"
-            for i, col_lines in enumerate(row):
-                cell_line = col_lines[line_idx] if line_idx < len(col_lines) else ""
-                line += " " + cell_line + " "*(col_widths[i] - len(cell_line) + 1) + "|"
-            print(line)
-        print(sep_line())
-
-def save_schedule_to_file(schedule, drug_data, filename="schedule.txt"):
+    print(format_table(schedule, warning_layout(get_catalog(drug_data))))
+
+def save_schedule_to_file(schedule, drug_data, filename="schedule.txt", fmt=None):
+    """ Write the schedule to `filename` as text, JSON, CSV or iCalendar (from the extension unless `fmt` is given). """
     if not schedule:
         print("No schedule available to save.")
         return
-    warnings_map = get_warnings_map(drug_data)
-    max_width = 60
-
-    with open(filename, 'w') as f:
-        f.write("Medication Schedule\n")
-        f.write("=" * 20 + "\n")
-        for t, drugs in schedule.items():
-            f.write(f"\nTime: {t}\n")
-            f.write(f"Drugs: {', '.join(drugs)}\n")
-            f.write("Warnings:\n")
-            for d in drugs:
-                d_title = d.title()
-                warnings = warnings_map.get(d_title, "None")
-                wrapped = textwrap.wrap(warnings, width=max_width) or ["None"]
-                f.write(f"  {d_title}: {wrapped[0]}\n")
-                for line in wrapped[1:]:
-                    f.write(f"    {line}\n")
-            f.write("\n")
-        print(f"Schedule saved to {filename}")
\ No newline at end of file
+    fmt = fmt or export_format(filename)
+    with open_export(filename, get_catalog(drug_data), fmt) as writer:
+        writer.add(schedule)
+    print(f"Schedule saved to {filename} ({FORMAT_NAMES[fmt]}).")
\ No newline at end of file
@@ -0,0 +1,102 @@
+class Violation:
+    """ A hard rule broken by a set of dose slots: which rule, the doses involved and a readable message. """
+    __slots__ = ("rule", "doses", "message")
+
+    def __init__(self, rule, doses, message):
+        self.rule = rule
+        self.doses = doses
+        self.message = message
+
+    def __repr__(self):
+        return f"Violation({self.rule!r}, {self.message!r})"
+
+def verify_slots(dose_slots, problem):
+    """
+    Check {(prescription index, dose index): time} against a ScheduleProblem (see utils.build_problem).
+    Returns (violations, penalty): the hard rules broken (missing doses, doses outside their window,
+    doses of a drug too close or out of order, risky pairs sharing a slot) and the weighted cost of
+    the soft ones (doses outside their preferred time of day, undesirable pairs sharing a slot).
+    """
+    violations = []
+    penalty = 0
+    for i, pres in enumerate(problem.prescriptions):
+        window = problem.windows[i]
+        previous = None
+        for d_idx in range(pres['frequency']):
+            t = dose_slots.get((i, d_idx))
+            if t is None:
+                violations.append(Violation("missing", [(i, d_idx)], f"{pres['name']} dose {d_idx + 1} is not scheduled"))
+                continue
+            if t not in window:
+                violations.append(Violation("window", [(i, d_idx)], f"{pres['name']} dose {d_idx + 1} at {t} is outside its window"))
+            preferred = problem.preferred.get((i, d_idx))
+            if preferred is not None and t not in preferred:
+                penalty += problem.preference_weight
+            minutes = problem.slot_minutes.get(t, 0)
+            if previous is not None and minutes - previous < problem.min_gap:
+                violations.append(Violation("spacing", [(i, d_idx - 1), (i, d_idx)],
+                                            f"{pres['name']} doses {d_idx} and {d_idx + 1} are less than {problem.min_gap} minutes apart"))
+            previous = minutes
+
+    for kind, dose1, dose2 in problem.dose_pairs:
+        t = dose_slots.get(dose1)
+        if t is None or t != dose_slots.get(dose2):
+            continue
+        if kind == "risk":
+            name1 = problem.prescriptions[dose1[0]]['name']
+            name2 = problem.prescriptions[dose2[0]]['name']
+            violations.append(Violation("risk", [dose1, dose2], f"{name1} and {name2} are both scheduled at {t}"))
+        else:
+            penalty += problem.undesirable_weight
+    return violations, penalty
+
+def max_spaced_doses(minutes, min_gap):
+    """ Most doses that fit in slots at `minutes` (sorted) at least `min_gap` apart: taking the earliest each time is optimal. """
+    count, last = 0, None
+    for m in minutes:
+        if last is None or m >= last + min_gap:
+            count, last = count + 1, m
+    return count
+
+def precheck(problem):
+    """
+    Necessary conditions for a schedule of a ScheduleProblem, cheap enough to test before any
+    model is built. Returns the Violations found, empty when none: a drug with no slot left after
+    the food rules ("window"), a window that cannot hold the doses at the required spacing
+    ("capacity"), and drugs that are pairwise risky with more doses between them than the slots of
+    their windows ("clique"; every one of those doses needs a slot of its own). Cliques are grown
+    greedily from each drug, so not every such group is found.
+    """
+    violations = []
+    prescriptions = problem.prescriptions
+    for i, pres in enumerate(prescriptions):
+        doses = [(i, d_idx) for d_idx in range(pres['frequency'])]
+        window = problem.windows[i]
+        if not window:
+            violations.append(Violation("window", doses, f"{pres['name']} has no time slot left after the food rules"))
+        elif max_spaced_doses([problem.slot_minutes[t] for t in window], problem.min_gap) < pres['frequency']:
+            violations.append(Violation("capacity", doses, f"{pres['name']} needs {pres['frequency']} doses "
+                                        f"{problem.min_gap} minutes apart but can only be taken at {', '.join(window)}"))
+
+    risky = {}
+    for kind, (i1, _), (i2, _) in problem.dose_pairs:
+        if kind == "risk" and i1 != i2:
+            risky.setdefault(i1, set()).add(i2)
+            risky.setdefault(i2, set()).add(i1)
+    seen = set()
+    for seed in sorted(risky, key=lambda i: -len(risky[i])):
+        clique = [seed]
+        for other in sorted(risky[seed], key=lambda i: (-prescriptions[i]['frequency'], len(problem.windows[i]), i)):
+            if all(other in risky[member] for member in clique):
+                clique.append(other)
+        key = frozenset(clique)
+        if len(clique) < 2 or key in seen:
+            continue
+        seen.add(key)
+        doses = [(i, d_idx) for i in sorted(clique) for d_idx in range(prescriptions[i]['frequency'])]
+        slots = set().union(*(problem.windows[i] for i in clique))
+        if len(doses) > len(slots):
+            names = ", ".join(prescriptions[i]['name'] for i in sorted(clique))
+            violations.append(Violation("clique", doses, f"{names} must not be taken together: "
+                                        f"{len(doses)} doses for {len(slots)} time slots"))
+    return violations
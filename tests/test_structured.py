@@ -0,0 +1,18 @@
+import io, json, os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from structured import iter_json_patients
+
+def test_malformed_records_are_rejected_one_by_one():
+    feed = "\n".join(json.dumps(entry) for entry in (
+        {"patient": "a", "prescriptions": 5},
+        {"patient": "b", "prescriptions": [{"name": "Metformin", "preferred_times": [["morning"]]}]},
+        {"patient": "c", "prescriptions": [{"name": "Metformin", "frequency": 2}]},
+    ))
+    records = list(iter_json_patients(io.StringIO(feed), lines=True))
+    assert [record.patient for record in records] == ["a", "b", "c"]
+    assert [error.line for error in records[0].errors] == [1]
+    assert "prescriptions" in records[0].errors[0].message
+    assert [error.line for error in records[1].errors] == [2]
+    assert "preferred times" in records[1].errors[0].message
+    assert not records[2].errors and records[2].prescriptions[0]["frequency"] == 2